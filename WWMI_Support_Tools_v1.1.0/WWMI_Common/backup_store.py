@@ -0,0 +1,366 @@
+"""Versioned backups of a mod.ini with delta compression.
+
+Every apply records the file as it was before the change. The newest
+recorded version is kept whole as a compressed snapshot; each older one is
+kept as a compressed line delta that rebuilds it from the version after it
+(reverse deltas), so the oldest versions can be dropped without touching the
+rest and a hundred small applies cost little more than one copy of the file.
+
+History lives next to the ini, in files 3DMigoto does not load:
+
+    .wwmi_backups/<ini name>/index.json   versions, newest first
+    .wwmi_backups/<ini name>/<id>.snap.z  newest version
+    .wwmi_backups/<ini name>/<id>.delta.z older versions
+
+The folder travels with the mod when it is shared, so nothing in it is
+trusted: deltas are a plain length-prefixed format (see encode_delta), never
+pickled objects, and are checked as they are read.
+
+Command line:
+
+    python -m WWMI_Common.backup_store list    path/to/mod.ini
+    python -m WWMI_Common.backup_store restore path/to/mod.ini ID
+"""
+
+import argparse
+import bisect
+import hashlib
+import json
+import os
+import struct
+import sys
+import time
+import zlib
+
+from WWMI_Common.safe_write import atomic_open
+
+BACKUP_DIR = ".wwmi_backups"
+DEFAULT_KEEP = 50
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024      # stored history per ini
+DEFAULT_MAX_FILE_BYTES = 16 * 1024 * 1024   # larger inis only get the .bak
+
+
+class BackupStore:
+    def __init__(self, ini_path, keep=DEFAULT_KEEP, max_bytes=DEFAULT_MAX_BYTES,
+                 max_file_bytes=DEFAULT_MAX_FILE_BYTES):
+        self.ini_path = os.path.abspath(ini_path)
+        folder, name = os.path.split(self.ini_path)
+        self.directory = os.path.join(folder, BACKUP_DIR, name)
+        self.keep = keep
+        self.max_bytes = max_bytes
+        self.max_file_bytes = max_file_bytes
+
+    # ---------------- PUBLIC ----------------
+
+    def versions(self):
+        """Recorded versions, newest first: dicts with id, time, note, size."""
+        return self._load_index()["versions"]
+
+    def record(self, note=""):
+        """Add the current contents of the ini as the newest version.
+        Returns its id, or None if the file is too large to keep history for."""
+        if os.path.getsize(self.ini_path) > self.max_file_bytes:
+            return None
+        with open(self.ini_path, "rb") as f:
+            data = f.read()
+
+        index = self._load_index()
+        versions = index["versions"]
+        digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+        if versions and versions[0]["digest"] == digest:
+            return versions[0]["id"]
+
+        os.makedirs(self.directory, exist_ok=True)
+        lines = data.splitlines(keepends=True)
+        vid = index["next_id"]
+
+        if versions:
+            # the old newest version becomes a delta against the new one
+            prev = versions[0]
+            prev_lines = self._read(self._snap_path(prev["id"])).splitlines(keepends=True)
+            delta = line_delta(lines, prev_lines)
+            prev["stored"] = self._write(self._delta_path(prev["id"]), encode_delta(delta))
+
+        stored = self._write(self._snap_path(vid), data)
+        versions.insert(0, {
+            "id": vid,
+            "time": time.time(),
+            "note": note,
+            "size": len(data),
+            "digest": digest,
+            "stored": stored,
+        })
+        index["next_id"] = vid + 1
+
+        dropped = self._retain(versions)
+        self._save_index(index)
+
+        # only now that the index points at the new files
+        if len(versions) > 1:
+            _remove(self._snap_path(versions[1]["id"]))
+        for v in dropped:
+            _remove(self._delta_path(v["id"]))
+            _remove(self._snap_path(v["id"]))
+        return vid
+
+    def read_version(self, vid):
+        """Contents (bytes) of version `vid`."""
+        versions = self.versions()
+        ids = [v["id"] for v in versions]
+        if vid not in ids:
+            raise KeyError(f"no backup version {vid}")
+
+        lines = self._read(self._snap_path(ids[0])).splitlines(keepends=True)
+        for v in ids[1 : ids.index(vid) + 1]:
+            lines = apply_line_delta(lines, decode_delta(self._read(self._delta_path(v))))
+        return b"".join(lines)
+
+    def restore(self, vid):
+        """Write version `vid` back to the ini. The current contents are
+        recorded first, so a restore can itself be undone."""
+        data = self.read_version(vid)
+        self.record(note=f"before restore to {vid}")
+        with atomic_open(self.ini_path, encoding=None) as f:
+            f.write(data)
+
+    # ---------------- STORAGE ----------------
+
+    def _snap_path(self, vid):
+        return os.path.join(self.directory, f"{vid}.snap.z")
+
+    def _delta_path(self, vid):
+        return os.path.join(self.directory, f"{vid}.delta.z")
+
+    def _index_path(self):
+        return os.path.join(self.directory, "index.json")
+
+    def _load_index(self):
+        try:
+            with open(self._index_path(), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"next_id": 1, "versions": []}
+
+    def _save_index(self, index):
+        with atomic_open(self._index_path()) as f:
+            json.dump(index, f, indent=1)
+
+    def _read(self, path):
+        with open(path, "rb") as f:
+            return zlib.decompress(f.read())
+
+    def _write(self, path, data):
+        packed = zlib.compress(data, 6)
+        with atomic_open(path, encoding=None) as f:
+            f.write(packed)
+        return len(packed)
+
+    def _retain(self, versions):
+        """Trim `versions` to the retention limits; returns the dropped ones.
+        The newest version is always kept."""
+        total = 0
+        for n, v in enumerate(versions):
+            total += v["stored"]
+            if n and (n >= self.keep or total > self.max_bytes):
+                dropped = versions[n:]
+                del versions[n:]
+                return dropped
+        return []
+
+
+# ---------------- LINE DELTAS ----------------
+
+def line_delta(new, old):
+    """Ops rebuilding `old` from `new`: a (start, end) tuple copies
+    new[start:end], a list inserts its lines.
+
+    Lines that occur exactly once on both sides anchor the match (as in
+    patience diff) and matches are grown around them, which keeps the cost
+    near linear even for inis full of repeated lines.
+    """
+    ops = []
+    cur = 0
+    for i, j, n in _matching_blocks(new, old):
+        if j > cur:
+            ops.append(old[cur:j])
+        ops.append((i, i + n))
+        cur = j + n
+    if cur < len(old):
+        ops.append(old[cur:])
+    return ops
+
+
+def apply_line_delta(new, ops):
+    out = []
+    for op in ops:
+        if type(op) is tuple:
+            start, end = op
+            if not 0 <= start <= end <= len(new):
+                raise ValueError(f"delta copies lines {start}:{end} of {len(new)}")
+            out.extend(new[start:end])
+        else:
+            out.extend(op)
+    return out
+
+
+# delta file: magic, then per op "C" start end (copy) or "I" count and
+# count times length + bytes (insert); all numbers unsigned 32-bit big-endian
+DELTA_MAGIC = b"WWMIDELTA1\n"
+_U32 = struct.Struct(">I")
+_RANGE = struct.Struct(">II")
+
+
+def encode_delta(ops):
+    out = [DELTA_MAGIC]
+    for op in ops:
+        if type(op) is tuple:
+            out.append(b"C" + _RANGE.pack(*op))
+        else:
+            out.append(b"I" + _U32.pack(len(op)))
+            for line in op:
+                out.append(_U32.pack(len(line)))
+                out.append(line)
+    return b"".join(out)
+
+
+def decode_delta(data):
+    """Ops written by encode_delta; ValueError for anything else."""
+    if not data.startswith(DELTA_MAGIC):
+        raise ValueError("not a backup delta (or one from an older version)")
+    view = memoryview(data)
+    pos = len(DELTA_MAGIC)
+    ops = []
+    try:
+        while pos < len(view):
+            kind = view[pos:pos + 1].tobytes()
+            pos += 1
+            if kind == b"C":
+                ops.append(_RANGE.unpack_from(view, pos))
+                pos += _RANGE.size
+            elif kind == b"I":
+                (count,) = _U32.unpack_from(view, pos)
+                pos += _U32.size
+                lines = []
+                for _ in range(count):
+                    (n,) = _U32.unpack_from(view, pos)
+                    pos += _U32.size
+                    if pos + n > len(view):
+                        raise ValueError("backup delta is truncated")
+                    lines.append(view[pos:pos + n].tobytes())
+                    pos += n
+                ops.append(lines)
+            else:
+                raise ValueError(f"bad op {kind!r} in backup delta")
+    except struct.error:
+        raise ValueError("backup delta is truncated") from None
+    return ops
+
+
+def _matching_blocks(a, b):
+    """[(i, j, n)] with a[i:i+n] == b[j:j+n], increasing in i and j."""
+    hi_a, hi_b = len(a), len(b)
+    pre = 0
+    while pre < hi_a and pre < hi_b and a[pre] == b[pre]:
+        pre += 1
+    while hi_a > pre and hi_b > pre and a[hi_a - 1] == b[hi_b - 1]:
+        hi_a -= 1
+        hi_b -= 1
+
+    blocks = [(0, 0, pre)] if pre else []
+    end_a, end_b = pre, pre
+    for i, j in _unique_anchors(a, b, pre, hi_a, hi_b):
+        if i < end_a or j < end_b:
+            continue  # already inside the previous block
+        while i > end_a and j > end_b and a[i - 1] == b[j - 1]:
+            i -= 1
+            j -= 1
+        n = 0
+        while i + n < hi_a and j + n < hi_b and a[i + n] == b[j + n]:
+            n += 1
+        blocks.append((i, j, n))
+        end_a, end_b = i + n, j + n
+
+    if hi_a < len(a):
+        blocks.append((hi_a, hi_b, len(a) - hi_a))
+    return blocks
+
+
+def _unique_anchors(a, b, lo, hi_a, hi_b):
+    """Longest run of lines unique to both a[lo:hi_a] and b[lo:hi_b] that
+    appear in the same order on both sides, as (i, j) pairs."""
+    pos_a = {}
+    for i in range(lo, hi_a):
+        pos_a[a[i]] = -1 if a[i] in pos_a else i
+    pos_b = {}
+    for j in range(lo, hi_b):
+        pos_b[b[j]] = -1 if b[j] in pos_b else j
+
+    # pairs in order of j; only the i side needs the LIS
+    ii = []
+    jj = []
+    for j in range(lo, hi_b):
+        if pos_b[b[j]] == j:
+            i = pos_a.get(b[j], -1)
+            if i >= 0:
+                ii.append(i)
+                jj.append(j)
+    del pos_a, pos_b
+
+    # longest increasing subsequence of i (patience sorting)
+    tails = []
+    tail_at = []
+    back = []
+    for k, i in enumerate(ii):
+        pos = bisect.bisect_left(tails, i)
+        back.append(tail_at[pos - 1] if pos else -1)
+        if pos == len(tails):
+            tails.append(i)
+            tail_at.append(k)
+        else:
+            tails[pos] = i
+            tail_at[pos] = k
+
+    chain = []
+    k = tail_at[-1] if tail_at else -1
+    while k >= 0:
+        chain.append((ii[k], jj[k]))
+        k = back[k]
+    chain.reverse()
+    return chain
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="WWMI mod.ini backup history")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_list = sub.add_parser("list", help="show recorded versions")
+    p_list.add_argument("ini")
+    p_restore = sub.add_parser("restore", help="write a recorded version back")
+    p_restore.add_argument("ini")
+    p_restore.add_argument("id", type=int)
+    args = parser.parse_args(argv)
+
+    store = BackupStore(args.ini)
+    if args.command == "list":
+        for v in store.versions():
+            stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(v["time"]))
+            print(f"{v['id']:>5}  {stamp}  {v['size']:>12,} bytes  {v['note']}")
+        return 0
+
+    try:
+        store.restore(args.id)
+    except (KeyError, ValueError, zlib.error) as e:
+        print(f"cannot restore version {args.id}: {e}")
+        return 1
+    print(f"restored version {args.id} to {args.ini}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,37 @@
+"""Helpers for running a per-file job over a whole Mods directory."""
+
+import fnmatch
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+
+def find_inis(root, pattern="*.ini"):
+    """Yield ini files under `root`, skipping DISABLED files and folders
+    the same way 3DMigoto does."""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if not d.upper().startswith("DISABLED"))
+        for name in sorted(filenames):
+            if name.upper().startswith("DISABLED"):
+                continue
+            if name.lower() == "desktop.ini":
+                continue
+            if fnmatch.fnmatch(name.lower(), pattern.lower()):
+                yield os.path.join(dirpath, name)
+
+
+def run_parallel(func, items, jobs=None):
+    """Call func(item) for every item and yield the results as they finish.
+
+    `func` must be a module-level function so it can be sent to the worker
+    processes. jobs=1 runs everything in this process.
+    """
+    items = list(items)
+    if jobs == 1 or len(items) <= 1:
+        for item in items:
+            yield func(item)
+        return
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(func, item) for item in items]
+        for fut in as_completed(futures):
+            yield fut.result()
@@ -0,0 +1,176 @@
+"""Unified diff of what Apply would write, without writing it.
+
+No diff algorithm is run: the tools already know which lines they change.
+The Toggle Maker's edits come from its LineDocument, and the streaming
+rewrites of the other two pass unchanged lines through as the very objects
+they read (stream_changes). DiffPreview only lays out the hunks; the text of
+a hunk is built when one of its lines is first asked for, so a preview of a
+large ini costs nothing until it is scrolled.
+"""
+
+import bisect
+import tkinter as tk
+
+from WWMI_Common.virtual_list import VirtualListbox
+
+
+def stream_changes(lines, rewrite):
+    """[(start, end, new_lines)] made by rewrite(iterator over `lines`).
+    An output line that is one of the input lines the rewrite has already
+    read is kept; input lines skipped over were dropped, and every other
+    output line is new."""
+    consumed = 0
+
+    def feed():
+        nonlocal consumed
+        for line in lines:
+            consumed += 1
+            yield line
+
+    changes = []
+    pos = 0
+    new = []
+    for line in rewrite(feed()):
+        k = pos
+        while k < consumed and lines[k] is not line:
+            k += 1
+        if k == consumed:
+            new.append(line)
+            continue
+        if k > pos or new:
+            changes.append((pos, k, new))
+            new = []
+        pos = k + 1
+    if pos != len(lines) or new:
+        changes.append((pos, len(lines), new))
+    return changes
+
+
+def _trim(lines, changes):
+    """Drop lines a change writes back unchanged at either end of it."""
+    out = []
+    for start, end, new in changes:
+        head = 0
+        while head < len(new) and start + head < end and new[head] == lines[start + head]:
+            head += 1
+        tail = 0
+        while (tail < len(new) - head and end - tail > start + head
+               and new[len(new) - 1 - tail] == lines[end - 1 - tail]):
+            tail += 1
+        if start + head < end - tail or head < len(new) - tail:
+            out.append((start + head, end - tail, new[head:len(new) - tail]))
+    return out
+
+
+def _range(start, stop):
+    # as difflib writes hunk ranges
+    if stop - start == 1:
+        return f"{start + 1}"
+    return f"{start + 1 if stop > start else start},{stop - start}"
+
+
+class DiffPreview:
+    """Lines of the unified diff from `lines` to `lines` with `changes`
+    ((start, end, new_lines), in order, not overlapping) applied.
+    len() and indexing work without building the whole diff."""
+
+    def __init__(self, lines, changes, name="mod.ini", context=3):
+        self.lines = lines
+        self.name = name
+        self.context = context
+        self.changes = _trim(lines, changes)
+        self.added = sum(len(new) for _, _, new in self.changes)
+        self.removed = sum(end - start for start, end, _ in self.changes)
+
+        # hunk k: changes[first:last], old lines [lo, hi), new start, first diff line
+        self._hunks = []
+        self._offsets = []
+        count = 2 if self.changes else 0  # ---/+++ header
+        shift = 0
+        i = 0
+        while i < len(self.changes):
+            first = i
+            lo = max(0, self.changes[i][0] - context)
+            new_lo = lo + shift
+            added = 0
+            while True:
+                start, end, new = self.changes[i]
+                added += len(new)
+                shift += len(new) - (end - start)
+                i += 1
+                if i == len(self.changes) or self.changes[i][0] - end > 2 * context:
+                    break
+            hi = min(len(lines), end + context)
+            self._hunks.append((first, i, lo, hi, new_lo))
+            self._offsets.append(count)
+            count += 1 + (hi - lo) + added
+        self._count = count
+        self._built = {}  # hunk -> its diff lines, for the hunks looked at
+
+    def __len__(self):
+        return self._count
+
+    def __bool__(self):
+        return bool(self.changes)
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError("diff line out of range")
+        if i < 2:
+            return (f"--- a/{self.name}\n", f"+++ b/{self.name}\n")[i]
+        k = bisect.bisect_right(self._offsets, i) - 1
+        return self.hunk(k)[i - self._offsets[k]]
+
+    def __iter__(self):
+        if self.changes:
+            yield f"--- a/{self.name}\n"
+            yield f"+++ b/{self.name}\n"
+        for k in range(len(self._hunks)):
+            yield from self.hunk(k)
+
+    def summary(self):
+        return f"{len(self._hunks)} hunks, +{self.added} -{self.removed} lines"
+
+    def hunk(self, k):
+        """The diff lines of hunk `k`, header first."""
+        built = self._built.get(k)
+        if built is not None:
+            return built
+        if len(self._built) > 64:
+            self._built.clear()
+
+        first, last, lo, hi, new_lo = self._hunks[k]
+        lines = self.lines
+        new_len = hi - lo + sum(len(new) - (end - start) for start, end, new in self.changes[first:last])
+        out = [f"@@ -{_range(lo, hi)} +{_range(new_lo, new_lo + new_len)} @@\n"]
+        pos = lo
+        for start, end, new in self.changes[first:last]:
+            out += [" " + _line(l) for l in lines[pos:start]]
+            out += ["-" + _line(l) for l in lines[start:end]]
+            out += ["+" + _line(l) for l in new]
+            pos = end
+        out += [" " + _line(l) for l in lines[pos:hi]]
+        self._built[k] = out
+        return out
+
+
+def _line(line):
+    return line if line.endswith("\n") else line + "\n"
+
+
+def show_preview(parent, preview, title="Preview"):
+    """Open a window listing `preview`; rows are built as they scroll into view."""
+    window = tk.Toplevel(parent)
+    window.title(f"{title} - {preview.summary()}")
+    if not preview:
+        tk.Label(window, text="Apply would not change the file.").pack(padx=20, pady=20)
+        return window
+
+    listbox = VirtualListbox(window, lambda i: preview[i].rstrip("\r\n"),
+                             width=120, height=30, selectmode="browse")
+    listbox.pack(fill="both", expand=True, padx=8, pady=8)
+    listbox.listbox.config(font="TkFixedFont")
+    listbox.set_count(len(preview))
+    return window
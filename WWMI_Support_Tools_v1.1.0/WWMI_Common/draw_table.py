@@ -0,0 +1,55 @@
+"""Compact storage for the draw calls of a mod.ini.
+
+A dict per draw call costs several hundred bytes. Here each draw is one
+component number and three drawindexed params in int arrays, plus a
+reference to its comment, with equal comments sharing one string. Tens of
+thousands of draws across several loaded files stay small, and the table
+pickles small for the scan cache.
+"""
+
+from array import array
+
+
+class DrawTable:
+    """Draw calls as parallel columns; row k is (component, (a, b, c), comment)."""
+
+    __slots__ = ("comps", "params", "comments", "_interned")
+
+    def __init__(self):
+        self.comps = array("q")
+        self.params = array("q")  # a, b, c of every row, flattened
+        self.comments = []
+        self._interned = {}  # comment -> the one copy of it the rows share
+
+    def append(self, comp, params, comment):
+        """Add a row. Raises OverflowError, leaving the table unchanged, for
+        numbers that do not fit in 64 bits."""
+        packed = array("q", params)
+        self.comps.append(comp)
+        self.params.extend(packed)
+        self.comments.append(self._interned.setdefault(comment, comment))
+
+    def __getstate__(self):
+        # pickled without the interning dict; it is rebuilt on loading
+        return self.comps, self.params, self.comments
+
+    def __setstate__(self, state):
+        self.comps, self.params, self.comments = state
+        self._interned = {c: c for c in self.comments}
+
+    def __len__(self):
+        return len(self.comps)
+
+    def __getitem__(self, k):
+        if k < 0:
+            k += len(self.comps)
+        p = self.params
+        j = 3 * k
+        return self.comps[k], (p[j], p[j + 1], p[j + 2]), self.comments[k]
+
+    def __iter__(self):
+        it = iter(self.params)
+        return zip(self.comps, zip(it, it, it), self.comments)
+
+    def components(self):
+        return sorted(set(self.comps))
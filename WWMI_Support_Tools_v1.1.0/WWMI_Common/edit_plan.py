@@ -0,0 +1,122 @@
+"""Edits of one or more tools on one mod.ini, written in one pass.
+
+    plan = EditPlan(path)
+    App.plan_specs(plan, specs, lines)                       # Toggle Maker
+    TransparencyTool.plan_changes(plan, pending_changes)     # Transparency Maker
+    RabbitFXTool.plan_changes(plan, modifies, shared)        # RabbitFX Maker
+    plan.execute()
+
+Tools add their edits as stages; the plan itself knows nothing about them.
+A line stage works on the whole list of lines (the Toggle Maker's specs
+point at line numbers of the scanned file), so there is at most one and it
+runs first. Stream stages are generators chained over its output, or
+straight over the file when there is none, and match what they change by
+content. The file is traversed once, written once and backed up once.
+
+Every tool's Apply runs a plan holding its own edits; the launcher's Apply
+All runs one holding the queued edits of all its tools (see main.py), and
+apply_all.py does the same for the batch spec files of the tools.
+"""
+
+import os
+
+from WWMI_Common.backup_store import BackupStore
+from WWMI_Common.diff_preview import DiffPreview, stream_changes
+from WWMI_Common.file_watch import check_unchanged
+from WWMI_Common.line_document import LineDocument
+from WWMI_Common.profiling import phase, session
+from WWMI_Common.text_io import read_lines, rewrite_file, write_lines
+from WWMI_Common.worker import no_progress
+
+
+class EditPlan:
+    def __init__(self, path, note="Edit Plan"):
+        self.path = path
+        self.note = note          # shown in the backup history
+        self.line_stage = None
+        self.lines = None         # lines the line stage was prepared against
+        self.streams = []
+
+    def edit_lines(self, stage, lines=None):
+        """Set the line stage: stage(lines, doc=None) returns a tuple whose
+        first item is the edited list of lines, and makes the same edits to
+        `doc` (a LineDocument of `lines`) when given one. `lines` are the
+        lines the stage was prepared against, a list or a LineDocument with
+        edits already made (default: the file as it is when the plan runs)."""
+        if self.line_stage is not None:
+            raise ValueError("a plan has only one line stage")
+        self.line_stage = stage
+        self.lines = lines
+        return self
+
+    def stream(self, rewrite):
+        """Add a stream stage: rewrite(lines) takes an iterable of lines and
+        returns an iterable of the rewritten lines."""
+        self.streams.append(rewrite)
+        return self
+
+    def __bool__(self):
+        return self.line_stage is not None or bool(self.streams)
+
+    # ---------------- EXECUTION ----------------
+
+    def rewrite(self, lines):
+        """(iterator over the planned output for the file contents `lines`,
+        what the line stage returned or None)."""
+        result = None
+        if self.line_stage is not None:
+            if isinstance(lines, LineDocument):
+                lines = lines.tolist()
+            with phase("lines", lines=len(lines)):
+                result = self.line_stage(lines)
+            lines = result[0]
+        return self._stream(lines), result
+
+    def _stream(self, lines):
+        for rewrite in self.streams:
+            lines = rewrite(lines)
+        return lines
+
+    def preview(self, name=None):
+        """DiffPreview of what execute() would change."""
+        lines = self.lines
+        if lines is None:
+            lines, _ = read_lines(self.path)
+        doc = lines.copy() if isinstance(lines, LineDocument) else LineDocument(lines)
+        if self.line_stage is not None:
+            self.line_stage(doc.tolist(), doc)
+        if self.streams:
+            doc.apply_edits(stream_changes(doc.tolist(), self._stream))
+        return DiffPreview(doc.base, doc.changes(), name or os.path.basename(self.path))
+
+    def execute(self, backup=True, progress=no_progress, expected=None):
+        """Write the plan to the file, keeping the old version as mod.ini.bak
+        and in the backup history. With `expected` (a file signature) a file
+        changed since then raises StaleFileError. Returns what the line
+        stage returned, or None."""
+        path = self.path
+        bak = path + ".bak" if backup else None
+        with session("plan.apply", path=path, streams=len(self.streams)):
+            check_unchanged(path, expected)
+            if backup:
+                progress("Saving history...")
+                with phase("backup"):
+                    BackupStore(path).record(self.note)
+
+            progress("Applying...")
+            if self.line_stage is None:
+                with phase("rewrite"):
+                    rewrite_file(path, self._stream, backup=bak, progress=progress)
+                return None
+
+            # the line stage needs the whole file; the rest streams over its output
+            lines = self.lines
+            if lines is None:
+                with phase("read"):
+                    lines, _ = read_lines(path)
+            out, result = self.rewrite(lines)
+            progress("Writing...")
+            with phase("write"):
+                # same encoding and newlines as the file was read with
+                write_lines(path, out, backup=bak)
+            return result
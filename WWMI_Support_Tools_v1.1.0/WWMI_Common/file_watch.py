@@ -0,0 +1,92 @@
+"""Notice when the open mod.ini is changed by another program.
+
+Each tool keeps the (size, mtime) signature the file had when it was
+scanned. FileWatcher polls that signature from the Tk main loop and reports
+a change once the file has stopped changing for a moment, so an editor's
+save is seen as a single change. Applying against a snapshot that no
+longer matches the file is refused with StaleFileError instead of silently
+overwriting or mis-applying the outside edit.
+"""
+
+import os
+import time
+
+
+class StaleFileError(Exception):
+    pass
+
+
+def file_signature(path):
+    """(size, mtime_ns) of `path`, or None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+def check_unchanged(path, signature):
+    """Raise StaleFileError if `path` changed since `signature` was taken.
+    signature=None skips the check."""
+    if signature is not None and file_signature(path) != signature:
+        raise StaleFileError(
+            f"{os.path.basename(path)} was changed by another program since it was scanned.\n"
+            "Scan it again before applying."
+        )
+
+
+class FileWatcher:
+    """Poll one file and call on_change() after it has been changed and then
+    left alone for `settle_ms`.
+
+    on_change returns False if it cannot handle the change right now (a task
+    is running, say); the watcher then asks again on the next poll.
+    """
+
+    def __init__(self, root, on_change, interval_ms=1000, settle_ms=500):
+        self.root = root
+        self.on_change = on_change
+        self.interval_ms = interval_ms
+        self.settle_ms = settle_ms
+        self.path = None
+        self.signature = None
+        self._seen = None       # signature waiting to settle
+        self._seen_at = 0.0
+        self._job = None
+
+    def watch(self, path, signature):
+        """Start watching `path`, which currently has `signature`."""
+        self.path = path
+        self.accept(signature)
+        if self._job is None:
+            self._job = self.root.after(self.interval_ms, self._poll)
+
+    def accept(self, signature):
+        """The tool is now in sync with the file as of `signature` (after a
+        rescan or after writing the file itself)."""
+        self.signature = signature
+        self._seen = None
+
+    def stop(self):
+        if self._job is not None:
+            self.root.after_cancel(self._job)
+            self._job = None
+        self.path = None
+
+    def _poll(self):
+        self._job = None
+        if self.path is None:
+            return
+
+        sig = file_signature(self.path)
+        now = time.monotonic()
+        if sig == self.signature:
+            self._seen = None
+        elif sig != self._seen:
+            self._seen = sig  # still being written, or just noticed
+            self._seen_at = now
+        elif (now - self._seen_at) * 1000 >= self.settle_ms:
+            if self.on_change() is not False:
+                self.accept(sig)
+
+        self._job = self.root.after(self.interval_ms, self._poll)
@@ -0,0 +1,159 @@
+"""Single-pass section index for mod.ini files.
+
+The file is tokenized once; the tools then query sections and typed line
+records instead of re-scanning the lines with their own regexes. The loop
+below is line_classifier.classify inlined, since it runs once per line.
+"""
+
+import bisect
+
+from WWMI_Common.line_classifier import (
+    BLANK, COMMENT, CYCLE, CYCLE_RE, DRAW, DRAW_RE, ENDIF, IF, IF_RE, KEY, KEY_RE,
+    OTHER, PERSIST, PERSIST_RE, RUN, RUN_RE, SECTION, TOGGLE_IF_RE, component_number,
+)
+
+# kinds with a line list in IniIndex.records; see line_classifier for the
+# values stored per line
+RECORD_KINDS = (DRAW, IF, ENDIF, PERSIST, CYCLE, KEY, RUN)
+
+
+class Section:
+    __slots__ = ("name", "start", "end")
+
+    def __init__(self, name, start, end):
+        self.name = name
+        self.start = start  # index of the [header] line
+        self.end = end      # index of the next header (exclusive)
+
+    def __repr__(self):
+        return f"Section({self.name!r}, {self.start}, {self.end})"
+
+
+class IniIndex:
+    def __init__(self, lines):
+        self.lines = lines
+        self.kinds = bytearray(len(lines))
+        self.values = {}          # line idx -> captured value of typed records
+        self.comment_before = {}  # draw idx -> last comment idx in the same section
+        self.sections = []        # type: list[Section]
+        self.component_sections = []  # type: list[tuple[int, Section]]
+        self.records = {k: [] for k in RECORD_KINDS}
+
+        self._by_name = {}
+        self._build()
+        self._starts = [s.start for s in self.sections]
+
+    def _build(self):
+        lines = self.lines
+        kinds = self.kinds
+        values = self.values
+        records = self.records
+        comment_before = self.comment_before
+        sections = self.sections
+
+        draws = records[DRAW]
+        ifs = records[IF]
+        endifs = records[ENDIF]
+        persists = records[PERSIST]
+        cycles = records[CYCLE]
+        keys = records[KEY]
+        runs = records[RUN]
+
+        current = None
+        last_comment = None
+
+        for i, s in enumerate(map(str.strip, lines)):
+            if not s:
+                continue
+
+            c = s[0]
+            if c == "[" and s[-1] == "]":
+                if current is not None:
+                    current.end = i
+                name = s[1:-1]
+                current = Section(name, i, len(lines))
+                sections.append(current)
+                self._by_name.setdefault(name.lower(), []).append(current)
+                comp = component_number(name)
+                if comp is not None:
+                    self.component_sections.append((comp, current))
+                kinds[i] = SECTION
+                last_comment = None
+                continue
+
+            if c == ";":
+                kinds[i] = COMMENT
+                last_comment = i
+                continue
+
+            low = s.lower()
+            if "drawindexed" in low:
+                kinds[i] = DRAW
+                m = DRAW_RE.match(s)
+                values[i] = (int(m.group(1)), int(m.group(2)), int(m.group(3))) if m else None
+                if last_comment is not None:
+                    comment_before[i] = last_comment
+                draws.append(i)
+            elif c in "iI" and IF_RE.match(s):
+                kinds[i] = IF
+                m = TOGGLE_IF_RE.match(s)
+                values[i] = m.group(1) if m else None
+                ifs.append(i)
+            elif low == "endif":
+                kinds[i] = ENDIF
+                endifs.append(i)
+            elif "persist" in low and (m := PERSIST_RE.search(s)):
+                kinds[i] = PERSIST
+                values[i] = m.group(1)
+                persists.append(i)
+            elif "0,1" in s and (m := CYCLE_RE.search(s)):
+                kinds[i] = CYCLE
+                values[i] = m.group(1)
+                cycles.append(i)
+            elif c in "kK" and (m := KEY_RE.match(s)):
+                kinds[i] = KEY
+                values[i] = m.group(1).strip()
+                keys.append(i)
+            elif c in "rR" and (m := RUN_RE.match(s)):
+                kinds[i] = RUN
+                values[i] = m.group(1).strip()
+                runs.append(i)
+            else:
+                kinds[i] = OTHER
+
+    # ---------------- QUERIES ----------------
+
+    def section(self, name):
+        """First section called `name` (case-insensitive), or None."""
+        found = self._by_name.get(name.lower())
+        return found[0] if found else None
+
+    def sections_named(self, name):
+        return list(self._by_name.get(name.lower(), ()))
+
+    def sections_with_prefix(self, prefix):
+        prefix = prefix.lower()
+        return [s for s in self.sections if s.name.lower().startswith(prefix)]
+
+    def section_at(self, idx):
+        """Section containing line `idx`, or None before the first header."""
+        pos = bisect.bisect_right(self._starts, idx) - 1
+        return self.sections[pos] if pos >= 0 else None
+
+    def first_section_after(self, idx):
+        """Index of the first section header after line `idx`, or len(lines)."""
+        pos = bisect.bisect_right(self._starts, idx)
+        return self._starts[pos] if pos < len(self._starts) else len(self.lines)
+
+    def find(self, kind, start=0, end=None):
+        """Line indices of `kind` records within [start, end)."""
+        recs = self.records[kind]
+        lo = bisect.bisect_left(recs, start)
+        hi = len(recs) if end is None else bisect.bisect_left(recs, end, lo)
+        return recs[lo:hi]
+
+    def next_record(self, kind, after):
+        """First `kind` record after line `after`, or None."""
+        recs = self.records[kind]
+        pos = bisect.bisect_right(recs, after)
+        return recs[pos] if pos < len(recs) else None
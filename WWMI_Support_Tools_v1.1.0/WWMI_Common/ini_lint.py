@@ -0,0 +1,210 @@
+"""Check mod.ini files for what the tools would skip or get wrong.
+
+    python -m WWMI_Common.ini_lint Mods/              # every ini under Mods, in parallel
+    python -m WWMI_Common.ini_lint mod.ini --json     # one JSON object per file
+
+Each file is read once, as a stream. Reported:
+
+    unclosed-if             error    if without endif in the same section
+    stray-endif             error    endif without an open if
+    nested-if               info     if inside another if (Toggle Maker lists it as [M])
+    draw-outside-component  warning  drawindexed outside a TextureOverrideComponent section
+    duplicate-section       warning  a section name used twice
+    orphan-key              warning  [Key...] section whose var no "if $var == 0" uses
+                                     (Toggle Maker's Apply removes it)
+    unused-section          warning  CustomShaderTransparency / ResourceGlow / ResourceFX
+                                     section nothing refers to
+
+The exit status is 1 if any file has an error or could not be read.
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+from WWMI_Common.batch import find_inis, run_parallel
+from WWMI_Common.line_classifier import CYCLE_RE, IF_RE, USED_VAR_RE, component_number
+from WWMI_Common.text_io import scan_file
+
+SEVERITY = {
+    "unclosed-if": "error",
+    "stray-endif": "error",
+    "nested-if": "info",
+    "draw-outside-component": "warning",
+    "duplicate-section": "warning",
+    "orphan-key": "warning",
+    "unused-section": "warning",
+}
+
+# sections the tools write that only matter if something refers to them
+REFERENCED_PREFIXES = ("customshadertransparency", "resourceglow", "resourcefx", "resourcerabbitfx")
+# sections besides the components that may draw
+DRAWING_PREFIXES = ("customshader", "commandlist")
+REF_RE = re.compile(r"\b(?:Resource|CustomShader)\w*", re.IGNORECASE)
+
+CHUNK = 16  # files per worker task
+
+
+def lint_lines(lines):
+    """[(line number, code, message)] for the lines of one ini; `lines` may
+    be any iterable and is read once."""
+    issues = []
+    seen = {}          # lower-case section name -> line of its first header
+    wanted = {}        # lower-case name -> (line, name) of sections that need a reference
+    referenced = set()
+    key_sections = []  # (line, name, cycle vars)
+    used_vars = set()
+    open_ifs = []      # lines of the ifs open in this section
+
+    name = None
+    drawing = False  # current section may hold drawindexed
+    key_vars = None  # cycle vars of the current [Key...] section
+
+    for n, line in enumerate(lines, 1):
+        s = line.strip()
+        if not s:
+            continue
+        c = s[0]
+        if c == ";":
+            continue
+
+        if c == "[" and s[-1] == "]":
+            for i in open_ifs:
+                issues.append((i, "unclosed-if", f"if without endif in [{name}]"))
+            open_ifs = []
+
+            name = s[1:-1]
+            low = name.lower()
+            if low in seen:
+                issues.append((n, "duplicate-section", f"[{name}] already at line {seen[low]}"))
+            else:
+                seen[low] = n
+            if low.startswith(REFERENCED_PREFIXES):
+                wanted.setdefault(low, (n, name))
+            drawing = component_number(name) is not None or low.startswith(DRAWING_PREFIXES)
+            key_vars = None
+            if low.startswith("key"):
+                key_vars = set()
+                key_sections.append((n, name, key_vars))
+            continue
+
+        low = s.lower()
+        if "drawindexed" in low:
+            if not drawing:
+                where = f"in [{name}]" if name is not None else "before the first section"
+                issues.append((n, "draw-outside-component",
+                               f"drawindexed {where}; the tools only see component sections"))
+            continue
+
+        if c in "iI" and IF_RE.match(s):
+            if open_ifs:
+                issues.append((n, "nested-if", f"if inside the if at line {open_ifs[-1]}"))
+            open_ifs.append(n)
+        elif low == "endif":
+            if open_ifs:
+                open_ifs.pop()
+            else:
+                issues.append((n, "stray-endif", "endif without an open if"))
+
+        if "$" in s:
+            if "==" in s:
+                m = USED_VAR_RE.search(s)
+                if m:
+                    used_vars.add(m.group(1))
+            if key_vars is not None and "0,1" in s:
+                m = CYCLE_RE.search(s)
+                if m:
+                    key_vars.add(m.group(1))
+        if "resource" in low or "customshader" in low:
+            referenced.update(r.lower() for r in REF_RE.findall(s))
+
+    for i in open_ifs:
+        issues.append((i, "unclosed-if", f"if without endif in [{name}]"))
+    for n, name, key_vars in key_sections:
+        if key_vars and not key_vars & used_vars:
+            var = ", ".join(f"${v}" for v in sorted(key_vars))
+            issues.append((n, "orphan-key", f"[{name}] cycles {var}, which no if uses"))
+    for low, (n, name) in wanted.items():
+        if low not in referenced:
+            issues.append((n, "unused-section", f"nothing refers to [{name}]"))
+
+    issues.sort()
+    return issues
+
+
+def lint_file(path):
+    """{"path", "issues": [{"line", "severity", "code", "message"}], "error"}"""
+    try:
+        issues = scan_file(path, lint_lines)
+    except (OSError, UnicodeError) as e:
+        return {"path": path, "issues": [], "error": str(e)}
+    return {
+        "path": path,
+        "issues": [
+            {"line": n, "severity": SEVERITY[code], "code": code, "message": message}
+            for n, code, message in issues
+        ],
+        "error": None,
+    }
+
+
+def _lint_chunk(paths):
+    return [lint_file(p) for p in paths]
+
+
+def lint_paths(paths, jobs=None):
+    """Yield lint_file results for `paths`, spread over worker processes,
+    in the order they finish."""
+    paths = list(paths)
+    chunks = [paths[i:i + CHUNK] for i in range(0, len(paths), CHUNK)]
+    for results in run_parallel(_lint_chunk, chunks, jobs):
+        yield from results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check mod.ini files")
+    parser.add_argument("paths", nargs="+", metavar="PATH", help="ini files or folders to search")
+    parser.add_argument("--pattern", default="*.ini", help="ini file name pattern (default: *.ini)")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--json", action="store_true", help="print one JSON object per file")
+    parser.add_argument("--quiet", action="store_true", help="leave out info messages")
+    args = parser.parse_args(argv)
+
+    files = []
+    for p in args.paths:
+        files.extend(find_inis(p, args.pattern) if os.path.isdir(p) else [p])
+
+    start = time.perf_counter()
+    counts = {"error": 0, "warning": 0, "info": 0}
+    failed = 0
+    for res in lint_paths(files, args.jobs):
+        if args.quiet:
+            res["issues"] = [i for i in res["issues"] if i["severity"] != "info"]
+        for issue in res["issues"]:
+            counts[issue["severity"]] += 1
+        if res["error"] or any(i["severity"] == "error" for i in res["issues"]):
+            failed += 1
+
+        if args.json:
+            print(json.dumps(res, ensure_ascii=False))
+            continue
+        if res["error"]:
+            print(f"{res['path']}: error: {res['error']}")
+        for i in res["issues"]:
+            print(f"{res['path']}:{i['line']}: {i['severity']} {i['code']}: {i['message']}")
+    elapsed = time.perf_counter() - start
+
+    if not args.json:
+        rate = len(files) / elapsed if elapsed > 0 else 0.0
+        print(
+            f"{len(files)} files checked, {counts['error']} errors, {counts['warning']} warnings, "
+            f"{counts['info']} notes in {elapsed:.2f}s ({rate:.1f} files/s)"
+        )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
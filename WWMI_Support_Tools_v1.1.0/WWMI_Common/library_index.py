@@ -0,0 +1,229 @@
+"""Index of toggle keys across a whole Mods folder.
+
+3DMigoto loads every mod at once, so a key bound in one mod.ini also fires
+in every other mod that binds it. For each ini the index records its
+[Key...] sections, their "key =" bindings and the $vars they cycle. It is
+kept in the cache directory and refresh() only rescans inis whose size or
+mtime changed, so checking a key does not mean reading every mod again.
+
+    python -m WWMI_Common.library_index MODS_DIR              keys bound by more than one ini
+    python -m WWMI_Common.library_index MODS_DIR --key VK_F1  inis binding VK_F1
+    python -m WWMI_Common.library_index MODS_DIR --free 5     unused keys
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+
+from WWMI_Common.batch import find_inis
+from WWMI_Common.line_classifier import CYCLE_RE, KEY_RE
+from WWMI_Common.safe_write import atomic_open
+from WWMI_Common.scan_cache import default_cache_dir
+from WWMI_Common.text_io import read_lines
+
+INDEX_VERSION = 1
+
+# offered as free keys, in this order
+SUGGESTED_KEYS = (
+    tuple(f"VK_NUMPAD{n}" for n in range(10))
+    + tuple(f"VK_F{n}" for n in range(1, 13))
+    + ("VK_INSERT", "VK_HOME", "VK_PRIOR", "VK_DELETE", "VK_END", "VK_NEXT")
+)
+
+
+def normalize_key(binding):
+    """Comparable form of a "key =" value: case, token order, the VK_ prefix
+    and no_* modifier exclusions do not change which key press fires it."""
+    tokens = []
+    for t in binding.lower().split():
+        if t.startswith("no_"):
+            continue
+        if t.startswith("vk_"):
+            t = t[3:]
+        tokens.append(t)
+    return " ".join(sorted(tokens))
+
+
+def scan_keys(lines):
+    """([(section, binding)], [var]) of the [Key...] sections in `lines`."""
+    keys = []
+    cycle_vars = []
+    section = None
+    for line in lines:
+        s = line.strip()
+        if not s:
+            continue
+        c = s[0]
+        if c == "[" and s[-1] == "]":
+            name = s[1:-1]
+            section = name if name[:3].lower() == "key" else None
+        elif section is None or c == ";":
+            continue
+        elif c in "kK":
+            m = KEY_RE.match(s)
+            if m:
+                keys.append((section, m.group(1).strip()))
+        elif "0,1" in s:
+            m = CYCLE_RE.search(s)
+            if m:
+                cycle_vars.append(m.group(1))
+    return keys, cycle_vars
+
+
+class LibraryIndex:
+    def __init__(self, mods_dir, directory=None):
+        self.mods_dir = os.path.abspath(mods_dir)
+        self.directory = directory or default_cache_dir()
+        self.enabled = not os.environ.get("WWMI_NO_CACHE")
+        self.files = {}  # path -> {"size", "mtime_ns", "keys", "vars"}
+        self._by_key = None
+
+    @staticmethod
+    def mods_dir_for(ini_path):
+        """The Mods folder containing `ini_path`, or the folder above the
+        ini's own folder if there is none."""
+        folder = os.path.dirname(os.path.abspath(ini_path))
+        d = folder
+        while True:
+            if os.path.basename(d).lower() == "mods":
+                return d
+            parent = os.path.dirname(d)
+            if parent == d:
+                return os.path.dirname(folder)
+            d = parent
+
+    # ---------------- PUBLIC ----------------
+
+    def refresh(self, progress=None):
+        """Bring the index up to date with the Mods folder.
+        Returns the number of inis that had to be rescanned."""
+        if not self.files:
+            self._load()
+
+        seen = {}
+        rescanned = 0
+        for path in find_inis(self.mods_dir):
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            rec = self.files.get(path)
+            if rec is None or (rec["size"], rec["mtime_ns"]) != (st.st_size, st.st_mtime_ns):
+                if progress is not None:
+                    progress(f"Indexing {os.path.relpath(path, self.mods_dir)}...")
+                try:
+                    lines, _ = read_lines(path)
+                except OSError:
+                    continue
+                keys, cycle_vars = scan_keys(lines)
+                rec = {"size": st.st_size, "mtime_ns": st.st_mtime_ns,
+                       "keys": keys, "vars": cycle_vars}
+                rescanned += 1
+            seen[path] = rec
+
+        if rescanned or len(seen) != len(self.files):
+            self.files = seen
+            self._by_key = None
+            self._save()
+        return rescanned
+
+    def key_users(self, binding, exclude=None):
+        """[(path, section)] of the [Key...] sections bound to `binding`."""
+        users = self._key_map().get(normalize_key(binding), ())
+        return [(p, sec) for p, sec in users if p != exclude]
+
+    def var_users(self, var, exclude=None):
+        """Paths of the inis with a [Key...] section cycling $var."""
+        return [p for p, rec in self.files.items() if var in rec["vars"] and p != exclude]
+
+    def conflicts(self):
+        """{binding: [(path, section)]} for keys bound in more than one ini."""
+        out = {}
+        for key, users in self._key_map().items():
+            if len({p for p, _ in users}) > 1:
+                out[key] = users
+        return out
+
+    def free_keys(self, count=5, used=()):
+        """Up to `count` of SUGGESTED_KEYS that no ini binds, nor `used`."""
+        taken = set(self._key_map()) | {normalize_key(k) for k in used}
+        return [k for k in SUGGESTED_KEYS if normalize_key(k) not in taken][:count]
+
+    # ---------------- STORAGE ----------------
+
+    def _key_map(self):
+        if self._by_key is None:
+            by_key = {}
+            for path, rec in self.files.items():
+                for section, binding in rec["keys"]:
+                    by_key.setdefault(normalize_key(binding), []).append((path, section))
+            self._by_key = by_key
+        return self._by_key
+
+    def _index_path(self):
+        key = hashlib.blake2b(os.path.normcase(self.mods_dir).encode("utf-8"), digest_size=16).hexdigest()
+        return os.path.join(self.directory, f"library-{key}.json")
+
+    def _load(self):
+        if not self.enabled:
+            return
+        try:
+            with open(self._index_path(), "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") == INDEX_VERSION and data.get("mods_dir") == self.mods_dir:
+            self.files = {
+                p: dict(rec, keys=[tuple(k) for k in rec["keys"]])
+                for p, rec in data["files"].items()
+            }
+            self._by_key = None
+
+    def _save(self):
+        if not self.enabled:
+            return
+        data = {"version": INDEX_VERSION, "mods_dir": self.mods_dir, "files": self.files}
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with atomic_open(self._index_path()) as f:
+                json.dump(data, f)
+        except OSError:
+            pass  # the index is only a cache
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Toggle keys used across a Mods folder")
+    parser.add_argument("mods_dir")
+    parser.add_argument("--key", help="list the inis binding this key")
+    parser.add_argument("--free", type=int, metavar="N", help="suggest N unused keys")
+    args = parser.parse_args(argv)
+
+    library = LibraryIndex(args.mods_dir)
+    library.refresh()
+
+    def rel(path):
+        return os.path.relpath(path, library.mods_dir)
+
+    if args.free:
+        for k in library.free_keys(args.free):
+            print(k)
+        return 0
+
+    if args.key:
+        for path, section in library.key_users(args.key):
+            print(f"{rel(path)}  [{section}]")
+        return 0
+
+    conflicts = library.conflicts()
+    for key in sorted(conflicts):
+        print(key)
+        for path, section in conflicts[key]:
+            print(f"    {rel(path)}  [{section}]")
+    print(f"{len(library.files)} inis indexed, {len(conflicts)} keys bound by more than one ini")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""Line classification shared by the index and the streaming rewrites.
+
+Every pattern is compiled once here, and each sits behind a cheap test on
+the first character or a substring, so the regex only runs on the few lines
+that can match. Callers pass lines already stripped of surrounding
+whitespace.
+"""
+
+import re
+
+
+# line kinds
+BLANK = 0
+COMMENT = 1
+SECTION = 2   # value: section name
+DRAW = 3      # non-comment line containing drawindexed; value: (a, b, c) or None
+IF = 4        # value: var for "if $var == 0", otherwise None
+ENDIF = 5
+PERSIST = 6   # value: var of "persist $var"
+CYCLE = 7     # value: var of "$var = 0,1"
+KEY = 8       # value: bound key of "key = ..."
+RUN = 9       # value: target of "run = ..."
+OTHER = 10
+
+COMPONENT_RE = re.compile(r"TextureOverrideComponent(\d+)$", re.IGNORECASE)
+COMPONENT_HEADER_RE = re.compile(r"\[TextureOverrideComponent(\d+)\]", re.IGNORECASE)
+DRAW_RE = re.compile(r"drawindexed\s*=\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*$", re.IGNORECASE)
+DRAW_PARAMS_RE = re.compile(r"(\d+)\s*,\s*(\d+)\s*,\s*(\d+)")
+IF_RE = re.compile(r"if\b", re.IGNORECASE)
+TOGGLE_IF_RE = re.compile(r"if\s+\$(\w+)\s*==\s*0\s*$", re.IGNORECASE)
+USED_VAR_RE = re.compile(r"\bif\s+\$(\w+)\s*==\s*0\b", re.IGNORECASE)
+PERSIST_RE = re.compile(r"persist\s+\$(\w+)")
+CYCLE_RE = re.compile(r"\$(\w+)\s*=\s*0,1\b")
+KEY_RE = re.compile(r"key\s*=\s*(.*)$", re.IGNORECASE)
+KEY_SECTION_RE = re.compile(r"\[Key(\w+)\]", re.IGNORECASE)
+RUN_RE = re.compile(r"run\s*=\s*(.*)$", re.IGNORECASE)
+SHADER_SECTION_RE = re.compile(r"CustomShaderTransparency(\d+)$", re.IGNORECASE)
+
+
+def classify(s):
+    """(kind, value) of the stripped line `s`."""
+    if not s:
+        return BLANK, None
+
+    c = s[0]
+    if c == "[" and s[-1] == "]":
+        return SECTION, s[1:-1]
+    if c == ";":
+        return COMMENT, None
+
+    low = s.lower()
+    if "drawindexed" in low:
+        m = DRAW_RE.match(s)
+        return DRAW, (int(m.group(1)), int(m.group(2)), int(m.group(3))) if m else None
+    if c in "iI" and IF_RE.match(s):
+        m = TOGGLE_IF_RE.match(s)
+        return IF, m.group(1) if m else None
+    if low == "endif":
+        return ENDIF, None
+    if "persist" in low:
+        m = PERSIST_RE.search(s)
+        if m:
+            return PERSIST, m.group(1)
+    if "0,1" in s:
+        m = CYCLE_RE.search(s)
+        if m:
+            return CYCLE, m.group(1)
+    if c in "kK":
+        m = KEY_RE.match(s)
+        if m:
+            return KEY, m.group(1).strip()
+    if c in "rR":
+        m = RUN_RE.match(s)
+        if m:
+            return RUN, m.group(1).strip()
+    return OTHER, None
+
+
+def component_number(name):
+    """N of a "TextureOverrideComponentN" section name, otherwise None."""
+    if name[:1] not in ("T", "t"):
+        return None
+    m = COMPONENT_RE.match(name)
+    return int(m.group(1)) if m else None
+
+
+def component_header(s):
+    """N if the stripped line `s` starts with "[TextureOverrideComponentN]",
+    otherwise None."""
+    if s[:2] not in ("[T", "[t"):
+        return None
+    m = COMPONENT_HEADER_RE.match(s)
+    return int(m.group(1)) if m else None
+
+
+def draw_params(s):
+    """(a, b, c) of a stripped "drawindexed = a, b, c" line, otherwise None."""
+    if s[:1] not in ("d", "D"):
+        return None
+    m = DRAW_RE.match(s)
+    return (int(m.group(1)), int(m.group(2)), int(m.group(3))) if m else None
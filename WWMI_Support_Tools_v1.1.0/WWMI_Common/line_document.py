@@ -0,0 +1,286 @@
+"""The lines of a mod.ini as a piece table, for editing in place.
+
+The list the lines were read into is never changed or copied (it may be
+shared with other tools, see shared_document). The document is a sequence
+of pieces, runs of lines taken from that list or from a list of added
+lines, kept in a balanced tree (a treap) that knows the line count of every
+subtree. Finding a line, replacing a range and resolving a handle each walk
+one path of the tree, so they cost O(log p) for p pieces; an edit adds at
+most three pieces. Nothing depends on the length of the file.
+
+A LineHandle stays on its line while other lines are edited around it;
+index() gives its current position, or None once the line is replaced.
+"""
+
+import random
+
+
+class LineHandle:
+    __slots__ = ("node", "pos")
+
+    def __init__(self, node, pos):
+        self.node = node  # piece holding the line, None once it is gone
+        self.pos = pos    # index of the line in the piece's buffer
+
+    @property
+    def alive(self):
+        return self.node is not None
+
+
+class _Piece:
+    __slots__ = ("buf", "start", "stop", "left", "right", "parent", "prio", "size", "handles")
+
+    def __init__(self, buf, start, stop):
+        self.buf = buf
+        self.start = start
+        self.stop = stop
+        self.left = None
+        self.right = None
+        self.parent = None
+        self.prio = random.random()
+        self.size = stop - start  # lines in this subtree
+        self.handles = None
+
+
+def _size(node):
+    return node.size if node is not None else 0
+
+
+def _update(node):
+    left, right = node.left, node.right
+    node.size = node.stop - node.start
+    if left is not None:
+        node.size += left.size
+        left.parent = node
+    if right is not None:
+        node.size += right.size
+        right.parent = node
+
+
+def _merge(a, b):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    if a.prio > b.prio:
+        a.right = _merge(a.right, b)
+        _update(a)
+        return a
+    b.left = _merge(a, b.left)
+    _update(b)
+    return b
+
+
+def _split(node, k):
+    """(first k lines, the rest) of the subtree `node`; a piece that
+    straddles the cut is split in two."""
+    if node is None:
+        return None, None
+    left = _size(node.left)
+    if k <= left:
+        a, b = _split(node.left, k)
+        node.left = b
+        _update(node)
+        return a, node
+    length = node.stop - node.start
+    if k >= left + length:
+        a, b = _split(node.right, k - left - length)
+        node.right = a
+        _update(node)
+        return node, b
+
+    cut = node.start + k - left
+    tail = _Piece(node.buf, cut, node.stop)
+    node.stop = cut
+    if node.handles:
+        tail.handles = [h for h in node.handles if h.pos >= cut]
+        node.handles = [h for h in node.handles if h.pos < cut]
+        for h in tail.handles:
+            h.node = tail
+    rest = node.right
+    node.right = None
+    _update(node)
+    return node, _merge(tail, rest)
+
+
+def _walk(node):
+    """The pieces of a subtree, in order."""
+    stack = []
+    while stack or node is not None:
+        while node is not None:
+            stack.append(node)
+            node = node.left
+        node = stack.pop()
+        yield node
+        node = node.right
+
+
+def _pieces(node, start, stop, out):
+    """Append (buf, start, stop) of the pieces holding lines[start:stop] of
+    the subtree `node` to `out`."""
+    while node is not None and start < stop:
+        left = _size(node.left)
+        if start < left:
+            _pieces(node.left, start, min(stop, left), out)
+        length = node.stop - node.start
+        s = max(start - left, 0)
+        e = min(stop - left, length)
+        if s < e:
+            out.append((node.buf, node.start + s, node.start + e))
+        start = max(start - left - length, 0)
+        stop -= left + length
+        node = node.right
+
+
+def _clone(node):
+    if node is None:
+        return None
+    copy = _Piece(node.buf, node.start, node.stop)
+    copy.prio = node.prio
+    copy.left = _clone(node.left)
+    copy.right = _clone(node.right)
+    _update(copy)
+    return copy
+
+
+class LineDocument:
+    def __init__(self, lines=()):
+        self.base = lines if isinstance(lines, list) else list(lines)
+        self._added = []
+        self._root = _Piece(self.base, 0, len(self.base)) if self.base else None
+
+    def __len__(self):
+        return _size(self._root)
+
+    def __iter__(self):
+        for node in _walk(self._root):
+            yield from node.buf[node.start:node.stop]
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            start, stop, step = idx.indices(len(self))
+            if step != 1:
+                return self.tolist()[idx]
+            return self._range(start, stop)
+        node, pos = self._find(idx)
+        return node.buf[pos]
+
+    def _find(self, idx):
+        """(piece, buffer index) of line `idx`."""
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError("line index out of range")
+        node = self._root
+        while True:
+            left = _size(node.left)
+            if idx < left:
+                node = node.left
+                continue
+            idx -= left
+            if idx < node.stop - node.start:
+                return node, node.start + idx
+            idx -= node.stop - node.start
+            node = node.right
+
+    def _range(self, start, stop):
+        pieces = []
+        _pieces(self._root, start, stop, pieces)
+        out = []
+        for buf, s, e in pieces:
+            out += buf[s:e]
+        return out
+
+    def tolist(self):
+        """The lines as a list; the original list itself (not to be changed)
+        while no edit was made."""
+        root = self._root
+        if root is not None and root.buf is self.base and root.size == len(self.base) == root.stop - root.start:
+            return self.base
+        return self._range(0, len(self))
+
+    def copy(self):
+        """A document with the same lines, edited independently of this one
+        (handles stay with this one). Costs O(p)."""
+        doc = LineDocument(self.base)
+        doc._root = _clone(self._root)
+        return doc
+
+    def changes(self):
+        """[(start, end, new_lines)] turning the original lines into the
+        document, in order. Original lines are only ever dropped, never
+        moved, so they are read straight off the pieces."""
+        changes = []
+        pos = 0
+        new = []
+        for node in _walk(self._root):
+            buf, s, e = node.buf, node.start, node.stop
+            if buf is not self.base:
+                new.extend(buf[s:e])
+                continue
+            if s != pos or new:
+                changes.append((pos, s, new))
+                new = []
+            pos = e
+        if pos != len(self.base) or new:
+            changes.append((pos, len(self.base), new))
+        return changes
+
+    # ---------------- HANDLES ----------------
+
+    def handle(self, idx):
+        """A LineHandle on line `idx`."""
+        node, pos = self._find(idx)
+        h = LineHandle(node, pos)
+        if node.handles is None:
+            node.handles = []
+        node.handles.append(h)
+        return h
+
+    def index(self, handle):
+        """Current index of the line `handle` is on, or None if it was
+        replaced or deleted."""
+        node = handle.node
+        if node is None:
+            return None
+        idx = _size(node.left) + handle.pos - node.start
+        while node.parent is not None:
+            parent = node.parent
+            if parent.right is node:
+                idx += _size(parent.left) + parent.stop - parent.start
+            node = parent
+        return idx
+
+    # ---------------- EDITING ----------------
+
+    def replace(self, start, end, new_lines):
+        """Replace lines[start:end] with new_lines; start == end inserts."""
+        if start < 0 or start > end or end > len(self):
+            raise IndexError(f"bad line range {start}:{end}")
+        head, rest = _split(self._root, start)
+        gone, tail = _split(rest, end - start)
+        for node in _walk(gone):
+            for h in node.handles or ():
+                h.node = None
+        if new_lines:
+            at = len(self._added)
+            self._added.extend(new_lines)
+            head = _merge(head, _Piece(self._added, at, len(self._added)))
+        self._root = _merge(head, tail)
+        if self._root is not None:
+            self._root.parent = None
+
+    def apply_edits(self, edits):
+        """Apply (start, end, new_lines) edits as line_edits.apply_edits
+        would: all refer to the lines before any of them is made. They are
+        made last to first, each in O(log p)."""
+        edits = sorted(edits, key=lambda e: (e[0], e[1]))
+        pos = 0
+        for start, end, _ in edits:
+            if start < pos:
+                raise ValueError(f"overlapping edit at line {start + 1}")
+            if end > len(self) or start > end:
+                raise IndexError(f"bad line range {start}:{end}")
+            pos = end
+        for start, end, new in reversed(edits):
+            self.replace(start, end, new)
@@ -0,0 +1,80 @@
+"""Positional line edits applied in a single streaming merge.
+
+An edit is a (start, end, new_lines) tuple meaning "replace lines[start:end]
+with new_lines"; start == end is a pure insertion.
+"""
+
+import bisect
+
+
+def apply_edits(lines, edits):
+    """Return a new list with all edits applied.
+
+    Edits refer to positions in the original `lines` and must not overlap;
+    insertions at the same position keep their given order.
+    """
+    out = []
+    pos = 0
+    for start, end, new in sorted(edits, key=lambda e: (e[0], e[1])):
+        if start < pos:
+            raise ValueError(f"overlapping edit at line {start + 1}")
+        out.extend(lines[pos:start])
+        out.extend(new)
+        pos = end
+    out.extend(lines[pos:])
+    return out
+
+
+class LineDelta:
+    """Maps line indices from before a series of edits to after them.
+
+    Built from the same edit tuples passed to apply_edits; deltas of
+    consecutive edit passes are chained with then().
+    """
+
+    def __init__(self, edits=()):
+        self._stages = []
+        if edits:
+            self._stages.append(_build_stage(edits))
+
+    def then(self, other):
+        chained = LineDelta()
+        chained._stages = self._stages + other._stages
+        return chained
+
+    def map(self, idx):
+        """New index of line `idx`, or None if it was replaced or deleted."""
+        for stage in self._stages:
+            idx = _map(stage, idx, False)
+            if idx is None:
+                return None
+        return idx
+
+    def locate(self, idx):
+        """New index of line `idx`, or of the first line of whatever replaced it."""
+        for stage in self._stages:
+            idx = _map(stage, idx, True)
+        return idx
+
+
+def _build_stage(edits):
+    starts = []
+    ends = []
+    shifts = []  # cumulative line shift after each edit
+    total = 0
+    for start, end, new in sorted(edits, key=lambda e: (e[0], e[1])):
+        total += len(new) - (end - start)
+        starts.append(start)
+        ends.append(end)
+        shifts.append(total)
+    return starts, ends, shifts
+
+
+def _map(stage, idx, locate):
+    starts, ends, shifts = stage
+    k = bisect.bisect_right(ends, idx)  # edits that end at or before idx
+    before = shifts[k - 1] if k else 0
+    if k < len(starts) and starts[k] <= idx:
+        # idx lies inside the lines replaced by edit k
+        return starts[k] + before if locate else None
+    return idx + before
@@ -0,0 +1,244 @@
+"""Opt-in timing of the scan and apply phases.
+
+Off unless WWMI_PROFILE names a directory (or a tool is started with
+--profile DIR, which sets it). Each scan, apply or batch file then writes
+
+    <operation>-<time>-<pid>-<n>.phases.json     per-phase seconds and line counts
+    <operation>-<time>-<pid>-<n>.speedscope.json  the same phases for speedscope.app
+
+WWMI_PROFILE_WITH (or --profile-with) is a comma separated list adding
+"alloc" (tracemalloc allocation and peak per phase, slow) and "cprofile"
+(a <...>.prof file of the whole operation, for pstats or snakeviz).
+Worker processes of batch mode inherit the environment, so they profile too.
+
+    python -m WWMI_Common.profiling DIR    total time per phase over all runs in DIR
+
+Code marks an operation with session() and its steps with phase(); both do
+nothing when profiling is off.
+"""
+
+import argparse
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+OPTIONS = ("alloc", "cprofile")
+
+_state = threading.local()  # .session of the running operation, per thread
+_counter = [0]
+
+
+def configure(directory, options=()):
+    """Turn profiling on for this process and the processes it starts."""
+    os.environ["WWMI_PROFILE"] = os.path.abspath(directory)
+    os.environ["WWMI_PROFILE_WITH"] = ",".join(options)
+
+
+def add_profile_arguments(parser):
+    parser.add_argument("--profile", metavar="DIR",
+                        help="write per-phase timings of every scan and apply to DIR")
+    parser.add_argument("--profile-with", default="", metavar="alloc,cprofile",
+                        help="also record allocations and/or a cProfile dump")
+
+
+def profile_from_args(args):
+    if args.profile:
+        options = [o.strip() for o in args.profile_with.split(",") if o.strip()]
+        for o in options:
+            if o not in OPTIONS:
+                raise SystemExit(f"--profile-with: unknown option {o!r}")
+        configure(args.profile, options)
+
+
+class _Session:
+    def __init__(self, operation, directory, options, info):
+        self.operation = operation
+        self.directory = directory
+        self.info = info
+        self.alloc = "alloc" in options
+        self.profiler = cProfile.Profile() if "cprofile" in options else None
+        self.stack = []    # open phase records
+        self.records = []  # every phase, in start order
+        self.started = time.time()
+        self.t0 = time.perf_counter()
+        self.own_tracing = False
+
+    def open(self, name, info):
+        rec = {"name": name, "depth": len(self.stack),
+               "start": time.perf_counter() - self.t0, **info}
+        if self.alloc:
+            current, peak = tracemalloc.get_traced_memory()
+            if self.stack:
+                parent = self.stack[-1]
+                parent["_peak"] = max(parent["_peak"], peak)
+            tracemalloc.reset_peak()
+            rec["_current"] = current
+            rec["_peak"] = current
+        self.stack.append(rec)
+        self.records.append(rec)
+        return rec
+
+    def close(self, rec):
+        rec["seconds"] = time.perf_counter() - self.t0 - rec["start"]
+        self.stack.pop()
+        if self.alloc:
+            current, peak = tracemalloc.get_traced_memory()
+            peak = max(rec.pop("_peak"), peak)
+            rec["alloc_kib"] = round((current - rec.pop("_current")) / 1024, 1)
+            rec["peak_kib"] = round(peak / 1024, 1)
+            if self.stack:
+                parent = self.stack[-1]
+                parent["_peak"] = max(parent["_peak"], peak)
+
+    def start(self):
+        if self.alloc and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.own_tracing = True
+        if self.profiler is not None:
+            self.profiler.enable()
+
+    def finish(self):
+        if self.profiler is not None:
+            self.profiler.disable()
+        if self.own_tracing:
+            tracemalloc.stop()
+        seconds = time.perf_counter() - self.t0
+
+        _counter[0] += 1
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(self.started))
+        base = os.path.join(
+            self.directory, f"{self.operation}-{stamp}-{os.getpid()}-{_counter[0]}"
+        )
+        os.makedirs(self.directory, exist_ok=True)
+
+        with open(base + ".phases.json", "w", encoding="utf-8") as f:
+            json.dump({
+                "operation": self.operation,
+                "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+                "seconds": seconds,
+                **self.info,
+                "phases": self.records,
+            }, f, indent=1)
+
+        with open(base + ".speedscope.json", "w", encoding="utf-8") as f:
+            json.dump(self.speedscope(seconds), f)
+
+        if self.profiler is not None:
+            self.profiler.dump_stats(base + ".prof")
+
+    def speedscope(self, seconds):
+        """The phases as a speedscope "evented" profile, in milliseconds."""
+        frames = []
+        frame_ids = {}
+        events = []
+        for rec in self.records:
+            fid = frame_ids.setdefault(rec["name"], len(frames))
+            if fid == len(frames):
+                frames.append({"name": rec["name"]})
+            events.append((rec["start"], 1, rec["depth"], fid))
+            events.append((rec["start"] + rec["seconds"], 0, -rec["depth"], fid))
+        # at equal times: closes before opens, inner closes and outer opens first
+        events.sort()
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "evented",
+                "name": self.operation,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": seconds * 1000,
+                "events": [
+                    {"type": "O" if kind else "C", "frame": fid, "at": at * 1000}
+                    for at, kind, _, fid in events
+                ],
+            }],
+            "exporter": "WWMI_Common.profiling",
+        }
+
+
+@contextmanager
+def _nothing():
+    yield
+
+
+@contextmanager
+def session(operation, **info):
+    """Profile one operation ("toggle.apply", ...). A session started inside
+    another one on the same thread is recorded as a phase of it."""
+    current = getattr(_state, "session", None)
+    if current is not None:
+        with phase(operation, **info):
+            yield
+        return
+
+    directory = os.environ.get("WWMI_PROFILE")
+    if not directory:
+        yield
+        return
+
+    options = [o.strip() for o in os.environ.get("WWMI_PROFILE_WITH", "").split(",")]
+    s = _Session(operation, directory, options, info)
+    _state.session = s
+    s.start()
+    try:
+        yield
+    finally:
+        _state.session = None
+        s.finish()
+
+
+def phase(name, **info):
+    """Time one step of the current session; `info` (line counts, say) is
+    stored with it."""
+    s = getattr(_state, "session", None)
+    if s is None:
+        return _nothing()
+    return _phase(s, name, info)
+
+
+@contextmanager
+def _phase(s, name, info):
+    rec = s.open(name, info)
+    try:
+        yield
+    finally:
+        s.close(rec)
+
+
+def summarize(directory):
+    """{phase name: [runs, total seconds, max seconds]} over the
+    .phases.json files in `directory`."""
+    totals = {}
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".phases.json"):
+            continue
+        with open(os.path.join(directory, name), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        for rec in [{"name": data["operation"], "seconds": data["seconds"]}] + data["phases"]:
+            t = totals.setdefault(rec["name"], [0, 0.0, 0.0])
+            t[0] += 1
+            t[1] += rec["seconds"]
+            t[2] = max(t[2], rec["seconds"])
+    return totals
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sum up the phase timings written by --profile")
+    parser.add_argument("directory")
+    args = parser.parse_args(argv)
+
+    totals = summarize(args.directory)
+    print(f"{'phase':<28}{'runs':>6}{'total s':>12}{'max s':>10}")
+    for name, (runs, total, worst) in sorted(totals.items(), key=lambda kv: -kv[1][1]):
+        print(f"{name:<28}{runs:>6}{total:>12.3f}{worst:>10.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""Crash-safe file replacement.
+
+New contents go to a temp file in the same directory, are fsynced and then
+renamed over the original, so a crash leaves either the old or the new file,
+never a truncated one. The previous version is kept as the backup by giving
+its data a second name (hardlink, or reflink on filesystems that support
+it) instead of copying the bytes; a plain copy is only the last resort.
+"""
+
+import contextlib
+import os
+import shutil
+import sys
+import tempfile
+
+
+@contextlib.contextmanager
+def atomic_open(path, backup=None, encoding="utf-8", errors=None, newline=None):
+    """Open a temp file for writing that replaces `path` when the block exits
+    cleanly. If the block raises, `path` and `backup` are left untouched.
+    `backup`, if given, receives the contents `path` had before.
+    encoding=None opens the temp file in binary mode; `errors` and `newline`
+    are passed to open() for text mode."""
+    directory, name = os.path.split(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(prefix=f".{name}.", suffix=".tmp", dir=directory)
+    text = {"encoding": encoding, "errors": errors, "newline": newline} if encoding else {}
+    try:
+        with os.fdopen(fd, "w" if encoding else "wb", **text) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        if backup is not None:
+            keep_backup(path, backup)
+        if os.path.exists(path):
+            shutil.copymode(path, tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        _remove(tmp)
+        raise
+    _fsync_dir(directory)
+
+
+def keep_backup(path, backup):
+    """Make `backup` hold the current contents of `path`, without copying
+    them if the filesystem allows. Only safe for files that are replaced
+    (as atomic_open does) rather than rewritten in place."""
+    tmp = f"{backup}.{os.getpid()}.tmp"
+    _remove(tmp)
+    try:
+        os.link(path, tmp)
+    except (OSError, AttributeError):
+        if not _reflink(path, tmp):
+            shutil.copy2(path, tmp)
+    try:
+        os.replace(tmp, backup)
+    except BaseException:
+        _remove(tmp)
+        raise
+
+
+def _reflink(src, dst):
+    """Copy-on-write clone of src (btrfs, xfs and friends). False if the
+    platform or filesystem does not support it."""
+    if not sys.platform.startswith("linux"):
+        return False
+    import fcntl
+
+    FICLONE = 0x40049409
+    try:
+        with open(src, "rb") as s, open(dst, "wb") as d:
+            fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+        shutil.copystat(src, dst)
+        return True
+    except OSError:
+        _remove(dst)
+        return False
+
+
+def _fsync_dir(directory):
+    # makes the rename itself durable; not possible (or needed) on Windows
+    if os.name == "nt":
+        return
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -0,0 +1,151 @@
+"""Persistent cache of scan results.
+
+Results are stored by content hash, so identical files share one entry, and
+each scanned path remembers the (size, mtime) it had when it was hashed so
+an unchanged file is served from the cache without being read at all.
+Old entries are evicted least-recently-used first once the cache grows past
+its size cap.
+
+Set WWMI_NO_CACHE=1 to disable the cache and WWMI_CACHE_DIR to move it.
+"""
+
+import hashlib
+import os
+import pickle
+import sys
+
+from WWMI_Common.text_io import mapped
+
+CACHE_VERSION = 2
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def default_cache_dir():
+    env = os.environ.get("WWMI_CACHE_DIR")
+    if env:
+        return env
+    if os.name == "nt":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser(r"~\AppData\Local")
+    elif sys.platform == "darwin":
+        base = os.path.expanduser("~/Library/Caches")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "WWMI_Support_Tools", "scan_cache")
+
+
+def content_digest(data):
+    return hashlib.blake2b(data, digest_size=20).hexdigest()
+
+
+class ScanCache:
+    def __init__(self, namespace, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.namespace = f"{namespace}.{CACHE_VERSION}"
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = max_bytes
+        self.enabled = not os.environ.get("WWMI_NO_CACHE")
+
+    def get_or_scan(self, path, scan, data=None):
+        """Return scan(data) for the file at `path`, from the cache if possible.
+
+        `scan` receives the raw file bytes (a memory map for large files, only
+        valid during the call) and must return picklable plain data.
+        Pass `data` when the caller has already read the file.
+        """
+        if not self.enabled:
+            if data is None:
+                with mapped(path) as data:
+                    return scan(data)
+            return scan(data)
+
+        st = os.stat(path)
+        ref_path = self._ref_path(path)
+
+        ref = self._load(ref_path)
+        if ref is not None and ref[:2] == (st.st_size, st.st_mtime_ns):
+            hit = self._load(self._entry_path(ref[2]))
+            if hit is not None:
+                return hit[0]
+
+        if data is None:
+            with mapped(path) as data:
+                return self._scan(st, ref_path, scan, data)
+        return self._scan(st, ref_path, scan, data)
+
+    def _scan(self, st, ref_path, scan, data):
+        digest = content_digest(data)
+        entry_path = self._entry_path(digest)
+
+        hit = self._load(entry_path)
+        if hit is not None:
+            payload = hit[0]
+        else:
+            payload = scan(data)
+            self._store(entry_path, (payload,))
+        self._store(ref_path, (st.st_size, st.st_mtime_ns, digest))
+        self._evict()
+        return payload
+
+    def clear(self):
+        for entry in self._entries():
+            _remove(entry.path)
+
+    # ---------------- STORAGE ----------------
+
+    def _entry_path(self, digest):
+        return os.path.join(self.directory, f"{self.namespace}-{digest}.pkl")
+
+    def _ref_path(self, path):
+        key = hashlib.blake2b(os.path.abspath(path).encode("utf-8"), digest_size=16).hexdigest()
+        return os.path.join(self.directory, f"{self.namespace}-ref-{key}.pkl")
+
+    def _load(self, path):
+        try:
+            with open(path, "rb") as f:
+                obj = pickle.load(f)
+            os.utime(path)  # LRU: touched on every hit
+            return obj
+        except Exception:
+            # missing, unreadable or written by another version
+            return None
+
+    def _store(self, path, obj):
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tmp, "wb") as f:
+                pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        except OSError:
+            _remove(tmp)
+
+    def _entries(self):
+        try:
+            return [e for e in os.scandir(self.directory) if e.name.endswith(".pkl")]
+        except OSError:
+            return []
+
+    def _evict(self):
+        entries = []
+        total = 0
+        for e in self._entries():
+            try:
+                st = e.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, e.path))
+            total += st.st_size
+        if total <= self.max_bytes:
+            return
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            _remove(path)
+            total -= size
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
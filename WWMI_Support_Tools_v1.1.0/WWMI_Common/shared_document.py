@@ -0,0 +1,65 @@
+"""One parsed copy of the mod.ini the launcher's tools are working on.
+
+Tools opened from the launcher run in one process and are given the same
+SharedDocument. The lines of a file, and its IniIndex, are read and built
+once per version of the file and handed to every tool read-only; the tools
+build edited copies and never change them in place. Picking a file in one
+tool offers it to the other open tools.
+"""
+
+import os
+import threading
+
+from WWMI_Common.file_watch import file_signature
+from WWMI_Common.ini_index import IniIndex
+from WWMI_Common.text_io import decode_text, read_lines
+
+
+class SharedDocument:
+    def __init__(self):
+        self.path = None
+        self.signature = None
+        self.lines = None
+        self.format = None
+        self._index = None
+        self._lock = threading.Lock()  # read() runs on the tools' worker threads
+        self._listeners = []
+
+    def read(self, path, data=None):
+        """(lines, TextFormat) of `path`, read again only if the file changed
+        since the last call. `data` are the bytes of the file if the caller
+        has them already; they are decoded instead of reading it again."""
+        path = os.path.abspath(path)
+        with self._lock:
+            signature = file_signature(path)
+            if self.lines is None or path != self.path or signature != self.signature:
+                self.lines, self.format = read_lines(path) if data is None else decode_text(data)
+                self.path = path
+                self.signature = signature
+                self._index = None
+            return self.lines, self.format
+
+    def index_for(self, lines):
+        """IniIndex of `lines`, shared if they are the document's lines."""
+        with self._lock:
+            if lines is not self.lines:
+                return IniIndex(lines)
+            if self._index is None:
+                self._index = IniIndex(lines)
+            return self._index
+
+    # ---------------- SELECTION ----------------
+
+    def subscribe(self, on_select):
+        """Call on_select(path) when another tool picks a file."""
+        self._listeners.append(on_select)
+
+    def unsubscribe(self, on_select):
+        if on_select in self._listeners:
+            self._listeners.remove(on_select)
+
+    def select(self, path, source=None):
+        """Offer `path` to every subscriber except `source` (main thread only)."""
+        for on_select in list(self._listeners):
+            if on_select != source:
+                on_select(path)
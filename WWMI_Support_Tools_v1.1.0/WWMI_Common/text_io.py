@@ -0,0 +1,220 @@
+"""Reading and rewriting mod.ini text.
+
+The encoding is sniffed from a bounded piece of the file: a BOM, else the
+first stretch with non-ASCII bytes in it within the first SNIFF_LIMIT bytes,
+which is utf-8 if it decodes as such and cp949 (files saved by Korean
+editors) if not; a file with none there is read as utf-8. The whole file is
+then decoded once. In utf-8 and the 8-bit encodings, bytes that do not fit
+are kept as surrogate escapes instead of being dropped, and rewrites go out
+in the same encoding and newline style, so comments survive a round trip
+byte for byte. UTF-16 cannot carry escaped bytes, so there a bad byte is an
+error on reading rather than on writing back.
+"""
+
+import codecs
+import contextlib
+import io
+import mmap
+import os
+
+from WWMI_Common.safe_write import atomic_open
+
+SNIFF_BYTES = 16 * 1024
+SNIFF_LIMIT = 1024 * 1024      # how far to look for the first non-ASCII bytes
+DECODE_BYTES = 1024 * 1024     # decode_text works in pieces of this size
+MMAP_BYTES = 8 * 1024 * 1024  # larger files are memory-mapped instead of read
+
+_BOMS = (
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+
+class TextFormat:
+    """Encoding and newline style of a text file."""
+
+    __slots__ = ("encoding", "newline")
+
+    def __init__(self, encoding="utf-8", newline=None):
+        self.encoding = encoding
+        self.newline = newline  # None: the platform default
+
+    def __eq__(self, other):
+        return isinstance(other, TextFormat) and (self.encoding, self.newline) == (other.encoding, other.newline)
+
+    def __repr__(self):
+        return f"TextFormat({self.encoding!r}, {self.newline!r})"
+
+    @property
+    def errors(self):
+        """Error handler for this encoding: bytes that do not decode are kept
+        as surrogate escapes, except in UTF-16, which cannot encode them
+        again and so does not accept them in the first place."""
+        return "strict" if self.encoding.startswith("utf-16") else "surrogateescape"
+
+    def open(self, path):
+        """Open `path` for reading text, lines ending in "\\n"."""
+        return open(path, "r", encoding=self.encoding, errors=self.errors)
+
+    def write_args(self):
+        """Keyword arguments for atomic_open to write text back in this format."""
+        return {"encoding": self.encoding, "errors": self.errors, "newline": self.newline}
+
+
+def sniff_format(prefix, sample=None):
+    """TextFormat of a file starting with the bytes `prefix`. The encoding
+    is judged from `sample`, the first stretch of the file with non-ASCII
+    bytes in it (default: the prefix itself)."""
+    encoding = None
+    for bom, name in _BOMS:
+        if prefix.startswith(bom):
+            encoding = name
+            break
+    if encoding is None:
+        try:
+            # final=False: a character cut off at the end is fine
+            codecs.getincrementaldecoder("utf-8")().decode(prefix if sample is None else sample, False)
+            encoding = "utf-8"
+        except UnicodeDecodeError:
+            encoding = "cp949"
+
+    # decode only as far as the first line break
+    decoder = codecs.getincrementaldecoder(encoding)("replace")
+    head = ""
+    for i in range(0, len(prefix), 1024):
+        head += decoder.decode(prefix[i:i + 1024], False)
+        if "\n" in head:
+            break
+    lf = head.find("\n")
+    if lf > 0 and head[lf - 1] == "\r":
+        newline = "\r\n"
+    elif lf >= 0:
+        newline = "\n"
+    elif "\r" in head:
+        newline = "\r"
+    else:
+        newline = None
+    return TextFormat(encoding, newline)
+
+
+def _sniff_chunks(chunks):
+    """sniff_format over an iterator of consecutive byte chunks, of which
+    no more than SNIFF_LIMIT bytes are looked at."""
+    prefix = next(chunks, b"")
+    sample = prefix
+    seen = len(prefix)
+    # ASCII is the same in both encodings, so look on for the first chunk
+    # that is not; it starts on a character boundary
+    while sample.isascii():
+        sample = next(chunks, None) if seen < SNIFF_LIMIT else None
+        if sample is None:
+            sample = b""  # all ASCII so far, so utf-8
+            break
+        seen += len(sample)
+    return sniff_format(prefix, sample)
+
+
+# path -> (size, mtime_ns, TextFormat) of files already sniffed
+_formats = {}
+
+
+def file_format(path):
+    """TextFormat of the file at `path`, remembered while the file is unchanged."""
+    st = os.stat(path)
+    known = _formats.get(path)
+    if known is not None and known[:2] == (st.st_size, st.st_mtime_ns):
+        return known[2]
+    with open(path, "rb") as f:
+        fmt = _sniff_chunks(iter(lambda: f.read(SNIFF_BYTES), b""))
+    _formats[path] = (st.st_size, st.st_mtime_ns, fmt)
+    return fmt
+
+
+@contextlib.contextmanager
+def mapped(path):
+    """The bytes of `path` as a buffer, for hashing; large files are
+    memory-mapped rather than copied into memory. The buffer is only valid
+    inside the block."""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size < MMAP_BYTES:
+            yield f.read()
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            yield m
+
+
+def decode_lines(data, encoding="utf-8", errors="strict"):
+    """Split raw bytes into lines exactly like open(..., "r").readlines()."""
+    return io.TextIOWrapper(io.BytesIO(data), encoding=encoding, errors=errors).readlines()
+
+
+def decode_text(data):
+    """(lines, TextFormat) of the raw bytes `data` of a whole file (bytes or
+    a memory map); lines are split like readlines() does. The format is
+    sniffed from the start of the buffer and the buffer is decoded once,
+    piece by piece, without copying it."""
+    with memoryview(data) as view:  # released before a memory map is closed
+        fmt = _sniff_chunks(bytes(view[i:i + SNIFF_BYTES]) for i in range(0, len(view), SNIFF_BYTES))
+        # newlines are translated as open() does, a "\r\n" split between
+        # two pieces included
+        decoder = io.IncrementalNewlineDecoder(
+            codecs.getincrementaldecoder(fmt.encoding)(fmt.errors), translate=True)
+        lines = []
+        tail = ""
+        for i in range(0, len(view), DECODE_BYTES):
+            text = tail + decoder.decode(view[i:i + DECODE_BYTES], i + DECODE_BYTES >= len(view))
+            lines += io.StringIO(text).readlines()
+            # the last line goes on in the next piece
+            tail = lines.pop() if lines and not lines[-1].endswith("\n") else ""
+    if tail:
+        lines.append(tail)
+    return lines, fmt
+
+
+def read_lines(path):
+    """(lines, TextFormat) of the file at `path`. The file is decoded once,
+    as it is read, without holding its bytes in memory."""
+    fmt = file_format(path)
+    with fmt.open(path) as f:
+        return f.readlines(), fmt
+
+
+def write_lines(path, lines, fmt=None, backup=None):
+    """Replace `path` atomically with `lines`, in `fmt` (default: the format
+    the file has now)."""
+    if fmt is None:
+        fmt = file_format(path) if os.path.exists(path) else TextFormat()
+    with atomic_open(path, backup, **fmt.write_args()) as f:
+        f.writelines(lines)
+
+
+def rewrite_file(path, rewrite, backup=None, progress=None, every=65536):
+    """Stream the file at `path` through rewrite(lines) and replace it
+    atomically with the result (see safe_write.atomic_open).
+
+    `rewrite` receives a lazy iterator over the input lines and returns an
+    iterable of output lines, written in the encoding and newline style of
+    the input; memory use does not grow with the file. progress(text) is
+    called every `every` lines; an exception from it (or from rewrite)
+    leaves the original untouched.
+    """
+    fmt = file_format(path)
+    with atomic_open(path, backup, **fmt.write_args()) as dst, fmt.open(path) as src:
+        dst.writelines(rewrite(_counted(src, progress, every)))
+
+
+def scan_file(path, scan):
+    """Return scan(lines) for a lazy iterator over the lines of `path`."""
+    with file_format(path).open(path) as f:
+        return scan(f)
+
+
+def _counted(lines, progress, every):
+    if progress is None:
+        yield from lines
+        return
+    for n, line in enumerate(lines, 1):
+        if n % every == 0:
+            progress(f"Applying... {n:,} lines")
+        yield line
@@ -0,0 +1,189 @@
+"""Virtualized list widget for very long drawindexed listings.
+
+Only the rows that fit in the window are inserted into the underlying
+tk.Listbox; row text is produced on demand and the selection is kept as a
+set of model indices, so refreshing costs the same for 100 or 100k rows.
+"""
+
+import tkinter as tk
+import tkinter.font as tkfont
+
+
+class VirtualListbox(tk.Frame):
+    def __init__(self, master, row_text, width=100, height=20, selectmode="extended"):
+        super().__init__(master)
+        self.row_text = row_text      # callable(model_index) -> str
+        self.count = 0
+        self.top = 0                  # model index of the first visible row
+        self.rows = height            # rows that fit in the window
+        self.selected = set()
+        self.anchor = None
+        self.active = None
+        self.multi = selectmode in ("extended", "multiple")
+
+        self.listbox = tk.Listbox(self, width=width, height=height,
+                                  selectmode="extended", activestyle="none",
+                                  exportselection=False)
+        self.listbox.pack(side="left", fill="both", expand=True)
+
+        self.scroll = tk.Scrollbar(self, command=self._on_scrollbar)
+        self.scroll.pack(side="left", fill="y")
+
+        lb = self.listbox
+        lb.bind("<Configure>", self._on_configure)
+        lb.bind("<Button-1>", self._on_click)
+        lb.bind("<Shift-Button-1>", self._on_shift_click)
+        lb.bind("<Control-Button-1>", self._on_ctrl_click)
+        lb.bind("<B1-Motion>", self._on_drag)
+        lb.bind("<MouseWheel>", self._on_wheel)
+        lb.bind("<Button-4>", lambda e: self._scroll_rows(-3))
+        lb.bind("<Button-5>", lambda e: self._scroll_rows(3))
+        lb.bind("<Up>", lambda e: self._move(-1, e))
+        lb.bind("<Down>", lambda e: self._move(1, e))
+        lb.bind("<Shift-Up>", lambda e: self._move(-1, e, extend=True))
+        lb.bind("<Shift-Down>", lambda e: self._move(1, e, extend=True))
+        lb.bind("<Prior>", lambda e: self._move(-self.rows, e))
+        lb.bind("<Next>", lambda e: self._move(self.rows, e))
+        lb.bind("<Control-a>", self._select_all)
+        for seq in ("<ButtonRelease-1>", "<Double-Button-1>", "<Home>", "<End>"):
+            lb.bind(seq, lambda e: "break")
+
+    # ---------------- MODEL ----------------
+
+    def set_count(self, count, keep_selection=False):
+        self.count = count
+        if keep_selection:
+            self.selected = {i for i in self.selected if i < count}
+        else:
+            self.selected.clear()
+            self.anchor = None
+            self.active = None
+        self.top = max(0, min(self.top, count - self.rows))
+        self.redraw()
+
+    def curselection(self):
+        return tuple(sorted(self.selected))
+
+    def selection_clear(self):
+        self.selected.clear()
+        self.redraw()
+
+    def see(self, index):
+        if index < self.top:
+            self.top = index
+        elif index >= self.top + self.rows:
+            self.top = index - self.rows + 1
+        self.redraw()
+
+    # ---------------- RENDER ----------------
+
+    def redraw(self):
+        lb = self.listbox
+        lb.delete(0, tk.END)
+        last = min(self.count, self.top + self.rows + 1)
+        for i in range(self.top, last):
+            lb.insert(tk.END, self.row_text(i))
+            if i in self.selected:
+                lb.selection_set(i - self.top)
+
+        if self.count:
+            self.scroll.set(self.top / self.count, min(1.0, (self.top + self.rows) / self.count))
+        else:
+            self.scroll.set(0.0, 1.0)
+
+    def _scroll_to(self, top):
+        top = max(0, min(top, self.count - self.rows))
+        if top != self.top:
+            self.top = top
+            self.redraw()
+
+    def _scroll_rows(self, n):
+        self._scroll_to(self.top + n)
+        return "break"
+
+    # ---------------- EVENTS ----------------
+
+    def _on_configure(self, event):
+        linespace = tkfont.Font(font=self.listbox.cget("font")).metrics("linespace")
+        rows = max(1, event.height // max(1, linespace))
+        if rows != self.rows:
+            self.rows = rows
+            self._scroll_to(self.top)
+            self.redraw()
+
+    def _on_scrollbar(self, action, *args):
+        if action == "moveto":
+            self._scroll_to(int(float(args[0]) * self.count))
+        elif action == "scroll":
+            n = int(args[0])
+            self._scroll_rows(n * self.rows if args[1] == "pages" else n)
+
+    def _on_wheel(self, event):
+        return self._scroll_rows(-3 if event.delta > 0 else 3)
+
+    def _index_at(self, y):
+        i = self.top + self.listbox.nearest(y)
+        return i if 0 <= i < self.count else None
+
+    def _on_click(self, event):
+        self.listbox.focus_set()
+        i = self._index_at(event.y)
+        if i is None:
+            return "break"
+        self.selected = {i}
+        self.anchor = self.active = i
+        self.redraw()
+        return "break"
+
+    def _on_shift_click(self, event):
+        i = self._index_at(event.y)
+        if i is None or not self.multi:
+            return self._on_click(event)
+        self._extend_to(i)
+        return "break"
+
+    def _on_ctrl_click(self, event):
+        i = self._index_at(event.y)
+        if i is None or not self.multi:
+            return self._on_click(event)
+        self.selected ^= {i}
+        self.anchor = self.active = i
+        self.redraw()
+        return "break"
+
+    def _on_drag(self, event):
+        if event.y < 0:
+            self._scroll_rows(-1)
+        elif event.y > self.listbox.winfo_height():
+            self._scroll_rows(1)
+        i = self._index_at(min(max(event.y, 0), self.listbox.winfo_height()))
+        if i is not None and self.multi:
+            self._extend_to(i)
+        return "break"
+
+    def _extend_to(self, i):
+        if self.anchor is None:
+            self.anchor = i
+        lo, hi = sorted((self.anchor, i))
+        self.selected = set(range(lo, hi + 1))
+        self.active = i
+        self.redraw()
+
+    def _move(self, step, event, extend=False):
+        if not self.count:
+            return "break"
+        cur = self.active if self.active is not None else self.top
+        i = max(0, min(self.count - 1, cur + step))
+        if extend and self.multi:
+            self._extend_to(i)
+        else:
+            self.selected = {i}
+            self.anchor = self.active = i
+        self.see(i)
+        return "break"
+
+    def _select_all(self, event):
+        if self.multi:
+            self.selected = set(range(self.count))
+            self.redraw()
+        return "break"
@@ -0,0 +1,173 @@
+"""Run blocking file work off the Tk main loop.
+
+The work function runs on a daemon thread and only talks to the UI through a
+queue that the main loop drains with after() polling, so Tk is never touched
+from the worker thread.
+"""
+
+import queue
+import threading
+from tkinter import messagebox
+
+
+class Cancelled(Exception):
+    """Raised inside the work function once the task has been cancelled."""
+
+
+def no_progress(text):
+    pass
+
+
+class Task:
+    """Handle given to the work function."""
+
+    def __init__(self):
+        self._cancel = threading.Event()
+        self._queue = queue.Queue()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def check(self):
+        if self._cancel.is_set():
+            raise Cancelled()
+
+    def progress(self, text):
+        """Report the current step. This is also where a cancel takes effect,
+        so work functions call it between steps that are safe to stop at."""
+        self.check()
+        self._queue.put(("progress", text))
+
+
+def run_in_background(root, work, on_done, on_error=None, on_progress=None, on_cancel=None, poll_ms=50):
+    """Start work(task) on a worker thread and return the Task.
+
+    The callbacks run on the Tk main loop: on_progress(text) while the work
+    runs, then exactly one of on_done(result), on_cancel() or on_error(exc).
+    Without on_error the exception is re-raised in the main loop.
+    """
+    task = Task()
+
+    def target():
+        try:
+            result = work(task)
+        except Cancelled:
+            task._queue.put(("cancel", None))
+        except Exception as e:
+            task._queue.put(("error", e))
+        else:
+            task._queue.put(("done", result))
+
+    def poll():
+        while True:
+            try:
+                kind, arg = task._queue.get_nowait()
+            except queue.Empty:
+                root.after(poll_ms, poll)
+                return
+            if kind == "progress":
+                if on_progress is not None:
+                    on_progress(arg)
+            elif kind == "done":
+                on_done(arg)
+                return
+            elif kind == "cancel":
+                if on_cancel is not None:
+                    on_cancel()
+                return
+            else:
+                if on_error is None:
+                    raise arg
+                on_error(arg)
+                return
+
+    threading.Thread(target=target, daemon=True).start()
+    root.after(poll_ms, poll)
+    return task
+
+
+class TaskRunner:
+    """One background task at a time for a tool window.
+
+    While a task runs, `widgets` are disabled and `cancel_button` is enabled;
+    progress text goes to show_status(text) and errors to a message box.
+    The same goes while another runner holds this one (see hold).
+    """
+
+    def __init__(self, root, show_status, widgets=(), cancel_button=None):
+        self.root = root
+        self.show_status = show_status
+        self.widgets = list(widgets)
+        self.cancel_button = cancel_button
+        self.task = None
+        self.owner = None  # runner holding this one, see hold()
+
+    @property
+    def busy(self):
+        return self.task is not None or self.owner is not None
+
+    def run(self, work, on_done, on_cancel=None, on_error=None):
+        """Start work(task). Then on_done(result) is called, or on_cancel(),
+        or on_error(exc) after the error was shown."""
+        if self.busy:
+            return None
+
+        def finish(callback, *args):
+            self.task = None
+            self._set_busy(False)
+            if callback is not None:
+                callback(*args)
+
+        def cancelled():
+            self.show_status("Cancelled.")
+            finish(on_cancel)
+
+        def failed(e):
+            self.show_status("Failed.")
+            finish(messagebox.showerror, "Error", str(e))
+            if on_error is not None:
+                on_error(e)
+
+        self._set_busy(True)
+        self.task = run_in_background(
+            self.root,
+            work,
+            lambda result: finish(on_done, result),
+            on_error=failed,
+            on_progress=self.show_status,
+            on_cancel=cancelled,
+        )
+        return self.task
+
+    def cancel(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.show_status("Cancelling...")
+        elif self.owner is not None:
+            self.owner.cancel()
+
+    def hold(self, owner):
+        """Stay busy while `owner`, another TaskRunner, works on this tool's
+        behalf (the launcher's Apply All); Cancel cancels the owner's task.
+        Returns False if this runner is busy already."""
+        if self.busy:
+            return False
+        self.owner = owner
+        self._set_busy(True)
+        return True
+
+    def release(self):
+        """End a hold()."""
+        if self.owner is not None:
+            self.owner = None
+            self._set_busy(False)
+
+    def _set_busy(self, busy):
+        for w in self.widgets:
+            w.config(state="disabled" if busy else "normal")
+        if self.cancel_button is not None:
+            self.cancel_button.config(state="normal" if busy else "disabled")
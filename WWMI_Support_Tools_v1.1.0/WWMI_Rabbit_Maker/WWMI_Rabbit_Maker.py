@@ -1,368 +1,802 @@
-import os
-import re
-import tkinter as tk
-from tkinter import filedialog, messagebox, simpledialog
-
-
-class RabbitFXTool:
-    def __init__(self, root):
-        self.root = root
-        self.root.title("WWMI RabbitFX Maker")
-
-        self.ini_path = None
-        self.components = []
-        self.component_changes = {}
-
-        self._build_ui()
-
-    def _build_ui(self):
-        file_frame = tk.Frame(self.root)
-        file_frame.pack(fill="x", padx=10, pady=10)
-
-        tk.Label(file_frame, text="mod.ini path:").pack(side="left")
-
-        self.entry_path = tk.Entry(file_frame, width=60)
-        self.entry_path.pack(side="left", padx=5)
-
-        btn_browse = tk.Button(file_frame, text="Browse...", command=self.browse_ini)
-        btn_browse.pack(side="left")
-
-        btn_scan = tk.Button(file_frame, text="Scan", command=self.scan_components)
-        btn_scan.pack(side="left", padx=5)
-
-        list_frame = tk.Frame(self.root)
-        list_frame.pack(fill="both", expand=True, padx=10, pady=(0, 10))
-
-        tk.Label(list_frame, text="Components:").pack(anchor="w")
-
-        self.listbox = tk.Listbox(list_frame, height=10)
-        self.listbox.pack(fill="both", expand=True, side="left")
-
-        scrollbar = tk.Scrollbar(list_frame, orient="vertical", command=self.listbox.yview)
-        scrollbar.pack(side="right", fill="y")
-        self.listbox.config(yscrollcommand=scrollbar.set)
-
-        btn_frame = tk.Frame(self.root)
-        btn_frame.pack(fill="x", padx=10, pady=10)
-
-        btn_glow = tk.Button(btn_frame, text="Add Glow", command=self.add_glow)
-        btn_glow.pack(side="left")
-
-        btn_fx = tk.Button(btn_frame, text="Add FX", command=self.add_fx)
-        btn_fx.pack(side="left", padx=5)
-
-        btn_remove = tk.Button(btn_frame, text="Remove Glow/FX", command=self.remove_rabbitfx)
-        btn_remove.pack(side="left", padx=5)
-
-        btn_apply = tk.Button(btn_frame, text="Apply", command=self.apply_changes)
-        btn_apply.pack(side="right")
-
-        self.status_label = tk.Label(self.root, text="Select mod.ini and scan.", anchor="w")
-        self.status_label.pack(fill="x", padx=10, pady=(0, 10))
-
-    def browse_ini(self):
-        path = filedialog.askopenfilename(
-            title="Select mod.ini",
-            filetypes=[("INI files", "*.ini"), ("All files", "*.*")]
-        )
-        if path:
-            self.ini_path = path
-            self.entry_path.delete(0, tk.END)
-            self.entry_path.insert(0, path)
-            self.status_label.config(text=f"Selected: {path}")
-            self.scan_components()
-
-    def scan_components(self):
-        path = self.entry_path.get().strip()
-        if not path or not os.path.isfile(path):
-            messagebox.showerror("Error", "Invalid file.")
-            return
-
-        self.ini_path = path
-
-        try:
-            with open(path, "r", encoding="utf-8") as f:
-                lines = f.readlines()
-        except:
-            with open(path, "r", encoding="cp949", errors="ignore") as f:
-                lines = f.readlines()
-
-        comp_set = set()
-        pattern = re.compile(r"^\[TextureOverrideComponent(\d+)\]", re.IGNORECASE)
-
-        for line in lines:
-            m = pattern.match(line.strip())
-            if m:
-                comp_set.add(int(m.group(1)))
-
-        self.components = sorted(comp_set)
-        self.listbox.delete(0, tk.END)
-        for c in self.components:
-            self.listbox.insert(tk.END, f"Component {c}")
-
-        self.status_label.config(text=f"Components: {len(self.components)} found")
-
-    def get_selected_component(self):
-        sel = self.listbox.curselection()
-        if not sel:
-            messagebox.showerror("Error", "Select a component.")
-            return None
-        return self.components[sel[0]]
-
-    def add_glow(self):
-        comp = self.get_selected_component()
-        if comp is None:
-            return
-
-        h = simpledialog.askstring("Glow", "h value:", parent=self.root)
-        if h is None: return
-        s = simpledialog.askstring("Glow", "s value:", parent=self.root)
-        if s is None: return
-        v = simpledialog.askstring("Glow", "v value:", parent=self.root)
-        if v is None: return
-        brightness = simpledialog.askstring("Glow", "brightness:", parent=self.root)
-        if brightness is None: return
-
-        glow_name = simpledialog.askstring(
-            "Glow",
-            "Glow texture (.dds):",
-            parent=self.root,
-        )
-        if not glow_name: return
-        glow_name = glow_name.strip()
-
-        if comp not in self.component_changes:
-            self.component_changes[comp] = {}
-        if "remove" in self.component_changes[comp]:
-            del self.component_changes[comp]["remove"]
-
-        self.component_changes[comp]["glow"] = {
-            "h": h.strip(),
-            "s": s.strip(),
-            "v": v.strip(),
-            "brightness": brightness.strip(),
-            "filename": glow_name,
-        }
-        self.status_label.config(text=f"Glow queued for Component {comp}")
-
-    def add_fx(self):
-        comp = self.get_selected_component()
-        if comp is None:
-            return
-
-        fx_name = simpledialog.askstring(
-            "FX",
-            "FX texture (.dds):",
-            parent=self.root,
-        )
-        if not fx_name: return
-        fx_name = fx_name.strip()
-
-        if comp not in self.component_changes:
-            self.component_changes[comp] = {}
-        if "remove" in self.component_changes[comp]:
-            del self.component_changes[comp]["remove"]
-
-        self.component_changes[comp]["fx"] = {"filename": fx_name}
-        self.status_label.config(text=f"FX queued for Component {comp}")
-
-    def remove_rabbitfx(self):
-        comp = self.get_selected_component()
-        if comp is None:
-            return
-
-        ans = messagebox.askyesno(
-            "Remove",
-            f"Remove RabbitFX from Component {comp}?"
-        )
-        if not ans:
-            return
-
-        self.component_changes[comp] = {"remove": True}
-        self.status_label.config(text=f"Removal queued for Component {comp}")
-
-    @staticmethod
-    def _find_component_sections(lines):
-        sections = {}
-        pattern = re.compile(r"^\[TextureOverrideComponent(\d+)\]", re.IGNORECASE)
-
-        current = None
-        start = None
-
-        for i, line in enumerate(lines):
-            m = pattern.match(line.strip())
-            if m:
-                if current is not None:
-                    sections[current] = (start, i)
-                current = int(m.group(1))
-                start = i
-
-        if current is not None:
-            sections[current] = (start, len(lines))
-        return sections
-
-    def apply_changes(self):
-        if not self.ini_path:
-            messagebox.showerror("Error", "No INI selected.")
-            return
-        if not self.component_changes:
-            messagebox.showinfo("Info", "No changes.")
-            return
-
-        try:
-            with open(self.ini_path, "r", encoding="utf-8") as f:
-                lines = f.readlines()
-        except:
-            with open(self.ini_path, "r", encoding="cp949", errors="ignore") as f:
-                lines = f.readlines()
-
-        comp_sections = self._find_component_sections(lines)
-
-        def has_rabbitfx(block):
-            s = block.lower()
-            return (
-                "\\rabbitfx\\" in s
-                or "resource\\rabbitfx" in s
-                or "commandlist\\rabbitfx\\run" in s
-            )
-
-        overwrite = {}
-        for comp, cfg in self.component_changes.items():
-            if comp not in comp_sections:
-                continue
-            start, end = comp_sections[comp]
-            block = "".join(lines[start:end])
-            exists = has_rabbitfx(block)
-            if exists:
-                ans = messagebox.askyesno(
-                    "Overwrite",
-                    f"RabbitFX already exists in Component {comp}.\nOverwrite?"
-                )
-                overwrite[comp] = ans
-            else:
-                overwrite[comp] = True
-
-        modifies = {
-            comp: cfg
-            for comp, cfg in self.component_changes.items()
-            if comp in comp_sections and overwrite.get(comp)
-        }
-        if not modifies:
-            return
-
-        backup = self.ini_path + ".bak"
-        with open(backup, "w", encoding="utf-8") as fbak:
-            fbak.writelines(lines)
-
-        new_lines = []
-
-        pattern_header = re.compile(r"^\[TextureOverrideComponent(\d+)\]", re.IGNORECASE)
-        current_comp = None
-        inside = False
-        inserted = {}
-
-        def is_rabbitfx_line(line):
-            l = line.lstrip().lower()
-            if l.startswith("$\\rabbitfx\\h"): return True
-            if l.startswith("$\\rabbitfx\\s"): return True
-            if l.startswith("$\\rabbitfx\\v"): return True
-            if l.startswith("$\\rabbitfx\\brightness"): return True
-            if "resource\\rabbitfx\\glowmap" in l: return True
-            if "resource\\rabbitfx\\fxmap" in l: return True
-            if l.startswith("run") and "commandlist\\rabbitfx\\run" in l: return True
-            return False
-
-        def build_rabbitfx(indent, cfg):
-            glow = cfg.get("glow")
-            fx = cfg.get("fx")
-
-            if glow is None and fx is None:
-                return []
-
-            block = []
-            if glow is not None:
-                block.append(f"{indent}$\\rabbitfx\\h = {glow['h']}\n")
-                block.append(f"{indent}$\\rabbitfx\\s = {glow['s']}\n")
-                block.append(f"{indent}$\\rabbitfx\\v = {glow['v']}\n")
-                block.append(f"{indent}$\\rabbitfx\\brightness = {glow['brightness']}\n")
-            if glow is not None:
-                block.append(f"{indent}Resource\\RabbitFX\\GlowMap = ref ResourceGlow\n")
-            if fx is not None:
-                block.append(f"{indent}Resource\\RabbitFX\\FXMap = ref ResourceFX\n")
-            block.append(f"{indent}run = CommandList\\RabbitFX\\Run\n")
-            return block
-
-        def build_resource_sections(cfg):
-            glow = cfg.get("glow")
-            fx = cfg.get("fx")
-            out = []
-            if glow is not None:
-                out.append("[ResourceGlow]\n")
-                out.append(f"filename = Textures/{glow['filename']}\n")
-                out.append("\n")
-            if fx is not None:
-                out.append("[ResourceFX]\n")
-                out.append(f"filename = Textures/{fx['filename']}\n")
-                out.append("\n")
-            return out
-
-        for i, line in enumerate(lines):
-            stripped = line.strip()
-
-            m = pattern_header.match(stripped)
-            if m:
-                comp = int(m.group(1))
-                if comp in modifies:
-                    new_lines.extend(build_resource_sections(modifies[comp]))
-                new_lines.append(line)
-                current_comp = comp
-                inside = True
-                if comp not in inserted:
-                    inserted[comp] = False
-                continue
-
-            if stripped.startswith("[") and stripped.endswith("]"):
-                current_comp = None
-                inside = False
-                new_lines.append(line)
-                continue
-
-            if inside and current_comp in modifies:
-                if is_rabbitfx_line(line):
-                    continue
-
-                block = modifies[current_comp]
-
-                lower = stripped.lower()
-                at_override = lower == "run = commandlistoverridesharedresources"
-
-                if at_override and not inserted[current_comp] and "remove" not in block:
-                    indent = line[:len(line) - len(line.lstrip())]
-                    new_lines.append(line)
-                    new_lines.extend(build_rabbitfx(indent, block))
-                    new_lines.append("\n")  # EXACTLY ONE BLANK LINE after RabbitFX
-                    inserted[current_comp] = True
-                    continue
-
-                if stripped and stripped.lower().startswith(("; draw", "drawindexed")):
-                    while len(new_lines) > 0 and new_lines[-1].strip() == "":
-                        new_lines.pop()
-
-                new_lines.append(line)
-                continue
-
-            new_lines.append(line)
-
-        with open(self.ini_path, "w", encoding="utf-8") as f:
-            f.writelines(new_lines)
-
-        self.status_label.config(text="Done. Backup: mod.ini.bak")
-        messagebox.showinfo("Success", "Applied.")
-
-def main():
-    root = tk.Tk()
-    app = RabbitFXTool(root)
-    root.mainloop()
-
-if __name__ == "__main__":
-    main()
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+import tkinter as tk
+from tkinter import filedialog, messagebox, simpledialog
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from WWMI_Common.batch import find_inis, run_parallel
+from WWMI_Common.diff_preview import show_preview
+from WWMI_Common.edit_plan import EditPlan
+from WWMI_Common.file_watch import FileWatcher, check_unchanged, file_signature
+from WWMI_Common.ini_index import IniIndex
+from WWMI_Common.line_classifier import component_header, component_number
+from WWMI_Common.profiling import add_profile_arguments, phase, profile_from_args, session
+from WWMI_Common.scan_cache import ScanCache
+from WWMI_Common.text_io import decode_text, read_lines, scan_file
+from WWMI_Common.worker import TaskRunner, no_progress
+
+
+class RabbitFXTool:
+    def __init__(self, root, document=None):
+        self.root = root
+        self.root.title("WWMI RabbitFX Maker")
+
+        self.ini_path = None
+        self.components = []
+        self.component_changes = {}
+        self.planned = {}  # changes handed to the launcher's Apply All
+        self.scan_cache = ScanCache("rabbitfx")
+        self.snapshot = None  # file signature of the last scan
+        self.document = document  # SharedDocument when hosted by the launcher
+
+        self._build_ui()
+        self.runner = TaskRunner(
+            root,
+            lambda text: self.status_label.config(text=text),
+            self.buttons,
+            self.btn_cancel,
+        )
+        self.watcher = FileWatcher(root, self.file_changed)
+        if document is not None:
+            document.subscribe(self.offer_path)
+
+    def close(self):
+        """Called by the launcher before the window is destroyed.
+        Returns False while a task is still running."""
+        if self.runner.busy:
+            return False
+        self.watcher.stop()
+        if self.document is not None:
+            self.document.unsubscribe(self.offer_path)
+        return True
+
+    def _build_ui(self):
+        file_frame = tk.Frame(self.root)
+        file_frame.pack(fill="x", padx=10, pady=10)
+
+        tk.Label(file_frame, text="mod.ini path:").pack(side="left")
+
+        self.entry_path = tk.Entry(file_frame, width=60)
+        self.entry_path.pack(side="left", padx=5)
+
+        btn_browse = tk.Button(file_frame, text="Browse...", command=self.browse_ini)
+        btn_browse.pack(side="left")
+
+        btn_scan = tk.Button(file_frame, text="Scan", command=self.scan_components)
+        btn_scan.pack(side="left", padx=5)
+
+        list_frame = tk.Frame(self.root)
+        list_frame.pack(fill="both", expand=True, padx=10, pady=(0, 10))
+
+        tk.Label(list_frame, text="Components:").pack(anchor="w")
+
+        self.listbox = tk.Listbox(list_frame, height=10)
+        self.listbox.pack(fill="both", expand=True, side="left")
+
+        scrollbar = tk.Scrollbar(list_frame, orient="vertical", command=self.listbox.yview)
+        scrollbar.pack(side="right", fill="y")
+        self.listbox.config(yscrollcommand=scrollbar.set)
+
+        btn_frame = tk.Frame(self.root)
+        btn_frame.pack(fill="x", padx=10, pady=10)
+
+        btn_glow = tk.Button(btn_frame, text="Add Glow", command=self.add_glow)
+        btn_glow.pack(side="left")
+
+        btn_fx = tk.Button(btn_frame, text="Add FX", command=self.add_fx)
+        btn_fx.pack(side="left", padx=5)
+
+        btn_remove = tk.Button(btn_frame, text="Remove Glow/FX", command=self.remove_rabbitfx)
+        btn_remove.pack(side="left", padx=5)
+
+        btn_apply = tk.Button(btn_frame, text="Apply", command=self.apply_changes)
+        btn_apply.pack(side="right")
+
+        btn_preview = tk.Button(btn_frame, text="Preview", command=self.preview_changes)
+        btn_preview.pack(side="right", padx=5)
+
+        self.btn_cancel = tk.Button(btn_frame, text="Cancel", state="disabled",
+                                    command=lambda: self.runner.cancel())
+        self.btn_cancel.pack(side="right", padx=5)
+
+        self.buttons = [btn_browse, btn_scan, btn_glow, btn_fx, btn_remove, btn_preview, btn_apply]
+
+        self.status_label = tk.Label(self.root, text="Select mod.ini and scan.", anchor="w")
+        self.status_label.pack(fill="x", padx=10, pady=(0, 10))
+
+    def browse_ini(self):
+        path = filedialog.askopenfilename(
+            title="Select mod.ini",
+            filetypes=[("INI files", "*.ini"), ("All files", "*.*")]
+        )
+        if path:
+            self.ini_path = path
+            self.entry_path.delete(0, tk.END)
+            self.entry_path.insert(0, path)
+            self.status_label.config(text=f"Selected: {path}")
+            if self.document is not None:
+                self.document.select(path, self.offer_path)
+            self.scan_components()
+
+    def scan_components(self):
+        path = self.entry_path.get().strip()
+        if not path or not os.path.isfile(path):
+            messagebox.showerror("Error", "Invalid file.")
+            return
+
+        self.ini_path = path
+        self.rescan(path)
+
+    def offer_path(self, path):
+        """Another tool picked `path`; take it unless work is pending here."""
+        if not (self.runner.busy or self.component_changes):
+            self.entry_path.delete(0, tk.END)
+            self.entry_path.insert(0, path)
+
+    def rescan(self, path):
+        cache, document = self.scan_cache, self.document
+        self.runner.run(
+            lambda task: (file_signature(path), self.load_file(path, cache, task.progress, document)),
+            lambda result: self.scan_done(path, result),
+        )
+
+    def file_changed(self):
+        """Called by the watcher when the scanned file was edited elsewhere."""
+        if self.runner.busy:
+            return False
+        self.rescan(self.watcher.path)
+        return True
+
+    def scan_done(self, path, result):
+        signature, self.components = result
+        self.snapshot = signature
+        self.watcher.watch(path, signature)
+        self.listbox.delete(0, tk.END)
+        for c in self.components:
+            self.listbox.insert(tk.END, f"Component {c}")
+
+        self.status_label.config(text=f"Components: {len(self.components)} found")
+
+    @staticmethod
+    def load_file(path, scan_cache, progress=no_progress, document=None):
+        def scan(data):
+            if document is None:
+                return RabbitFXTool.scan_data(data)
+            lines, _ = document.read(path, data)
+            return RabbitFXTool.scan_lines(lines, document.index_for(lines))
+
+        progress("Scanning...")
+        with session("rabbitfx.scan", path=path):
+            return scan_cache.get_or_scan(path, scan)
+
+    @staticmethod
+    def scan_data(data):
+        with phase("decode", bytes=len(data)):
+            lines, _ = decode_text(data)
+        with phase("scan_lines", lines=len(lines)):
+            return RabbitFXTool.scan_lines(lines)
+
+    @staticmethod
+    def scan_lines(lines, index=None):
+        if index is None:
+            index = IniIndex(lines)
+        return sorted({comp for comp, _ in index.component_sections})
+
+    def get_selected_component(self):
+        sel = self.listbox.curselection()
+        if not sel:
+            messagebox.showerror("Error", "Select a component.")
+            return None
+        return self.components[sel[0]]
+
+    def add_glow(self):
+        comp = self.get_selected_component()
+        if comp is None:
+            return
+
+        h = simpledialog.askstring("Glow", "h value:", parent=self.root)
+        if h is None: return
+        s = simpledialog.askstring("Glow", "s value:", parent=self.root)
+        if s is None: return
+        v = simpledialog.askstring("Glow", "v value:", parent=self.root)
+        if v is None: return
+        brightness = simpledialog.askstring("Glow", "brightness:", parent=self.root)
+        if brightness is None: return
+
+        glow_name = simpledialog.askstring(
+            "Glow",
+            "Glow texture (.dds):",
+            parent=self.root,
+        )
+        if not glow_name: return
+        glow_name = glow_name.strip()
+
+        if comp not in self.component_changes:
+            self.component_changes[comp] = {}
+        if "remove" in self.component_changes[comp]:
+            del self.component_changes[comp]["remove"]
+
+        self.component_changes[comp]["glow"] = {
+            "h": h.strip(),
+            "s": s.strip(),
+            "v": v.strip(),
+            "brightness": brightness.strip(),
+            "filename": glow_name,
+        }
+        self.status_label.config(text=f"Glow queued for Component {comp}")
+
+    def add_fx(self):
+        comp = self.get_selected_component()
+        if comp is None:
+            return
+
+        fx_name = simpledialog.askstring(
+            "FX",
+            "FX texture (.dds):",
+            parent=self.root,
+        )
+        if not fx_name: return
+        fx_name = fx_name.strip()
+
+        if comp not in self.component_changes:
+            self.component_changes[comp] = {}
+        if "remove" in self.component_changes[comp]:
+            del self.component_changes[comp]["remove"]
+
+        self.component_changes[comp]["fx"] = {"filename": fx_name}
+        self.status_label.config(text=f"FX queued for Component {comp}")
+
+    def remove_rabbitfx(self):
+        comp = self.get_selected_component()
+        if comp is None:
+            return
+
+        ans = messagebox.askyesno(
+            "Remove",
+            f"Remove RabbitFX from Component {comp}?"
+        )
+        if not ans:
+            return
+
+        self.component_changes[comp] = {"remove": True}
+        self.status_label.config(text=f"Removal queued for Component {comp}")
+
+    @staticmethod
+    def _find_component_sections(index):
+        return {comp: (sec.start, sec.end) for comp, sec in index.component_sections}
+
+    def preview_changes(self):
+        if not self.ini_path:
+            messagebox.showerror("Error", "No INI selected.")
+            return
+        if not self.component_changes:
+            messagebox.showinfo("Info", "No changes.")
+            return
+
+        path = self.ini_path
+        changes = dict(self.component_changes)
+
+        def work(task):
+            found = self.read_file(path, changes, task.progress)
+            # shown as if every Overwrite question is answered yes
+            modifies = {comp: cfg for comp, cfg in changes.items() if comp in found}
+            return self.preview_file(path, modifies)
+
+        self.runner.run(work, lambda preview: show_preview(self.root, preview, "RabbitFX Maker Preview"))
+
+    def apply_changes(self):
+        if not self.ini_path:
+            messagebox.showerror("Error", "No INI selected.")
+            return
+        if not self.component_changes:
+            messagebox.showinfo("Info", "No changes.")
+            return
+
+        path = self.ini_path
+        changes = dict(self.component_changes)
+        snapshot = self.snapshot
+        self.runner.run(
+            lambda task: self.read_file(path, changes, task.progress, expected=snapshot),
+            lambda found: self.confirm_and_write(path, changes, found),
+        )
+
+    @staticmethod
+    def read_file(path, component_changes, progress=no_progress, expected=None):
+        """Find the queued components in `path` without loading the whole file.
+        Returns {comp: already has RabbitFX}. With `expected` (a file
+        signature) a file changed since then raises StaleFileError."""
+        check_unchanged(path, expected)
+        progress("Reading...")
+        return scan_file(path, lambda lines: RabbitFXTool.find_components(lines, component_changes))
+
+    @staticmethod
+    def find_components(lines, comps):
+        found = {}
+        current = None
+        for line in lines:
+            stripped = line.strip()
+            if stripped.startswith("[") and stripped.endswith("]"):
+                current = component_number(stripped[1:-1])
+                if current not in comps:
+                    current = None
+                else:
+                    found[current] = False  # a later duplicate section wins
+                continue
+            if current is not None and not found[current]:
+                found[current] = RabbitFXTool.has_rabbitfx(line)
+        return found
+
+    @staticmethod
+    def confirm_overwrite(changes, found):
+        """The `changes` to make: those for components found in the file,
+        less those whose RabbitFX the user chooses to keep."""
+        overwrite = {}
+        for comp, exists in found.items():
+            if exists:
+                ans = messagebox.askyesno(
+                    "Overwrite",
+                    f"RabbitFX already exists in Component {comp}.\nOverwrite?"
+                )
+                overwrite[comp] = ans
+            else:
+                overwrite[comp] = True
+
+        return {
+            comp: cfg
+            for comp, cfg in changes.items()
+            if comp in found and overwrite.get(comp)
+        }
+
+    def confirm_and_write(self, path, changes, found):
+        modifies = self.confirm_overwrite(changes, found)
+        if not modifies:
+            self.status_label.config(text="Nothing to apply.")
+            return
+
+        snapshot = self.snapshot
+
+        def work(task):
+            self.write_file(path, modifies, progress=task.progress, expected=snapshot)
+            return file_signature(path)
+
+        self.runner.run(work, self.apply_done)
+
+    def apply_done(self, signature):
+        self.snapshot = signature
+        self.watcher.accept(signature)
+        self.status_label.config(text="Done. Backup: mod.ini.bak")
+        messagebox.showinfo("Success", "Applied.")
+
+    # the launcher's Apply All puts the edits of all its tools in one plan
+
+    def plan_path(self):
+        """The ini this tool has changes queued for, or None."""
+        return self.ini_path if self.ini_path and self.component_changes else None
+
+    def plan_reader(self, path):
+        """reader(progress), run off the main loop, finding which of the
+        queued components `path` has and which have RabbitFX already."""
+        changes = dict(self.component_changes)
+        return lambda progress: (changes, self.read_file(path, changes, progress))
+
+    def add_to_plan(self, plan, found):
+        """Add the queued changes to `plan`, asking about components that
+        already have RabbitFX as Apply does; False if none are left.
+        `found` is what the plan_reader read."""
+        changes, found = found
+        self.planned = self.confirm_overwrite(changes, found)
+        if not self.planned:
+            return False
+        self.plan_changes(plan, self.planned)
+        return True
+
+    def plan_done(self, signature):
+        """The plan was written: the changes put into it are in the file
+        now, those queued since stay queued."""
+        for comp, cfg in self.planned.items():
+            if self.component_changes.get(comp) is cfg:
+                del self.component_changes[comp]
+        self.watcher.accept(signature)
+        self.rescan(self.ini_path)
+
+    @staticmethod
+    def write_file(path, modifies, shared=None, backup=True, progress=no_progress, expected=None):
+        """Rewrite `path` with `modifies` applied, keeping the old version as
+        mod.ini.bak and in the backup history. The file is streamed, so
+        memory use does not grow with its size. See iter_rewrite for `shared`
+        and read_file for `expected`."""
+        with session("rabbitfx.apply", path=path, components=len(modifies)):
+            plan = EditPlan(path, "RabbitFX Maker")
+            RabbitFXTool.plan_changes(plan, modifies, shared).execute(backup, progress, expected)
+
+    @staticmethod
+    def has_rabbitfx(block):
+        s = block.lower()
+        return (
+            "\\rabbitfx\\" in s
+            or "resource\\rabbitfx" in s
+            or "commandlist\\rabbitfx\\run" in s
+        )
+
+    @staticmethod
+    def preview_file(path, modifies, shared=None, name=None):
+        """DiffPreview of what write_file would change in `path`."""
+        return RabbitFXTool.plan_changes(EditPlan(path), modifies, shared).preview(name)
+
+    @staticmethod
+    def plan_changes(plan, modifies, shared=None):
+        """Add `modifies` to an EditPlan as a stream stage; see iter_rewrite
+        for `shared`. Returns the plan."""
+        return plan.stream(lambda lines: RabbitFXTool.iter_rewrite(lines, modifies, shared))
+
+    @staticmethod
+    def rewrite_lines(lines, modifies, shared=None):
+        return list(RabbitFXTool.iter_rewrite(lines, modifies, shared))
+
+    @staticmethod
+    def iter_rewrite(lines, modifies, shared=None):
+        """Yield the rewritten lines; `lines` may be any iterable.
+        Blank lines are held back until the next written line, since a
+        following drawindexed of a modified component drops them.
+
+        `shared` ({section name: texture filename}) replaces the Resource
+        sections written in front of each component with one section per
+        name at the end of the file; the glow/fx configs then name their
+        section in "resource". Older copies of those sections are dropped,
+        and so are sections whose filename is None (see shared_resources).
+        Running the same rewrite again gives the same file.
+        """
+        current_comp = None
+        inside = False
+        inserted = {}
+        blanks = []
+        skipping = False
+        collapse = False  # after an inserted block: one blank line only
+        last = None
+
+        for line in lines:
+            stripped = line.strip()
+            out = [line]
+            header = stripped[:1] == "["
+
+            if header and shared and stripped.endswith("]"):
+                skipping = stripped[1:-1] in shared
+                if skipping:
+                    current_comp = None
+                    inside = False
+            if skipping:
+                continue
+
+            comp = component_header(stripped) if header else None
+            if comp is not None:
+                if comp in modifies and shared is None:
+                    out = RabbitFXTool._build_resource_sections(modifies[comp]) + out
+                current_comp = comp
+                inside = True
+                if comp not in inserted:
+                    inserted[comp] = False
+
+            elif header and stripped.endswith("]"):
+                current_comp = None
+                inside = False
+
+            elif inside and current_comp in modifies:
+                lower = stripped.lower()
+                if "rabbitfx" in lower and RabbitFXTool._is_rabbitfx_line(line):
+                    continue
+
+                block = modifies[current_comp]
+                at_override = lower == "run = commandlistoverridesharedresources"
+
+                if at_override and not inserted[current_comp] and "remove" not in block:
+                    indent = line[:len(line) - len(line.lstrip())]
+                    out += RabbitFXTool._build_rabbitfx(indent, block)
+                    out.append("\n")  # EXACTLY ONE BLANK LINE after RabbitFX
+                    inserted[current_comp] = True
+                    collapse = True
+
+                elif stripped and lower.startswith(("; draw", "drawindexed")):
+                    blanks.clear()
+
+            for l in out:
+                if l.strip():
+                    yield from blanks
+                    blanks.clear()
+                    collapse = False
+                    yield l
+                    last = l
+                elif not (collapse and blanks):
+                    blanks.append(l)
+
+        sections = [(name, filename) for name, filename in (shared or {}).items() if filename is not None]
+        if not sections:
+            yield from blanks
+            return
+        # trailing blank lines (or those of the old copies) become the one
+        # separator in front of each section
+        if last is not None and not last.endswith("\n"):
+            yield "\n"
+        for name, filename in sections:
+            if last is not None:
+                yield "\n"
+            yield f"[{name}]\n"
+            yield f"filename = Textures/{filename}\n"
+            last = name
+
+    @staticmethod
+    def _is_rabbitfx_line(line):
+        l = line.lstrip().lower()
+        if l.startswith("$\\rabbitfx\\h"): return True
+        if l.startswith("$\\rabbitfx\\s"): return True
+        if l.startswith("$\\rabbitfx\\v"): return True
+        if l.startswith("$\\rabbitfx\\brightness"): return True
+        if "resource\\rabbitfx\\glowmap" in l: return True
+        if "resource\\rabbitfx\\fxmap" in l: return True
+        if l.startswith("run") and "commandlist\\rabbitfx\\run" in l: return True
+        return False
+
+    @staticmethod
+    def _build_rabbitfx(indent, cfg):
+        glow = cfg.get("glow")
+        fx = cfg.get("fx")
+
+        if glow is None and fx is None:
+            return []
+
+        block = []
+        if glow is not None:
+            block.append(f"{indent}$\\rabbitfx\\h = {glow['h']}\n")
+            block.append(f"{indent}$\\rabbitfx\\s = {glow['s']}\n")
+            block.append(f"{indent}$\\rabbitfx\\v = {glow['v']}\n")
+            block.append(f"{indent}$\\rabbitfx\\brightness = {glow['brightness']}\n")
+        if glow is not None:
+            block.append(f"{indent}Resource\\RabbitFX\\GlowMap = ref {glow.get('resource', 'ResourceGlow')}\n")
+        if fx is not None:
+            block.append(f"{indent}Resource\\RabbitFX\\FXMap = ref {fx.get('resource', 'ResourceFX')}\n")
+        block.append(f"{indent}run = CommandList\\RabbitFX\\Run\n")
+        return block
+
+    @staticmethod
+    def _build_resource_sections(cfg):
+        glow = cfg.get("glow")
+        fx = cfg.get("fx")
+        out = []
+        if glow is not None:
+            out.append("[ResourceGlow]\n")
+            out.append(f"filename = Textures/{glow['filename']}\n")
+            out.append("\n")
+        if fx is not None:
+            out.append("[ResourceFX]\n")
+            out.append(f"filename = Textures/{fx['filename']}\n")
+            out.append("\n")
+        return out
+
+# ---------------- BATCH (headless) ----------------
+
+_texture_digests = {}
+RESOURCE_REF_RE = re.compile(r"\bResource\w*", re.IGNORECASE)
+
+
+def load_rabbitfx_rules(path):
+    """Read a JSON RabbitFX spec: a list of
+    {"component": 3, "glow": {"h": 0.5, "s": 1, "v": 1, "brightness": 2,
+     "filename": "glow.dds"}, "fx": {"filename": "fx.dds"}} or
+    {"component": 3, "remove": true}. A rule without "component" matches
+    every component; the first matching rule wins."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    rules = []
+    for n, r in enumerate(data, 1):
+        comp = r.get("component")
+        cfg = {}
+        if r.get("remove"):
+            cfg["remove"] = True
+        else:
+            glow = r.get("glow")
+            if glow is not None:
+                cfg["glow"] = {k: str(glow.get(k, "")).strip() for k in ("h", "s", "v", "brightness", "filename")}
+                for k in ("h", "s", "v", "brightness"):
+                    float(cfg["glow"][k])
+            fx = r.get("fx")
+            if fx is not None:
+                cfg["fx"] = {"filename": str(fx.get("filename", "")).strip()}
+            if not cfg:
+                raise ValueError(f"rule {n}: needs 'glow', 'fx' or 'remove'")
+            for part in cfg.values():
+                if not part["filename"]:
+                    raise ValueError(f"rule {n}: texture filename missing")
+        rules.append({"component": None if comp is None else int(comp), "cfg": cfg})
+    return rules
+
+
+def match_rabbitfx_rules(components, rules):
+    """{comp: cfg} for the components matched by `rules` (first rule wins)."""
+    modifies = {}
+    for comp in components:
+        for r in rules:
+            if r["component"] is None or r["component"] == comp:
+                modifies[comp] = r["cfg"]
+                break
+    return modifies
+
+
+def texture_digest(path):
+    """Content hash of a texture, so identical .dds files under different
+    names share one Resource. Missing files are told apart by path only."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return "path:" + os.path.normcase(os.path.abspath(path))
+    key = (path, st.st_size, st.st_mtime_ns)
+    digest = _texture_digests.get(key)
+    if digest is None:
+        h = hashlib.blake2b(digest_size=16)
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        digest = _texture_digests[key] = h.hexdigest()
+    return digest
+
+
+def shared_resources(ini_path, modifies, lines=None):
+    """Give every distinct texture used by `modifies` one Resource section.
+    Returns (modifies with "resource" set on each glow/fx, {name: filename},
+    number of texture references that reuse an existing section).
+
+    With `lines` (the lines of the ini) the RabbitFX Resource sections in
+    it that nothing refers to once `modifies` is applied are added with
+    filename None, so the rewrite drops them."""
+    folder = os.path.dirname(os.path.abspath(ini_path))
+    names = {}
+    shared = {}
+    reused = 0
+    out = {}
+    for comp, cfg in modifies.items():
+        cfg = dict(cfg)
+        for part in ("glow", "fx"):
+            if part not in cfg:
+                continue
+            filename = cfg[part]["filename"]
+            digest = texture_digest(os.path.join(folder, "Textures", filename))
+            name = names.get(digest)
+            if name is None:
+                name = names[digest] = "ResourceRabbitFX_" + hashlib.blake2b(
+                    digest.encode(), digest_size=5).hexdigest()
+                shared[name] = filename
+            else:
+                reused += 1
+            cfg[part] = dict(cfg[part], resource=name)
+        out[comp] = cfg
+    if lines is not None:
+        for name in unused_resources(lines, modifies):
+            shared.setdefault(name, None)
+    return out, shared, reused
+
+
+def unused_resources(lines, modifies):
+    """Names of the [ResourceGlow], [ResourceFX] and [ResourceRabbitFX_*]
+    sections in `lines` that no line refers to once the RabbitFX lines of
+    the components in `modifies` are gone."""
+    sections = {}
+    referenced = set()
+    comp = None
+    for line in lines:
+        stripped = line.strip()
+        if stripped[:1] == "[" and stripped.endswith("]"):
+            name = stripped[1:-1]
+            low = name.lower()
+            if low in ("resourceglow", "resourcefx") or low.startswith("resourcerabbitfx_"):
+                sections.setdefault(low, name)
+            comp = component_number(name)
+            continue
+        if comp in modifies and RabbitFXTool._is_rabbitfx_line(line):
+            continue
+        if "resource" in stripped.lower():
+            referenced.update(r.lower() for r in RESOURCE_REF_RE.findall(stripped))
+    return [name for low, name in sections.items() if low not in referenced]
+
+
+def rabbitfx_file(path, rules, overwrite=False, backup=True, preview=None):
+    with session("rabbitfx.batch", path=path):
+        with phase("read"):
+            lines, _ = read_lines(path)
+
+        with phase("scan_lines", lines=len(lines)):
+            candidates = match_rabbitfx_rules(RabbitFXTool.scan_lines(lines), rules)
+            found = RabbitFXTool.find_components(lines, candidates)
+        skipped = sorted(c for c, exists in found.items() if exists and not overwrite
+                         and "remove" not in candidates[c])
+        modifies = {c: cfg for c, cfg in candidates.items() if c in found and c not in skipped}
+
+        with phase("shared_resources"):
+            modifies, shared, reused = shared_resources(path, modifies, lines)
+        diff = None  # with `preview` (the name to show) the file is left alone
+        if modifies and preview is not None:
+            diff = "".join(RabbitFXTool.preview_file(path, modifies, shared, preview))
+        elif modifies:
+            RabbitFXTool.write_file(path, modifies, shared, backup)
+
+    resources = sum(1 for filename in shared.values() if filename is not None)
+    return {"path": path, "changed": len(modifies), "resources": resources,
+            "reused": reused, "skipped": skipped, "diff": diff, "error": None}
+
+
+def _batch_worker(job):
+    path, rules, overwrite, backup, preview = job
+    try:
+        return rabbitfx_file(path, rules, overwrite, backup, preview)
+    except Exception as e:
+        return {"path": path, "changed": 0, "resources": 0, "reused": 0,
+                "skipped": [], "diff": None, "error": str(e)}
+
+
+def run_batch(args):
+    rules = load_rabbitfx_rules(args.spec)
+    paths = list(find_inis(args.batch, args.pattern))
+    jobs = [(p, rules, args.overwrite, not args.no_backup,
+             os.path.relpath(p, args.batch) if args.preview else None) for p in paths]
+
+    start = time.perf_counter()
+    changed = errors = reused = 0
+    for res in run_parallel(_batch_worker, jobs, args.jobs):
+        rel = os.path.relpath(res["path"], args.batch)
+        if res["error"]:
+            errors += 1
+            print(f"ERROR  {rel}: {res['error']}")
+            continue
+        if res["changed"]:
+            changed += 1
+            reused += res["reused"]
+            print(f"OK     {rel}: {res['changed']} components, {res['resources']} resources"
+                  f" ({res['reused']} shared)")
+            if res["diff"]:
+                sys.stdout.write(res["diff"])
+        if res["skipped"]:
+            comps = ", ".join(map(str, res["skipped"]))
+            print(f"SKIP   {rel}: RabbitFX already in component {comps} (use --overwrite)")
+    elapsed = time.perf_counter() - start
+
+    rate = len(paths) / elapsed if elapsed > 0 else 0.0
+    print(
+        f"{len(paths)} files scanned, {changed} changed, {errors} errors, "
+        f"{reused} texture references shared in {elapsed:.2f}s ({rate:.1f} files/s)"
+    )
+    return 1 if errors else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="WWMI RabbitFX Maker")
+    parser.add_argument("--batch", metavar="MODS_DIR",
+                        help="apply RabbitFX without the GUI to every ini under MODS_DIR")
+    parser.add_argument("--spec", metavar="FILE", help="JSON RabbitFX spec used by --batch")
+    parser.add_argument("--pattern", default="*.ini", help="ini file name pattern (default: *.ini)")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--overwrite", action="store_true",
+                        help="replace RabbitFX that a component already has")
+    parser.add_argument("--no-backup", action="store_true", help="do not write .bak files or history")
+    parser.add_argument("--preview", action="store_true",
+                        help="with --batch: print the diff of each file instead of writing it")
+    add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+    profile_from_args(args)
+
+    if args.batch:
+        if not args.spec:
+            parser.error("--batch requires --spec")
+        return run_batch(args)
+
+    root = tk.Tk()
+    RabbitFXTool(root)
+    root.mainloop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
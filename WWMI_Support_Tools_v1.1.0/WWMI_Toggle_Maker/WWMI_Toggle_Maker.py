@@ -1,679 +1,1271 @@
-import os
-import re
-import shutil
-import tkinter as tk
-from tkinter import filedialog, messagebox, simpledialog
-
-
-class DrawEntry:
-    def __init__(
-        self,
-        comp,
-        line_idx,
-        comment,
-        drawline,
-        existing=False,
-        if_start=None,
-        if_end=None,
-        var=None,
-        status="",
-    ):
-        self.comp = comp
-        self.line_idx = line_idx
-        self.comment = comment
-        self.drawline = drawline
-        self.existing = existing  # True only for simple [E] toggles
-        self.if_start = if_start
-        self.if_end = if_end
-        self.var = var
-        self.status = status  # "", "E", "M"
-
-    def display(self):
-        tag = ""
-        if self.status == "E":
-            tag += "[E] "
-        elif self.status == "M":
-            tag += "[M] "
-        c = self.comment.lstrip(";").strip() if self.comment else ""
-        return f"{tag}C{self.comp} | L{self.line_idx+1} | {c} | {self.drawline.strip()}"
-
-
-class ToggleSpec:
-    def __init__(self, var, key, approx_idx, comment, drawline):
-        self.var = var
-        self.key = key
-        self.approx_idx = approx_idx  # original index as hint
-        self.comment = comment
-        self.drawline = drawline
-
-
-class App:
-    def __init__(self, root):
-        self.root = root
-        self.root.title("WWMI Toggle Maker")
-
-        self.path_var = tk.StringVar()
-        self.lines = []          # working copy of file
-        self.entries = []        # type: list[DrawEntry]
-        self.specs = []          # type: list[ToggleSpec]
-        self.key_vars = set()    # variables that already have [Key..] sections
-        self.modified = False    # True if Remove/Replace done without new specs
-
-        self.build_ui()
-
-    # ---------------- UI ----------------
-
-    def build_ui(self):
-        top = tk.Frame(self.root)
-        top.pack(fill="x", padx=8, pady=6)
-
-        tk.Label(top, text="mod.ini:").pack(side="left")
-        tk.Entry(top, textvariable=self.path_var, width=60).pack(side="left", padx=5)
-        tk.Button(top, text="Browse", command=self.browse).pack(side="left")
-        tk.Button(top, text="Scan", command=self.scan).pack(side="left", padx=5)
-
-        mid = tk.Frame(self.root)
-        mid.pack(fill="both", expand=True, padx=8)
-
-        self.listbox = tk.Listbox(mid, selectmode="extended", width=100)
-        self.listbox.pack(side="left", fill="both", expand=True)
-
-        scroll = tk.Scrollbar(mid, command=self.listbox.yview)
-        scroll.pack(side="left", fill="y")
-        self.listbox.config(yscrollcommand=scroll.set)
-
-        right = tk.Frame(mid)
-        right.pack(side="left", fill="y", padx=6)
-
-        tk.Button(right, text="Add Toggle", command=self.add_toggle).pack(fill="x", pady=5)
-        tk.Button(right, text="Remove Toggle", command=self.remove_toggle).pack(fill="x", pady=5)
-        tk.Button(right, text="Clear Pending", command=self.clear_toggle).pack(fill="x", pady=5)
-
-        self.status = tk.Label(right, text="0 pending")
-        self.status.pack(fill="x", pady=8)
-
-        tk.Button(right, text="Apply", command=self.apply).pack(fill="x", pady=5)
-
-    def browse(self):
-        p = filedialog.askopenfilename(filetypes=[("INI files", "*.ini")])
-        if p:
-            self.path_var.set(p)
-
-    # ---------------- SCAN ----------------
-
-    def scan(self):
-        p = self.path_var.get().strip()
-        if not os.path.isfile(p):
-            return
-
-        with open(p, "r", encoding="utf-8", errors="ignore") as f:
-            self.lines = f.readlines()
-
-        self.key_vars = self.find_key_vars(self.lines)
-        self.entries = self.parse_draw(self.lines, self.key_vars)
-
-        self.specs.clear()
-        self.modified = False
-        self.refresh()
-        self.update_status()
-        messagebox.showinfo("OK", f"{len(self.entries)} drawindexed found")
-
-    @staticmethod
-    def find_key_vars(lines):
-        vars_found = set()
-        sec_name = None
-        for line in lines:
-            s = line.strip()
-            if s.startswith("[") and s.endswith("]"):
-                sec_name = s[1:-1]
-                continue
-            if sec_name and sec_name.lower().startswith("key"):
-                m = re.search(r"\$(\w+)\s*=\s*0,1\b", s)
-                if m:
-                    vars_found.add(m.group(1))
-        return vars_found
-
-    @staticmethod
-    def detect_toggle_blocks(lines, key_vars):
-        toggle_map = {}
-        n = len(lines)
-        i = 0
-        if_pat = re.compile(r"if\s+\$(\w+)\s*==\s*0\s*$", re.IGNORECASE)
-        while i < n:
-            s = lines[i].strip()
-            m = if_pat.match(s)
-            if not m:
-                i += 1
-                continue
-
-            var = m.group(1)
-            # find matching endif within same section
-            j = i + 1
-            end_idx = None
-            while j < n:
-                t = lines[j].strip()
-                if t.lower() == "endif":
-                    end_idx = j
-                    break
-                if t.startswith("[") and t.endswith("]"):
-                    break
-                j += 1
-
-            if end_idx is None:
-                i += 1
-                continue
-
-            # inspect body
-            draw_indices = []
-            mixed = False
-            for k in range(i + 1, end_idx):
-                t = lines[k].strip()
-                if not t:
-                    continue
-                if t.startswith(";"):
-                    continue
-                if "drawindexed" in t and not t.startswith(";"):
-                    draw_indices.append(k)
-                else:
-                    mixed = True
-
-            if not draw_indices or var not in key_vars:
-                i = end_idx + 1
-                continue
-
-            if not mixed and len(draw_indices) == 1:
-                status = "E"
-            else:
-                status = "M"
-
-            for k in draw_indices:
-                toggle_map[k] = {
-                    "var": var,
-                    "if_start": i,
-                    "if_end": end_idx,
-                    "status": status,
-                }
-
-            i = end_idx + 1
-
-        return toggle_map
-
-    @staticmethod
-    def parse_draw(lines, key_vars):
-        res = []
-        comp = None
-        last_comment = None
-        last_comment_idx = None
-        pat = re.compile(r"\[TextureOverrideComponent(\d+)\]", re.I)
-
-        toggle_map = App.detect_toggle_blocks(lines, key_vars)
-
-        for i, line in enumerate(lines):
-            s = line.strip()
-            m = pat.match(s)
-            if m:
-                comp = int(m.group(1))
-                last_comment = None
-                last_comment_idx = None
-                continue
-            if comp is not None and s.startswith("[") and s.endswith("]"):
-                comp = None
-                last_comment = None
-                last_comment_idx = None
-                continue
-
-            if comp is None:
-                continue
-
-            if s.startswith(";"):
-                last_comment = line
-                last_comment_idx = i
-                continue
-
-            if "drawindexed" in s and not s.startswith(";"):
-                info = toggle_map.get(i)
-                if info:
-                    status = info["status"]
-                    existing = status == "E"
-                    var = info["var"]
-                    if_start = info["if_start"]
-                    if_end = info["if_end"]
-                else:
-                    status = ""
-                    existing = False
-                    var = None
-                    if_start = None
-                    if_end = None
-
-                res.append(
-                    DrawEntry(
-                        comp=comp,
-                        line_idx=i,
-                        comment=last_comment,
-                        drawline=line,
-                        existing=existing,
-                        if_start=if_start,
-                        if_end=if_end,
-                        var=var,
-                        status=status,
-                    )
-                )
-
-        return res
-
-    # ---------------- LIST / STATUS ----------------
-
-    def refresh(self):
-        self.listbox.delete(0, tk.END)
-        for e in self.entries:
-            mark = ""
-            if any(s.approx_idx == e.line_idx for s in self.specs):
-                mark += "[T] "
-            if e.status == "E":
-                mark += "[E] "
-            elif e.status == "M":
-                mark += "[M] "
-            self.listbox.insert(tk.END, mark + e.display())
-
-    def update_status(self):
-        self.status.config(text=f"{len(self.specs)} pending")
-
-    def clear_toggle(self):
-        self.specs.clear()
-        self.update_status()
-        self.refresh()
-
-    # ---------------- REMOVE / ADD ----------------
-
-    def remove_toggle(self):
-        sel = self.listbox.curselection()
-        if not sel:
-            return
-
-        changed = False
-        for i in sel:
-            entry = self.entries[i]
-            if entry.status == "M":
-                # complex toggle: don't auto-edit
-                continue
-            if entry.existing:
-                self.delete_existing(entry)
-                changed = True
-
-        if changed:
-            self.refresh()
-            self.modified = True
-
-    def add_toggle(self):
-        sel = self.listbox.curselection()
-        if not sel:
-            return
-
-        # check if any selected have simple existing toggle
-        need_replace = any(self.entries[i].existing for i in sel)
-        if need_replace:
-            if not messagebox.askyesno(
-                "Toggle Exists",
-                "One or more selected drawindexed already have a toggle.\n"
-                "Replace existing toggle(s) with a new one?",
-            ):
-                return
-            for i in sel:
-                e = self.entries[i]
-                if e.existing:
-                    self.delete_existing(e)
-            self.modified = True
-
-        var = simpledialog.askstring("Var Name", "Var name (without $):")
-        if not var:
-            return
-        key = simpledialog.askstring("Key Name", "Keyboard key:")
-        if not key:
-            return
-
-        var = var.strip()
-        key = key.strip()
-
-        for i in sel:
-            e = self.entries[i]
-            self.specs.append(
-                ToggleSpec(
-                    var=var,
-                    key=key,
-                    approx_idx=e.line_idx,
-                    comment=e.comment,
-                    drawline=e.drawline,
-                )
-            )
-
-        self.refresh()
-        self.update_status()
-
-    def delete_existing(self, entry: DrawEntry):
-        if not entry.existing:
-            return
-
-        if entry.if_start is None or entry.if_end is None:
-            entry.existing = False
-            entry.status = ""
-            entry.var = None
-            return
-
-        idx = entry.if_start
-        end = entry.if_end
-
-        # capture original block
-        block = self.lines[idx : end + 1]
-
-        # inside-block, find the drawindexed and optional comment directly above it
-        draw_idx = None
-        for rel, line in enumerate(block):
-            t = line.strip()
-            if "drawindexed" in t and not t.startswith(";"):
-                draw_idx = idx + rel
-                break
-
-        comment_line = None
-        if draw_idx is not None and draw_idx - 1 >= idx:
-            prev = self.lines[draw_idx - 1]
-            if prev.strip().startswith(";"):
-                comment_line = prev
-
-        # remove whole if..endif block
-        for _ in range(end - idx + 1):
-            self.lines.pop(idx)
-
-        # restore comment + drawindexed at original position
-        insert_at = idx
-        if comment_line is not None:
-            self.lines.insert(insert_at, comment_line)
-            insert_at += 1
-
-        self.lines.insert(insert_at, entry.drawline)
-
-        # mark as no longer toggled
-        entry.existing = False
-        entry.status = ""
-        entry.var = None
-        entry.if_start = None
-        entry.if_end = None
-        entry.line_idx = insert_at
-
-        # per-variable cleanup will be handled at the end by prune_unused_toggles
-
-    # ---------------- APPLY ----------------
-
-    def apply(self):
-        if not self.specs and not self.modified:
-            messagebox.showwarning("Nothing to Apply", "No pending changes detected.")
-            return
-
-        p = self.path_var.get().strip()
-        if not p:
-            return
-
-        shutil.copy2(p, p + ".bak")
-
-        out = list(self.lines)
-
-        if self.specs:
-            out = self.wrap_draw(out, self.specs)
-            out = self.insert_constants(out, self.specs)
-            out = self.insert_keys(out, self.specs)
-
-        # final cleanup pass: remove unused toggle vars and key sections
-        out = self.prune_unused_toggles(out)
-
-        with open(p, "w", encoding="utf-8") as f:
-            f.writelines(out)
-
-        messagebox.showinfo("Done", "Backup saved.\nChanges applied.")
-        self.modified = False
-        self.specs.clear()
-        self.update_status()
-
-    # ---------------- INSERT CONSTANTS / KEYS ----------------
-
-    @staticmethod
-    def insert_constants(lines, specs):
-        lines = list(lines)
-        const_idx = next(
-            (i for i, l in enumerate(lines) if l.strip().lower() == "[constants]"),
-            None,
-        )
-
-        if const_idx is None:
-            # create [Constants] at top
-            lines = ["[Constants]\n", "\n"] + lines
-            const_idx = 0
-
-        end = next(
-            (
-                i
-                for i in range(const_idx + 1, len(lines))
-                if lines[i].strip().startswith("[")
-                and lines[i].strip().endswith("]")
-            ),
-            len(lines),
-        )
-
-        exist = set()
-        for i in range(const_idx, end):
-            m = re.search(r"persist\s+\$(\w+)", lines[i])
-            if m:
-                exist.add(m.group(1))
-
-        new_vars = []
-        seen = set()
-        for s in specs:
-            if s.var not in exist and s.var not in seen:
-                new_vars.append(f"global persist ${s.var} = 0\n")
-                seen.add(s.var)
-
-        if new_vars:
-            lines = lines[:end] + new_vars + lines[end:]
-
-        return lines
-
-    @staticmethod
-    def insert_keys(lines, specs):
-        lines = list(lines)
-
-        # collect existing key vars
-        existing_key_vars = set()
-        for l in lines:
-            s = l.strip()
-            m = re.match(r"\[Key(\w+)\]", s, re.IGNORECASE)
-            if m:
-                existing_key_vars.add(m.group(1))
-        # also look for "$var = 0,1" inside sections
-        for l in lines:
-            s = l.strip()
-            m = re.search(r"\$(\w+)\s*=\s*0,1\b", s)
-            if m:
-                existing_key_vars.add(m.group(1))
-
-        # find [Constants]
-        const_idx = next(
-            (i for i, l in enumerate(lines) if l.strip().lower() == "[constants]"),
-            None,
-        )
-        if const_idx is None:
-            const_idx = 0
-
-        # first section after [Constants]
-        first_after_const = next(
-            (
-                i
-                for i in range(const_idx + 1, len(lines))
-                if lines[i].strip().startswith("[")
-                and lines[i].strip().endswith("]")
-            ),
-            len(lines),
-        )
-
-        # end of last [Key...] section
-        last_key_end = None
-        i = first_after_const
-        while i < len(lines):
-            s = lines[i].strip()
-            if s.startswith("[") and s.endswith("]"):
-                name = s[1:-1]
-                if name.lower().startswith("key"):
-                    j = i + 1
-                    while j < len(lines) and not (
-                        lines[j].strip().startswith("[")
-                        and lines[j].strip().endswith("]")
-                    ):
-                        j += 1
-                    last_key_end = j
-                    i = j
-                    continue
-            i += 1
-
-        if last_key_end is None:
-            insert_pos = first_after_const
-        else:
-            insert_pos = last_key_end
-
-        # build new key sections
-        var_to_key = {}
-        for s in specs:
-            var_to_key[s.var] = s.key
-
-        key_lines = []
-        for var, key in var_to_key.items():
-            if var in existing_key_vars:
-                continue
-            key_lines += [
-                "\n",
-                f"[Key{var}]\n",
-                "condition = $object_detected\n",
-                f"key = {key}\n",
-                "type = cycle\n",
-                f"${var} = 0,1\n",
-            ]
-
-        if not key_lines:
-            return lines
-
-        return lines[:insert_pos] + key_lines + lines[insert_pos:]
-
-    # ---------------- WRAP DRAW ----------------
-
-    @staticmethod
-    def _find_draw_index(lines, spec: ToggleSpec):
-        """Locate the current index of the target drawindexed line.
-        Prefer the occurrence closest to spec.approx_idx."""
-        target = spec.drawline.strip()
-        candidates = [i for i, l in enumerate(lines) if l.strip() == target]
-        if not candidates:
-            return None
-        return min(candidates, key=lambda i: abs(i - spec.approx_idx))
-
-    @staticmethod
-    def wrap_draw(lines, specs):
-        new = list(lines)
-
-        for s in sorted(specs, key=lambda x: x.approx_idx, reverse=True):
-            idx = App._find_draw_index(new, s)
-            if idx is None:
-                continue
-
-            drawline = new[idx]
-
-            comment_line = None
-            comment_idx = None
-            j = idx - 1
-            while j >= 0 and new[j].strip() == "":
-                j -= 1
-            if j >= 0 and new[j].strip().startswith(";"):
-                comment_line = new[j]
-                comment_idx = j
-
-            if comment_idx is not None and comment_idx < idx:
-                new.pop(idx)         # draw
-                new.pop(comment_idx) # comment
-                insert_at = comment_idx
-            else:
-                new.pop(idx)
-                insert_at = idx
-
-            raw = drawline.rstrip("\n")
-            indent = raw[: len(raw) - len(raw.lstrip())]
-            base = raw.strip()
-
-            block = []
-            block.append(f"{indent}if ${s.var} == 0\n")
-
-            if comment_line is not None:
-                c = comment_line.lstrip()
-                if not c.endswith("\n"):
-                    c += "\n"
-                block.append(indent + "    " + c.lstrip())
-
-            block.append(f"{indent}    {base}\n")
-            block.append(f"{indent}endif\n")
-
-            new = new[:insert_at] + block + new[insert_at:]
-
-        return new
-
-    # ---------------- FINAL CLEANUP ----------------
-
-    @staticmethod
-    def prune_unused_toggles(lines):
-        used_vars = set()
-        if_pat = re.compile(r"\bif\s+\$(\w+)\s*==\s*0\b", re.IGNORECASE)
-
-        for line in lines:
-            m = if_pat.search(line)
-            if m:
-                used_vars.add(m.group(1))
-
-        out = list(lines)
-
-        const_idx = next(
-            (i for i, l in enumerate(out) if l.strip().lower() == "[constants]"),
-            None,
-        )
-        if const_idx is not None:
-            end = next(
-                (
-                    i
-                    for i in range(const_idx + 1, len(out))
-                    if out[i].strip().startswith("[")
-                    and out[i].strip().endswith("]")
-                ),
-                len(out),
-            )
-            for i in range(end - 1, const_idx - 1, -1):
-                m = re.search(r"persist\s+\$(\w+)", out[i])
-                if m and m.group(1) not in used_vars:
-                    out.pop(i)
-
-        i = 0
-        while i < len(out):
-            line = out[i].strip()
-            if line.lower().startswith("[key"):
-                j = i + 1
-                key_var = None
-                while j < len(out) and not (
-                    out[j].strip().startswith("[") and out[j].strip().endswith("]")
-                ):
-                    m = re.search(r"\$(\w+)\s*=\s*0,1\b", out[j])
-                    if m:
-                        key_var = m.group(1)
-                    j += 1
-                if key_var is not None and key_var not in used_vars:
-                    del out[i:j]
-                    continue
-            i += 1
-
-        return out
-
-
-if __name__ == "__main__":
-    root = tk.Tk()
-    App(root)
-    root.mainloop()
+import argparse
+import bisect
+import json
+import os
+import sys
+import time
+import tkinter as tk
+from tkinter import filedialog, messagebox, simpledialog
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from WWMI_Common.batch import find_inis, run_parallel
+from WWMI_Common.diff_preview import show_preview
+from WWMI_Common.edit_plan import EditPlan
+from WWMI_Common.file_watch import FileWatcher, file_signature
+from WWMI_Common.ini_index import BLANK, COMMENT, CYCLE, DRAW, ENDIF, IF, IniIndex
+from WWMI_Common.library_index import LibraryIndex
+from WWMI_Common.line_document import LineDocument
+from WWMI_Common.line_classifier import (
+    CYCLE_RE, DRAW_PARAMS_RE, KEY_SECTION_RE, PERSIST_RE, SECTION, USED_VAR_RE, classify,
+)
+from WWMI_Common.line_edits import LineDelta, apply_edits
+from WWMI_Common.profiling import add_profile_arguments, phase, profile_from_args, session
+from WWMI_Common.scan_cache import ScanCache
+from WWMI_Common.text_io import decode_text, mapped, read_lines
+from WWMI_Common.virtual_list import VirtualListbox
+from WWMI_Common.worker import TaskRunner, no_progress
+
+
+class DrawEntry:
+    __slots__ = ("comp", "line_idx", "comment", "drawline", "existing",
+                 "if_start", "if_end", "var", "status")
+
+    def __init__(
+        self,
+        comp,
+        line_idx,
+        comment,
+        drawline,
+        existing=False,
+        if_start=None,
+        if_end=None,
+        var=None,
+        status="",
+    ):
+        self.comp = comp
+        self.line_idx = line_idx
+        self.comment = comment
+        self.drawline = drawline
+        self.existing = existing  # True only for simple [E] toggles
+        self.if_start = if_start
+        self.if_end = if_end
+        self.var = var
+        self.status = status  # "", "E", "M"
+
+    def display(self):
+        tag = ""
+        if self.status == "E":
+            tag += "[E] "
+        elif self.status == "M":
+            tag += "[M] "
+        c = self.comment.lstrip(";").strip() if self.comment else ""
+        return f"{tag}C{self.comp} | L{self.line_idx+1} | {c} | {self.drawline.strip()}"
+
+
+class ToggleSpec:
+    __slots__ = ("var", "key", "approx_idx", "comment", "drawline")
+
+    def __init__(self, var, key, approx_idx, comment, drawline):
+        self.var = var
+        self.key = key
+        self.approx_idx = approx_idx  # original index as hint
+        self.comment = comment
+        self.drawline = drawline
+
+
+class ToggleLayout:
+    """Where the toggle bookkeeping of a mod.ini lives, gathered in one sweep."""
+
+    def __init__(self, lines):
+        self.count = len(lines)
+        self.const_idx = None    # first [Constants] header
+        self.headers = []        # indices of all [section] headers
+        self.key_sections = []   # (start, end) of every [Key...] section
+        self.key_spans = []      # (start, end, var) considered by prune_edits
+        self.key_names = set()   # X of every [KeyX] line
+        self.cycle_vars = set()  # var of every "$var = 0,1"
+        self.used_vars = set()   # var of every "if $var == 0"
+        self.persists = []       # (idx, var) of every "persist $var"
+        self._sweep(lines)
+
+    def _sweep(self, lines):
+        headers = self.headers
+        key_start = None   # open [Key...] section
+        span_start = None  # first "[key" line of the current header region
+        span_var = None    # last cycle var after span_start
+
+        for i, line in enumerate(lines):
+            s = line.strip()
+            if s.startswith("["):
+                low = s.lower()
+                if s.endswith("]"):
+                    if key_start is not None:
+                        self.key_sections.append((key_start, i))
+                        key_start = None
+                    if span_start is not None:
+                        self.key_spans.append((span_start, i, span_var))
+                        span_start = span_var = None
+                    headers.append(i)
+                    if low == "[constants]" and self.const_idx is None:
+                        self.const_idx = i
+                    if low.startswith("[key"):
+                        key_start = i
+                if low.startswith("[key"):
+                    if span_start is None:
+                        span_start = i
+                    m = KEY_SECTION_RE.match(s)
+                    if m:
+                        self.key_names.add(m.group(1))
+
+            if "$" not in line:
+                continue
+            if "0,1" in line:
+                m = CYCLE_RE.search(line)
+                if m:
+                    self.cycle_vars.add(m.group(1))
+                    if span_start is not None and span_start != i:
+                        span_var = m.group(1)
+            if "persist" in line:
+                m = PERSIST_RE.search(line)
+                if m:
+                    self.persists.append((i, m.group(1)))
+            if "==" in line:
+                m = USED_VAR_RE.search(line)
+                if m:
+                    self.used_vars.add(m.group(1))
+
+        if key_start is not None:
+            self.key_sections.append((key_start, self.count))
+        if span_start is not None:
+            self.key_spans.append((span_start, self.count, span_var))
+
+    def section_end(self, idx):
+        """Index of the first header after line `idx`, or len(lines)."""
+        pos = bisect.bisect_right(self.headers, idx)
+        return self.headers[pos] if pos < len(self.headers) else self.count
+
+    def persist_vars(self, start, end):
+        """Persist (idx, var) pairs within [start, end)."""
+        keys = [i for i, _ in self.persists]
+        lo = bisect.bisect_left(keys, start)
+        hi = bisect.bisect_left(keys, end, lo)
+        return self.persists[lo:hi]
+
+
+class App:
+    def __init__(self, root, document=None):
+        self.root = root
+        self.root.title("WWMI Toggle Maker")
+
+        self.path_var = tk.StringVar()
+        self.lines = LineDocument()  # working copy of file, edited in place
+        self.entries = []        # type: list[DrawEntry]
+        self.specs = []          # type: list[ToggleSpec]
+        self.pending_lines = set()  # approx_idx of every pending spec
+        self.key_vars = set()    # variables that already have [Key..] sections
+        self.modified = False    # True if Remove/Replace done without new specs
+        self.planned = []        # specs handed to the launcher's Apply All
+        self.scan_cache = ScanCache("toggle")
+        self.library = None      # key bindings of the whole Mods folder
+        self.snapshot = None     # file signature self.lines was read at
+        self.document = document  # SharedDocument when hosted by the launcher
+
+        self.build_ui()
+        self.runner = TaskRunner(
+            root, lambda text: self.status.config(text=text), self.buttons, self.cancel_button
+        )
+        self.watcher = FileWatcher(root, self.file_changed)
+        if document is not None:
+            document.subscribe(self.offer_path)
+
+    def close(self):
+        """Called by the launcher before the window is destroyed.
+        Returns False while a task is still running."""
+        if self.runner.busy:
+            return False
+        self.watcher.stop()
+        if self.document is not None:
+            self.document.unsubscribe(self.offer_path)
+        return True
+
+    # ---------------- UI ----------------
+
+    def build_ui(self):
+        top = tk.Frame(self.root)
+        top.pack(fill="x", padx=8, pady=6)
+
+        tk.Label(top, text="mod.ini:").pack(side="left")
+        tk.Entry(top, textvariable=self.path_var, width=60).pack(side="left", padx=5)
+        browse = tk.Button(top, text="Browse", command=self.browse)
+        browse.pack(side="left")
+        scan = tk.Button(top, text="Scan", command=self.scan)
+        scan.pack(side="left", padx=5)
+
+        mid = tk.Frame(self.root)
+        mid.pack(fill="both", expand=True, padx=8)
+
+        self.listbox = VirtualListbox(mid, self.row_text, width=100)
+        self.listbox.pack(side="left", fill="both", expand=True)
+
+        right = tk.Frame(mid)
+        right.pack(side="left", fill="y", padx=6)
+
+        self.buttons = [browse, scan]
+        for text, command in (
+            ("Add Toggle", self.add_toggle),
+            ("Remove Toggle", self.remove_toggle),
+            ("Clear Pending", self.clear_toggle),
+        ):
+            b = tk.Button(right, text=text, command=command)
+            b.pack(fill="x", pady=5)
+            self.buttons.append(b)
+
+        self.status = tk.Label(right, text="0 pending")
+        self.status.pack(fill="x", pady=8)
+
+        for text, command in (("Preview", self.preview), ("Apply", self.apply)):
+            b = tk.Button(right, text=text, command=command)
+            b.pack(fill="x", pady=5)
+            self.buttons.append(b)
+
+        self.cancel_button = tk.Button(
+            right, text="Cancel", state="disabled", command=lambda: self.runner.cancel()
+        )
+        self.cancel_button.pack(fill="x", pady=5)
+
+    def browse(self):
+        p = filedialog.askopenfilename(filetypes=[("INI files", "*.ini")])
+        if p:
+            self.path_var.set(p)
+            if self.document is not None:
+                self.document.select(p, self.offer_path)
+
+    def offer_path(self, path):
+        """Another tool picked `path`; take it unless work is pending here."""
+        if not (self.runner.busy or self.specs or self.modified):
+            self.path_var.set(path)
+
+    # ---------------- SCAN ----------------
+
+    def scan(self, announce=True, keep=()):
+        """Scan the file in the path box. `keep` are specs to leave pending;
+        they find their drawindexed again by its text when applied."""
+        p = self.path_var.get().strip()
+        if not os.path.isfile(p):
+            return
+
+        cache, document = self.scan_cache, self.document
+        self.runner.run(
+            lambda task: self.scan_file(p, cache, task.progress, document),
+            lambda result: self.scan_done(p, result, announce, keep),
+        )
+
+    def scan_done(self, path, result, announce=True, keep=()):
+        signature, lines, self.key_vars, self.entries, self.library = result
+        self.lines = LineDocument(lines)
+        self.snapshot = signature
+        self.watcher.watch(path, signature)
+        self.specs[:] = keep
+        self.pending_lines = {s.approx_idx for s in self.specs}
+        self.modified = False
+        self.refresh()
+        self.update_status()
+        if announce:
+            messagebox.showinfo("OK", f"{len(self.entries)} drawindexed found")
+        else:
+            self.status.config(text=f"Reloaded, {len(self.entries)} drawindexed")
+
+    def file_changed(self):
+        """Called by the watcher when the scanned file was edited elsewhere."""
+        if self.runner.busy:
+            return False
+
+        p = self.watcher.path
+        cache = self.scan_cache
+        if self.modified:
+            # self.lines has unapplied removals, so it cannot be merged
+            if not messagebox.askyesno(
+                "File Changed",
+                f"{os.path.basename(p)} was changed by another program.\n"
+                "Reload it? Unapplied toggle removals will be lost.",
+            ):
+                return True  # keep the old snapshot; Apply will refuse
+            document = self.document
+            self.runner.run(
+                lambda task: self.scan_file(p, cache, task.progress, document),
+                lambda result: self.scan_done(p, result, announce=False),
+            )
+            return True
+
+        lines, key_vars = self.lines.tolist(), self.key_vars
+        self.runner.run(
+            lambda task: self.reload_file(p, lines, key_vars, cache, task.progress),
+            lambda result: self.reload_done(p, result),
+        )
+        return True
+
+    def reload_done(self, path, result):
+        kind, payload = result
+        if kind == "full":
+            self.scan_done(path, payload, announce=False)
+            return
+
+        signature, new_lines, region, entries = payload
+        if region is not None:
+            start, old_end, new_end = region
+            delta = LineDelta([(start, old_end, new_lines[start:new_end])])
+            kept = []
+            for e in self.entries:
+                if start <= e.line_idx < old_end:
+                    continue
+                e.line_idx = delta.map(e.line_idx)
+                if e.if_start is not None:
+                    e.if_start = delta.map(e.if_start)
+                    e.if_end = delta.map(e.if_end)
+                kept.append(e)
+            self.entries = sorted(kept + entries, key=lambda e: e.line_idx)
+            for s in self.specs:
+                s.approx_idx = delta.locate(s.approx_idx)
+            self.pending_lines = {s.approx_idx for s in self.specs}
+
+        self.lines = LineDocument(new_lines)
+        self.snapshot = signature
+        self.watcher.accept(signature)
+        self.refresh()
+        self.update_status()
+        self.status.config(text=f"Reloaded, {len(self.specs)} pending")
+
+    @staticmethod
+    def scan_file(path, scan_cache, progress=no_progress, document=None):
+        """load_file and load_library in one go. The file signature is taken
+        before reading, so an edit made meanwhile is still noticed.
+        Returns (signature, lines, key_vars, entries, library)."""
+        with session("toggle.scan", path=path):
+            signature = file_signature(path)
+            lines, key_vars, entries = App.load_file(path, scan_cache, progress, document)
+            with phase("library"):
+                library = App.load_library(path, progress)
+        return signature, lines, key_vars, entries, library
+
+    @staticmethod
+    def reload_file(path, lines, key_vars, scan_cache, progress=no_progress):
+        """Re-read `path` after an outside edit and re-parse only the
+        sections that changed since `lines`. Changes to [Key...] sections
+        affect every toggle, so they fall back to a full scan_file.
+        Returns ("full", scan_file result) or ("partial", (signature,
+        new lines, changed_region, entries of the changed region))."""
+        progress("Reloading...")
+        with session("toggle.reload", path=path):
+            signature = file_signature(path)
+            with phase("read"):
+                new_lines, _ = read_lines(path)
+
+            with phase("changed_region", lines=len(new_lines)):
+                region = App.changed_region(lines, new_lines)
+            if region is None:
+                return "partial", (signature, new_lines, None, [])
+            start, old_end, new_end = region
+            for line in lines[start:old_end] + new_lines[start:new_end]:
+                if line.lstrip()[:4].lower() == "[key":
+                    return "full", App.scan_file(path, scan_cache, progress)
+
+            entries = App.parse_draw(new_lines[start:new_end], key_vars)
+        for e in entries:
+            e.line_idx += start
+            if e.if_start is not None:
+                e.if_start += start
+                e.if_end += start
+        return "partial", (signature, new_lines, region, entries)
+
+    @staticmethod
+    def changed_region(old, new):
+        """(start, old_end, new_end) such that old[start:old_end] became
+        new[start:new_end], widened to whole sections; None if equal."""
+        if old == new:
+            return None
+
+        # compare in slices first; equal runs are the common case
+        n = min(len(old), len(new))
+        start = 0
+        while start + 1024 <= n and old[start:start + 1024] == new[start:start + 1024]:
+            start += 1024
+        while start < n and old[start] == new[start]:
+            start += 1
+
+        m = n - start
+        tail = 0
+        while tail + 1024 <= m and old[len(old) - tail - 1024:len(old) - tail] == new[len(new) - tail - 1024:len(new) - tail]:
+            tail += 1024
+        while tail < m and old[-1 - tail] == new[-1 - tail]:
+            tail += 1
+        old_end = len(old) - tail
+
+        is_header = App._is_header
+
+        # back to the header of the first changed section (common to both)
+        start -= 1
+        while start > 0 and not is_header(old[start]):
+            start -= 1
+        start = max(start, 0)
+        # on to the next header after the change (also common to both)
+        end = old_end
+        while end < len(old) and not is_header(old[end]):
+            end += 1
+        return start, end, end + len(new) - len(old)
+
+    @staticmethod
+    def load_file(path, scan_cache, progress=no_progress, document=None):
+        """Read and scan `path` without touching the UI; with a
+        SharedDocument its lines and index are shared with the other tools.
+        Returns (lines, key_vars, entries)."""
+        progress("Reading...")
+        # one read: the cache is keyed by the same bytes the lines come from
+        with mapped(path) as data:
+            with phase("read", bytes=len(data)):
+                lines, _ = decode_text(data) if document is None else document.read(path, data)
+
+            def scan(_):
+                return App.scan_rows(lines, None if document is None else document.index_for(lines))
+
+            progress("Scanning...")
+            with phase("scan", lines=len(lines)):
+                key_vars, rows = scan_cache.get_or_scan(path, scan, data)
+        entries = [
+            DrawEntry(
+                comp=comp,
+                line_idx=i,
+                comment=comment,
+                drawline=lines[i],
+                existing=status == "E",
+                if_start=if_start,
+                if_end=if_end,
+                var=var,
+                status=status,
+            )
+            for comp, i, comment, status, var, if_start, if_end in rows
+        ]
+        return lines, set(key_vars), entries
+
+    @staticmethod
+    def load_library(path, progress=no_progress):
+        """Key bindings of every ini in the Mods folder of `path`,
+        or None if the folder cannot be read."""
+        library = LibraryIndex(LibraryIndex.mods_dir_for(path))
+        try:
+            library.refresh(progress)
+        except OSError:
+            return None
+        return library
+
+    @staticmethod
+    def scan_rows(lines, index=None):
+        """Scan result as plain tuples for the scan cache."""
+        if index is None:
+            with phase("index", lines=len(lines)):
+                index = IniIndex(lines)
+        with phase("find_key_vars"):
+            key_vars = App.find_key_vars(lines, index)
+        rows = [
+            (e.comp, e.line_idx, e.comment, e.status, e.var, e.if_start, e.if_end)
+            for e in App.parse_draw(lines, key_vars, index)
+        ]
+        return sorted(key_vars), rows
+
+    @staticmethod
+    def find_key_vars(lines, index=None):
+        if index is None:
+            index = IniIndex(lines)
+        vars_found = set()
+        for sec in index.sections_with_prefix("key"):
+            for i in index.find(CYCLE, sec.start, sec.end):
+                vars_found.add(index.values[i])
+        return vars_found
+
+    @staticmethod
+    def detect_toggle_blocks(lines, key_vars, index=None):
+        if index is None:
+            index = IniIndex(lines)
+        toggle_map = {}
+        kinds = index.kinds
+        resume = 0
+
+        for i in index.records[IF]:
+            var = index.values[i]
+            if var is None or i < resume:
+                continue
+
+            # matching endif within same section
+            end_idx = index.next_record(ENDIF, i)
+            if end_idx is None or end_idx > index.first_section_after(i):
+                continue
+
+            # inspect body
+            draw_indices = []
+            mixed = False
+            for k in range(i + 1, end_idx):
+                kind = kinds[k]
+                if kind == BLANK or kind == COMMENT:
+                    continue
+                if kind == DRAW and "drawindexed" in lines[k]:
+                    draw_indices.append(k)
+                else:
+                    mixed = True
+
+            resume = end_idx + 1
+            if not draw_indices or var not in key_vars:
+                continue
+
+            if not mixed and len(draw_indices) == 1:
+                status = "E"
+            else:
+                status = "M"
+
+            for k in draw_indices:
+                toggle_map[k] = {
+                    "var": var,
+                    "if_start": i,
+                    "if_end": end_idx,
+                    "status": status,
+                }
+
+        return toggle_map
+
+    @staticmethod
+    def parse_draw(lines, key_vars, index=None):
+        with phase("parse_draw", lines=len(lines)):
+            return App._parse_draw(lines, key_vars, index)
+
+    @staticmethod
+    def _parse_draw(lines, key_vars, index):
+        if index is None:
+            index = IniIndex(lines)
+        res = []
+
+        with phase("detect_toggle_blocks"):
+            toggle_map = App.detect_toggle_blocks(lines, key_vars, index)
+
+        for comp, sec in index.component_sections:
+            for i in index.find(DRAW, sec.start, sec.end):
+                # the index matches any case; Toggle Maker only ever took
+                # lowercase drawindexed lines
+                if "drawindexed" not in lines[i]:
+                    continue
+                c = index.comment_before.get(i)
+                info = toggle_map.get(i)
+                if info:
+                    status = info["status"]
+                    existing = status == "E"
+                    var = info["var"]
+                    if_start = info["if_start"]
+                    if_end = info["if_end"]
+                else:
+                    status = ""
+                    existing = False
+                    var = None
+                    if_start = None
+                    if_end = None
+
+                res.append(
+                    DrawEntry(
+                        comp=comp,
+                        line_idx=i,
+                        comment=lines[c] if c is not None else None,
+                        drawline=lines[i],
+                        existing=existing,
+                        if_start=if_start,
+                        if_end=if_end,
+                        var=var,
+                        status=status,
+                    )
+                )
+
+        return res
+
+    # ---------------- LIST / STATUS ----------------
+
+    def refresh(self):
+        self.listbox.set_count(len(self.entries))
+
+    def row_text(self, i):
+        e = self.entries[i]
+        mark = ""
+        if e.line_idx in self.pending_lines:
+            mark += "[T] "
+        if e.status == "E":
+            mark += "[E] "
+        elif e.status == "M":
+            mark += "[M] "
+        return mark + e.display()
+
+    def update_status(self):
+        self.status.config(text=f"{len(self.specs)} pending")
+
+    def clear_toggle(self):
+        self.specs.clear()
+        self.pending_lines.clear()
+        self.update_status()
+        self.refresh()
+
+    # ---------------- REMOVE / ADD ----------------
+
+    def remove_toggle(self):
+        sel = self.listbox.curselection()
+        if not sel:
+            return
+
+        # complex toggles ([M]) are not auto-edited
+        entries = [self.entries[i] for i in sel
+                   if self.entries[i].existing and self.entries[i].status != "M"]
+        if entries:
+            self.delete_existing(*entries)
+            self.refresh()
+            self.modified = True
+
+    def add_toggle(self):
+        sel = self.listbox.curselection()
+        if not sel:
+            return
+
+        # check if any selected have simple existing toggle
+        need_replace = any(self.entries[i].existing for i in sel)
+        if need_replace:
+            if not messagebox.askyesno(
+                "Toggle Exists",
+                "One or more selected drawindexed already have a toggle.\n"
+                "Replace existing toggle(s) with a new one?",
+            ):
+                return
+            self.delete_existing(*(self.entries[i] for i in sel))
+            self.modified = True
+
+        var = simpledialog.askstring("Var Name", "Var name (without $):")
+        if not var:
+            return
+        var = var.strip()
+        key = self.ask_key()
+        if not key:
+            return
+
+        for i in sel:
+            e = self.entries[i]
+            self.specs.append(
+                ToggleSpec(
+                    var=var,
+                    key=key,
+                    approx_idx=e.line_idx,
+                    comment=e.comment,
+                    drawline=e.drawline,
+                )
+            )
+            self.pending_lines.add(e.line_idx)
+
+        self.refresh()
+        self.update_status()
+
+    def ask_key(self):
+        """Ask for the toggle key, warning about keys other mods already use."""
+        pending = [s.key for s in self.specs]
+        free = self.library.free_keys(used=pending) if self.library else []
+        while True:
+            key = simpledialog.askstring(
+                "Key Name",
+                "Keyboard key:" + (f"\n(free: {', '.join(free)})" if free else ""),
+                initialvalue=free[0] if free else None,
+            )
+            if not key or not key.strip():
+                return None
+            key = key.strip()
+            users = self.library.key_users(key) if self.library else []
+            if not users:
+                return key
+
+            root = self.library.mods_dir
+            shown = [f"{os.path.relpath(p, root)} [{sec}]" for p, sec in users[:8]]
+            if len(users) > 8:
+                shown.append(f"... and {len(users) - 8} more")
+            if messagebox.askyesno(
+                "Key In Use",
+                f"{key} is already bound in:\n" + "\n".join(shown) + "\n\nUse it anyway?",
+            ):
+                return key
+
+    def delete_existing(self, *entries: DrawEntry):
+        """Put the plain drawindexed back in place of the toggle blocks of
+        `entries`. Each block is found through handles taken before any of
+        them is edited, and the other entries are moved once at the end."""
+        lines = self.lines
+        marks = []
+        for entry in entries:
+            if not entry.existing:
+                continue
+            if entry.if_start is None or entry.if_end is None:
+                entry.existing = False
+                entry.status = ""
+                entry.var = None
+                continue
+            marks.append((entry, lines.handle(entry.if_start), lines.handle(entry.if_end)))
+
+        edits = []     # in line numbers from before the first edit
+        restored = {}  # entry -> handle on its drawindexed
+        for entry, start_handle, end_handle in marks:
+            idx = lines.index(start_handle)
+            end = lines.index(end_handle)
+            if idx is None or end is None:
+                continue
+
+            # capture original block
+            block = lines[idx : end + 1]
+
+            # inside-block, find the drawindexed and optional comment directly above it
+            draw_idx = None
+            for rel, line in enumerate(block):
+                t = line.strip()
+                if "drawindexed" in t and not t.startswith(";"):
+                    draw_idx = idx + rel
+                    break
+
+            comment_line = None
+            if draw_idx is not None and draw_idx - 1 >= idx:
+                prev = lines[draw_idx - 1]
+                if prev.strip().startswith(";"):
+                    comment_line = prev
+
+            # replace whole if..endif block with comment + drawindexed
+            new = [] if comment_line is None else [comment_line]
+            new.append(entry.drawline)
+            edits.append((entry.if_start, entry.if_end + 1, new))
+            lines.replace(idx, end + 1, new)
+            restored[entry] = lines.handle(idx + len(new) - 1)
+
+            # mark as no longer toggled
+            entry.existing = False
+            entry.status = ""
+            entry.var = None
+            entry.if_start = None
+            entry.if_end = None
+
+        for entry, handle in restored.items():
+            entry.line_idx = lines.index(handle)
+        if edits:
+            self.remap_entries(LineDelta(edits), skip=restored)
+
+        # per-variable cleanup will be handled at the end by prune_unused_toggles
+
+    # ---------------- APPLY ----------------
+
+    def preview(self):
+        if not self.specs and not self.modified:
+            messagebox.showwarning("Nothing to Apply", "No pending changes detected.")
+            return
+
+        p = self.path_var.get().strip()
+        lines, specs = self.lines, list(self.specs)
+        self.runner.run(
+            lambda task: self.preview_specs(lines, specs, os.path.basename(p)),
+            lambda preview: show_preview(self.root, preview, "Toggle Maker Preview"),
+        )
+
+    def apply(self):
+        if not self.specs and not self.modified:
+            messagebox.showwarning("Nothing to Apply", "No pending changes detected.")
+            return
+
+        p = self.path_var.get().strip()
+        if not p:
+            return
+
+        lines, specs, snapshot = self.lines, list(self.specs), self.snapshot
+
+        def work(task):
+            result = self.apply_file(p, lines.tolist(), specs, progress=task.progress, expected=snapshot)
+            return result, file_signature(p)
+
+        self.runner.run(work, self.apply_done, on_cancel=self.update_status)
+
+    def apply_done(self, result):
+        (out, delta, pruned), signature = result
+        self.snapshot = signature
+        self.watcher.accept(signature)
+
+        # carry the scan over to the written file instead of rescanning
+        self.lines = LineDocument(out)
+        self.key_vars |= {s.var for s in self.specs}
+        self.key_vars -= pruned
+        self.specs.clear()
+        self.remap_entries(delta)
+
+        messagebox.showinfo("Done", "Backup saved.\nChanges applied.")
+        self.modified = False
+        self.refresh()
+        self.update_status()
+
+    # the launcher's Apply All puts the edits of all its tools in one plan
+
+    def plan_path(self):
+        """The ini this tool has edits pending for, or None."""
+        p = self.path_var.get().strip()
+        return p if p and (self.specs or self.modified) else None
+
+    def plan_reader(self, path):
+        """Nothing needs reading before add_to_plan: the scan is at hand."""
+        return None
+
+    def add_to_plan(self, plan, found=None):
+        """Add the pending edits to `plan`, made to a copy of the working
+        lines; False if there are none."""
+        if not (self.specs or self.modified):
+            return False
+        self.planned = list(self.specs)
+        App.plan_specs(plan, self.planned, self.lines.copy())
+        return True
+
+    def plan_done(self, signature):
+        """The plan was written; the file has other tools' edits too, so it
+        is scanned again. Specs queued since add_to_plan are kept."""
+        planned = set(map(id, self.planned))
+        self.watcher.accept(signature)
+        self.scan(announce=False, keep=[s for s in self.specs if id(s) not in planned])
+
+    @staticmethod
+    def apply_file(path, lines, specs, backup=True, progress=no_progress, expected=None):
+        """Apply `specs` to the scanned `lines` of `path` and replace the file,
+        keeping the old version as mod.ini.bak and in the backup history.
+        `expected` is the file signature `lines` were read at; if the file
+        has changed since, StaleFileError is raised and nothing is written.
+        Returns apply_specs(lines, specs)."""
+        with session("toggle.apply", path=path, lines=len(lines), specs=len(specs)):
+            plan = App.plan_specs(EditPlan(path, "Toggle Maker"), specs, lines)
+            return plan.execute(backup, progress, expected)
+
+    @staticmethod
+    def plan_specs(plan, specs, lines=None):
+        """Add `specs` to an EditPlan as its line stage; `lines` are the
+        lines they were made from (see EditPlan.edit_lines). Unused toggle
+        vars are pruned as Apply does. Returns the plan."""
+        return plan.edit_lines(lambda lines, doc=None: App.apply_specs(lines, specs, doc), lines)
+
+    @staticmethod
+    def apply_specs(lines, specs, doc=None):
+        """Run the full apply pipeline.
+        Returns (out, delta, pruned_vars) where delta maps line indices of
+        `lines` to `out` and pruned_vars lost their [Key...] section.
+        Every edit is also made to `doc`, a LineDocument of `lines`, if given."""
+        out = lines
+        delta = LineDelta()
+
+        if specs:
+            for name, make_edits in (
+                ("wrap_draw", App.wrap_edits),
+                ("insert_constants", App.constants_edits),
+                ("insert_keys", App.keys_edits),
+            ):
+                with phase(name, lines=len(out)):
+                    edits = make_edits(out, specs)
+                    out = apply_edits(out, edits)
+                    if doc is not None:
+                        doc.apply_edits(edits)
+                delta = delta.then(LineDelta(edits))
+
+        # final cleanup pass: remove unused toggle vars and key sections
+        with phase("prune_unused_toggles", lines=len(out)):
+            edits, pruned = App.prune_edits(out)
+            out = apply_edits(out, edits)
+            if doc is not None:
+                doc.apply_edits(edits)
+        return out, delta.then(LineDelta(edits)), pruned
+
+    @staticmethod
+    def preview_specs(lines, specs, name="mod.ini"):
+        """DiffPreview of what Apply would change. `lines` is a list or the
+        working LineDocument, which is left as it is."""
+        return App.plan_specs(EditPlan(None), specs, lines).preview(name)
+
+    def remap_entries(self, delta, skip=()):
+        """Move entries and pending specs across an edit of self.lines;
+        entries in `skip` are already in place. Component sections that
+        received new toggle blocks are re-parsed."""
+        touched = {}
+        kept = []
+        for e in self.entries:
+            if e in skip:
+                kept.append(e)
+                continue
+            new_idx = delta.map(e.line_idx)
+            if new_idx is None:
+                # the drawindexed was wrapped into a new toggle block
+                start, end = self._section_bounds(self.lines, delta.locate(e.line_idx))
+                touched[start] = end
+                continue
+            e.line_idx = new_idx
+            if e.if_start is not None:
+                e.if_start = delta.map(e.if_start)
+                e.if_end = delta.map(e.if_end)
+            kept.append(e)
+
+        for s in self.specs:
+            s.approx_idx = delta.locate(s.approx_idx)
+        self.pending_lines = {s.approx_idx for s in self.specs}
+
+        if not touched:
+            self.entries = kept
+            return
+
+        starts = sorted(touched)
+
+        def in_touched(i):
+            k = bisect.bisect_right(starts, i) - 1
+            return k >= 0 and i < touched[starts[k]]
+
+        entries = [e for e in kept if not in_touched(e.line_idx)]
+        for start, end in touched.items():
+            for e in self.parse_draw(self.lines[start:end], self.key_vars):
+                e.line_idx += start
+                if e.if_start is not None:
+                    e.if_start += start
+                    e.if_end += start
+                entries.append(e)
+        entries.sort(key=lambda e: e.line_idx)
+        self.entries = entries
+
+    @staticmethod
+    def _is_header(line):
+        """True for a [section] header, judged as IniIndex judges it."""
+        return classify(line.strip())[0] == SECTION
+
+    @staticmethod
+    def _section_bounds(lines, idx):
+        """(header index, next header index) of the section holding line `idx`."""
+        start = idx
+        while start > 0 and not App._is_header(lines[start]):
+            start -= 1
+        end = idx + 1
+        while end < len(lines) and not App._is_header(lines[end]):
+            end += 1
+        return start, end
+
+    # ---------------- INSERT CONSTANTS / KEYS ----------------
+
+    @staticmethod
+    def insert_constants(lines, specs):
+        return apply_edits(lines, App.constants_edits(lines, specs))
+
+    @staticmethod
+    def constants_edits(lines, specs):
+        edits = []
+        layout = ToggleLayout(lines)
+        const_idx = layout.const_idx
+
+        if const_idx is None:
+            # create [Constants] at top
+            edits.append((0, 0, ["[Constants]\n", "\n"]))
+            first = 0
+        else:
+            first = const_idx + 1
+
+        end = layout.section_end(first - 1)
+        exist = {var for _, var in layout.persist_vars(const_idx or 0, end)}
+
+        new_vars = []
+        seen = set()
+        for s in specs:
+            if s.var not in exist and s.var not in seen:
+                new_vars.append(f"global persist ${s.var} = 0\n")
+                seen.add(s.var)
+
+        if new_vars:
+            edits.append((end, end, new_vars))
+
+        return edits
+
+    @staticmethod
+    def insert_keys(lines, specs):
+        return apply_edits(lines, App.keys_edits(lines, specs))
+
+    @staticmethod
+    def keys_edits(lines, specs):
+        layout = ToggleLayout(lines)
+        # [KeyX] sections and "$var = 0,1" lines both count as existing keys
+        existing_key_vars = layout.key_names | layout.cycle_vars
+
+        # after the last [Key...] section following [Constants] (or the top)
+        first_after_const = layout.section_end(layout.const_idx or 0)
+        key_ends = [end for start, end in layout.key_sections if start >= first_after_const]
+        insert_pos = key_ends[-1] if key_ends else first_after_const
+
+        # build new key sections
+        var_to_key = {}
+        for s in specs:
+            var_to_key[s.var] = s.key
+
+        key_lines = []
+        for var, key in var_to_key.items():
+            if var in existing_key_vars:
+                continue
+            key_lines += [
+                "\n",
+                f"[Key{var}]\n",
+                "condition = $object_detected\n",
+                f"key = {key}\n",
+                "type = cycle\n",
+                f"${var} = 0,1\n",
+            ]
+
+        if not key_lines:
+            return []
+
+        return [(insert_pos, insert_pos, key_lines)]
+
+    # ---------------- WRAP DRAW ----------------
+
+    @staticmethod
+    def _resolve_draws(lines, specs, index=None):
+        """Map each spec to the current index of its drawindexed line,
+        preferring the occurrence closest to spec.approx_idx.
+        Returns {line_idx: [specs]}; unresolved specs are dropped."""
+        targets = {s.drawline.strip(): [] for s in specs}
+        candidates = index.records[DRAW] if index is not None else range(len(lines))
+        for i in candidates:
+            found = targets.get(lines[i].strip())
+            if found is not None:
+                found.append(i)
+
+        resolved = {}
+        # same order as the old one-by-one wrapping: first spec is outermost
+        for s in sorted(specs, key=lambda x: x.approx_idx, reverse=True):
+            positions = targets[s.drawline.strip()]
+            if not positions:
+                continue
+            pos = bisect.bisect_left(positions, s.approx_idx)
+            near = positions[max(pos - 1, 0) : pos + 1]
+            idx = min(near, key=lambda i: abs(i - s.approx_idx))
+            resolved.setdefault(idx, []).append(s)
+        return resolved
+
+    @staticmethod
+    def wrap_draw(lines, specs, index=None):
+        return apply_edits(lines, App.wrap_edits(lines, specs, index))
+
+    @staticmethod
+    def wrap_edits(lines, specs, index=None):
+        edits = []
+
+        for idx, group in App._resolve_draws(lines, specs, index).items():
+            drawline = lines[idx]
+
+            comment_line = None
+            comment_idx = None
+            j = idx - 1
+            while j >= 0 and lines[j].strip() == "":
+                j -= 1
+            if j >= 0 and lines[j].strip().startswith(";"):
+                comment_line = lines[j]
+                comment_idx = j
+
+            raw = drawline.rstrip("\n")
+            indent = raw[: len(raw) - len(raw.lstrip())]
+            base = raw.strip()
+
+            # nested when several specs target the same line
+            block = []
+            inner = indent
+            for s in group:
+                block.append(f"{inner}if ${s.var} == 0\n")
+                inner += "    "
+
+            if comment_line is not None:
+                c = comment_line.lstrip()
+                if not c.endswith("\n"):
+                    c += "\n"
+                block.append(inner + c)
+
+            block.append(f"{inner}{base}\n")
+            for _ in group:
+                inner = inner[:-4]
+                block.append(f"{inner}endif\n")
+
+            # blank lines between the comment and the draw end up after the block
+            first = idx if comment_idx is None else comment_idx
+            edits.append((first, idx + 1, block + lines[first + 1 : idx]))
+
+        return edits
+
+    # ---------------- FINAL CLEANUP ----------------
+
+    @staticmethod
+    def prune_unused_toggles(lines):
+        return apply_edits(lines, App.prune_edits(lines)[0])
+
+    @staticmethod
+    def prune_edits(lines):
+        """Edits removing persist vars and [Key...] sections of toggles no
+        longer used by any if-block, plus the set of vars whose key went away."""
+        layout = ToggleLayout(lines)
+        used_vars = layout.used_vars
+
+        drop = []
+        pruned = set()
+
+        if layout.const_idx is not None:
+            end = layout.section_end(layout.const_idx)
+            for i, var in layout.persist_vars(layout.const_idx, end):
+                if var not in used_vars:
+                    drop.append((i, i + 1))
+
+        for start, end, var in layout.key_spans:
+            if var is not None and var not in used_vars:
+                drop.append((start, end))
+                pruned.add(var)
+
+        # one edit per run of dropped lines
+        edits = []
+        for start, end in sorted(drop):
+            if edits and start <= edits[-1][1]:
+                edits[-1] = (edits[-1][0], max(end, edits[-1][1]), [])
+            else:
+                edits.append((start, end, []))
+        return edits, pruned
+
+# ---------------- BATCH (headless) ----------------
+
+def load_toggle_rules(path):
+    """Read a JSON toggle spec: a list of
+    {"component": 3, "draw": "drawindexed = 1234, 0, 0", "var": "hat", "key": "VK_F1"}.
+    "component" may be omitted to match any component and "draw" may be "*"
+    to match every drawindexed of the component."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    rules = []
+    for n, r in enumerate(data, 1):
+        if "var" not in r or "key" not in r:
+            raise ValueError(f"rule {n}: 'var' and 'key' are required")
+        draw = str(r.get("draw", "*")).strip()
+        if draw != "*":
+            m = DRAW_PARAMS_RE.search(draw)
+            if not m:
+                raise ValueError(f"rule {n}: cannot read drawindexed from {draw!r}")
+            draw = tuple(map(int, m.groups()))
+        comp = r.get("component")
+        rules.append({
+            "component": None if comp is None else int(comp),
+            "draw": draw,
+            "var": str(r["var"]).strip().lstrip("$"),
+            "key": str(r["key"]).strip(),
+        })
+    return rules
+
+
+def match_toggle_rules(entries, rules):
+    """Build ToggleSpecs for the entries matched by `rules` (first rule wins).
+    Entries that already sit in a toggle block are counted as skipped."""
+    specs = []
+    skipped = 0
+    for e in entries:
+        m = DRAW_PARAMS_RE.search(e.drawline)
+        params = tuple(map(int, m.groups())) if m else None
+        for r in rules:
+            if r["component"] is not None and r["component"] != e.comp:
+                continue
+            if r["draw"] != "*" and r["draw"] != params:
+                continue
+            if e.status:
+                skipped += 1
+            else:
+                specs.append(
+                    ToggleSpec(
+                        var=r["var"],
+                        key=r["key"],
+                        approx_idx=e.line_idx,
+                        comment=e.comment,
+                        drawline=e.drawline,
+                    )
+                )
+            break
+    return specs, skipped
+
+
+def toggle_file(path, rules, backup=True, preview=None):
+    with session("toggle.batch", path=path):
+        with phase("read"):
+            lines, _ = read_lines(path)
+
+        with phase("index", lines=len(lines)):
+            index = IniIndex(lines)
+        with phase("find_key_vars"):
+            key_vars = App.find_key_vars(lines, index)
+        entries = App.parse_draw(lines, key_vars, index)
+        specs, skipped = match_toggle_rules(entries, rules)
+
+        diff = None  # with `preview` (the name to show) the file is left alone
+        if specs and preview is not None:
+            diff = "".join(App.preview_specs(lines, specs, preview))
+        elif specs:
+            App.apply_file(path, lines, specs, backup)
+
+    return {"path": path, "toggled": len(specs), "skipped": skipped, "diff": diff, "error": None}
+
+
+def _batch_worker(job):
+    path, rules, backup, preview = job
+    try:
+        return toggle_file(path, rules, backup, preview)
+    except Exception as e:
+        return {"path": path, "toggled": 0, "skipped": 0, "diff": None, "error": str(e)}
+
+
+def run_batch(args):
+    rules = load_toggle_rules(args.spec)
+    paths = list(find_inis(args.batch, args.pattern))
+    jobs = [(p, rules, not args.no_backup,
+             os.path.relpath(p, args.batch) if args.preview else None) for p in paths]
+
+    start = time.perf_counter()
+    changed = errors = 0
+    for res in run_parallel(_batch_worker, jobs, args.jobs):
+        rel = os.path.relpath(res["path"], args.batch)
+        if res["error"]:
+            errors += 1
+            print(f"ERROR  {rel}: {res['error']}")
+        elif res["toggled"]:
+            changed += 1
+            print(f"OK     {rel}: {res['toggled']} toggled, {res['skipped']} already toggled")
+            if res["diff"]:
+                sys.stdout.write(res["diff"])
+    elapsed = time.perf_counter() - start
+
+    rate = len(paths) / elapsed if elapsed > 0 else 0.0
+    print(
+        f"{len(paths)} files scanned, {changed} changed, {errors} errors "
+        f"in {elapsed:.2f}s ({rate:.1f} files/s)"
+    )
+    return 1 if errors else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="WWMI Toggle Maker")
+    parser.add_argument("--batch", metavar="MODS_DIR",
+                        help="apply toggles without the GUI to every ini under MODS_DIR")
+    parser.add_argument("--spec", metavar="FILE", help="JSON toggle spec used by --batch")
+    parser.add_argument("--pattern", default="*.ini", help="ini file name pattern (default: *.ini)")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--no-backup", action="store_true", help="do not write .bak files or history")
+    parser.add_argument("--preview", action="store_true",
+                        help="with --batch: print the diff of each file instead of writing it")
+    add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+    profile_from_args(args)
+
+    if args.batch:
+        if not args.spec:
+            parser.error("--batch requires --spec")
+        return run_batch(args)
+
+    root = tk.Tk()
+    App(root)
+    root.mainloop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
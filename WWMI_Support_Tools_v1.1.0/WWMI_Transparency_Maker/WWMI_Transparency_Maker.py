@@ -1,360 +1,653 @@
-import os
-import re
-import tkinter as tk
-from tkinter import filedialog, messagebox, simpledialog
-
-
-class TransparencyTool:
-    def __init__(self, root):
-        self.root = root
-        self.root.title("WWMI Transparency Maker")
-
-        self.ini_path = None
-        self.component_draws = {}
-        self.pending_changes = []
-        self.next_shader_index = 1
-
-        self._build_ui()
-
-    def _build_ui(self):
-        file_frame = tk.Frame(self.root)
-        file_frame.pack(fill="x", padx=10, pady=10)
-
-        tk.Label(file_frame, text="mod.ini path:").pack(side="left")
-
-        self.entry_path = tk.Entry(file_frame, width=60)
-        self.entry_path.pack(side="left", padx=5)
-
-        btn_browse = tk.Button(file_frame, text="Browse...", command=self.browse_ini)
-        btn_browse.pack(side="left")
-
-        btn_scan = tk.Button(file_frame, text="Scan", command=self.scan_ini)
-        btn_scan.pack(side="left", padx=5)
-
-        list_frame = tk.Frame(self.root)
-        list_frame.pack(fill="both", expand=True, padx=10, pady=(0, 10))
-
-        tk.Label(list_frame, text="Component - drawindexed:").pack(anchor="w")
-
-        self.list_all = tk.Listbox(list_frame, height=18)
-        self.list_all.pack(fill="both", expand=True, side="left")
-
-        scrollbar = tk.Scrollbar(list_frame, orient="vertical", command=self.list_all.yview)
-        scrollbar.pack(side="right", fill="y")
-        self.list_all.config(yscrollcommand=scrollbar.set)
-
-        btn_frame = tk.Frame(self.root)
-        btn_frame.pack(fill="x", padx=10, pady=10)
-
-        btn_add = tk.Button(btn_frame, text="Add Transparency", command=self.add_transparency)
-        btn_add.pack(side="left")
-
-        btn_apply = tk.Button(btn_frame, text="Apply", command=self.apply_changes)
-        btn_apply.pack(side="right")
-
-        self.status_label = tk.Label(self.root, text="Select mod.ini and scan.", anchor="w")
-        self.status_label.pack(fill="x", padx=10, pady=(0, 10))
-
-    def browse_ini(self):
-        path = filedialog.askopenfilename(
-            title="Select mod.ini",
-            filetypes=[("INI files", "*.ini"), ("All files", "*.*")]
-        )
-        if path:
-            self.ini_path = path
-            self.entry_path.delete(0, tk.END)
-            self.entry_path.insert(0, path)
-            self.scan_ini()
-
-    def scan_ini(self):
-        path = self.entry_path.get().strip()
-        if not path or not os.path.isfile(path):
-            messagebox.showerror("Error", "Invalid mod.ini file path.")
-            return
-
-        self.ini_path = path
-        self.component_draws.clear()
-        self.pending_changes.clear()
-
-        try:
-            with open(path, "r", encoding="utf-8") as f:
-                lines = f.readlines()
-        except:
-            with open(path, "r", encoding="cp949", errors="ignore") as f:
-                lines = f.readlines()
-
-        self.next_shader_index = self._scan_existing_shader_index(lines)
-
-        current_comp = None
-        last_comment = None
-        pattern_comp = re.compile(r"^\[TextureOverrideComponent(\d+)\]", re.IGNORECASE)
-        pattern_draw = re.compile(r"^drawindexed\s*=\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*$", re.IGNORECASE)
-
-        for line in lines:
-            stripped = line.strip()
-            lower = stripped.lower()
-
-            if lower.startswith(";"):
-                last_comment = stripped.lstrip(";").strip()
-                continue
-
-            m_comp = pattern_comp.match(stripped)
-            if m_comp:
-                current_comp = int(m_comp.group(1))
-                self.component_draws.setdefault(current_comp, [])
-                last_comment = None
-                continue
-
-            if current_comp is not None and lower.startswith("drawindexed"):
-                m_draw = pattern_draw.match(stripped)
-                if m_draw:
-                    params = tuple(map(int, m_draw.groups()))
-                    self.component_draws[current_comp].append({
-                        "params": params,
-                        "line_text": line.rstrip("\n"),
-                        "comment": last_comment or ""
-                    })
-                    last_comment = None
-
-        self.list_all.delete(0, tk.END)
-        for comp in sorted(self.component_draws.keys()):
-            for entry in self.component_draws[comp]:
-                a, b, c = entry["params"]
-                comment = entry["comment"]
-                disp = f"Component {comp}"
-                if comment:
-                    disp += f" — {comment}"
-                disp += f" — drawindexed = {a}, {b}, {c}"
-                self.list_all.insert(tk.END, disp)
-
-        self.status_label.config(text="Scan complete.")
-
-    def _scan_existing_shader_index(self, lines):
-        pattern = re.compile(r"^\[CustomShaderTransparency(\d+)\]", re.IGNORECASE)
-        max_i = 0
-        for line in lines:
-            m = pattern.match(line.strip())
-            if m:
-                idx = int(m.group(1))
-                max_i = max(max_i, idx)
-        return max_i + 1
-
-    def get_selected_draw(self):
-        sel = self.list_all.curselection()
-        if not sel:
-            messagebox.showerror("Error", "Select a drawindexed entry.")
-            return None, None, None
-
-        line = self.list_all.get(sel[0])
-        m = re.search(r"Component\s+(\d+)\s+—(?:\s+(.+?)\s+—)?\s*drawindexed\s*=\s*(\d+),\s*(\d+),\s*(\d+)", line)
-        if not m:
-            return None, None, None
-
-        comp = int(m.group(1))
-        comment = m.group(2) if m.group(2) else ""
-        params = (int(m.group(3)), int(m.group(4)), int(m.group(5)))
-        return comp, params, comment
-
-    def ask_mode(self):
-        dialog = tk.Toplevel(self.root)
-        dialog.title("Select mode")
-        dialog.grab_set()
-
-        var = tk.StringVar(value="")
-        tk.Label(dialog, text="Select transparency mode:").pack(padx=10, pady=10)
-
-        def set_alpha():
-            var.set("alpha")
-            dialog.destroy()
-
-        def set_factor():
-            var.set("factor")
-            dialog.destroy()
-
-        frame = tk.Frame(dialog)
-        frame.pack(padx=10, pady=10)
-        tk.Button(frame, text="Texture Alpha Based", width=22, command=set_alpha).pack(side="left", padx=5)
-        tk.Button(frame, text="Blend Factor Based", width=22, command=set_factor).pack(side="left", padx=5)
-
-        dialog.wait_window()
-        val = var.get()
-        return val if val in ("alpha", "factor") else None
-
-    def ask_factors(self):
-        arr = []
-        for i in range(4):
-            v = simpledialog.askstring(
-                "Blend Factor",
-                f"Enter blend_factor[{i}] (0.0-1.0):",
-                parent=self.root
-            )
-            if v is None:
-                return None
-            v = v.strip()
-            try:
-                float(v)
-            except:
-                messagebox.showerror("Error", "Invalid value.")
-                return None
-            arr.append(v)
-        return arr
-
-    def add_transparency(self):
-        comp, params, comment = self.get_selected_draw()
-        if comp is None:
-            return
-
-        mode = self.ask_mode()
-        if not mode:
-            return
-
-        factors = None
-        if mode == "factor":
-            factors = self.ask_factors()
-            if factors is None:
-                return
-
-        existing_idx = None
-        for i, ch in enumerate(self.pending_changes):
-            if ch["component"] == comp and ch["params"] == params:
-                existing_idx = i
-                break
-
-        if existing_idx is not None:
-            ans = messagebox.askyesno("Overwrite", "Already queued. Overwrite?")
-            if not ans:
-                return
-            shader_name = self.pending_changes[existing_idx]["shader_name"]
-            self.pending_changes[existing_idx] = {
-                "component": comp,
-                "params": params,
-                "comment": comment,
-                "mode": mode,
-                "factors": factors,
-                "shader_name": shader_name,
-            }
-        else:
-            shader_name = f"CustomShaderTransparency{self.next_shader_index}"
-            self.next_shader_index += 1
-            self.pending_changes.append({
-                "component": comp,
-                "params": params,
-                "comment": comment,
-                "mode": mode,
-                "factors": factors,
-                "shader_name": shader_name,
-            })
-
-        self.status_label.config(text="Transparency queued.")
-
-    def apply_changes(self):
-        if not self.ini_path:
-            messagebox.showerror("Error", "No INI loaded.")
-            return
-        if not self.pending_changes:
-            messagebox.showinfo("Info", "No changes queued.")
-            return
-
-        try:
-            with open(self.ini_path, "r", encoding="utf-8") as f:
-                lines = f.readlines()
-        except:
-            with open(self.ini_path, "r", encoding="cp949", errors="ignore") as f:
-                lines = f.readlines()
-
-        backup = self.ini_path + ".bak"
-        with open(backup, "w", encoding="utf-8") as fbak:
-            fbak.writelines(lines)
-
-        pattern_comp = re.compile(r"^\[TextureOverrideComponent(\d+)\]", re.IGNORECASE)
-        pattern_draw = re.compile(r"^(\s*)drawindexed\s*=\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*$", re.IGNORECASE)
-
-        new_lines = []
-        shader_sections = []
-        current_comp = None
-
-        pending_map = {(ch["component"], ch["params"]): ch for ch in self.pending_changes}
-
-        for line in lines:
-            stripped = line.strip()
-            m_comp = pattern_comp.match(stripped)
-
-            if m_comp:
-                if current_comp is not None:
-                    for sec in shader_sections:
-                        new_lines.extend(sec)
-                    shader_sections = []
-
-                current_comp = int(m_comp.group(1))
-                new_lines.append(line)
-                continue
-
-            m_draw = pattern_draw.match(line)
-            if m_draw and current_comp is not None:
-                indent = m_draw.group(1)
-                params = (int(m_draw.group(2)), int(m_draw.group(3)), int(m_draw.group(4)))
-
-                key = (current_comp, params)
-                if key in pending_map:
-                    ch = pending_map[key]
-                    orig = line.rstrip("\n")
-                    commented = f"{indent}; {orig.lstrip()}\n"
-                    new_lines.append(commented)
-                    new_lines.append(f"{indent}run = {ch['shader_name']}\n")
-                    shader_sections.append(self._build_shader_section(ch))
-                    del pending_map[key]
-                    continue
-
-            if stripped.startswith("[") and stripped.endswith("]") and current_comp is not None:
-                for sec in shader_sections:
-                    new_lines.extend(sec)
-                shader_sections = []
-                current_comp = None
-                new_lines.append(line)
-                continue
-
-            new_lines.append(line)
-
-        if current_comp is not None:
-            for sec in shader_sections:
-                new_lines.extend(sec)
-
-        with open(self.ini_path, "w", encoding="utf-8") as f:
-            f.writelines(new_lines)
-
-        self.status_label.config(text="Done. Backup created.")
-        messagebox.showinfo("Success", "Changes applied.\nBackup: mod.ini.bak")
-
-    def _build_shader_section(self, ch):
-        comp = ch["component"]
-        a, b, c = ch["params"]
-        mode = ch["mode"]
-        factors = ch["factors"]
-        name = ch["shader_name"]
-
-        out = []
-        out.append("\n")
-        out.append(f"[{name}]\n")
-        if ch["comment"]:
-            out.append(f"; {ch['comment']}\n")
-        if mode == "alpha":
-            out.append("blend = ADD SRC_ALPHA INV_SRC_ALPHA\n")
-        else:
-            out.append("blend = ADD BLEND_FACTOR INV_BLEND_FACTOR\n")
-            out.append(f"blend_factor[0] = {factors[0]}\n")
-            out.append(f"blend_factor[1] = {factors[1]}\n")
-            out.append(f"blend_factor[2] = {factors[2]}\n")
-            out.append(f"blend_factor[3] = {factors[3]}\n")
-
-        out.append(f"drawindexed = {a}, {b}, {c}\n")
-        return out
-
-
-def main():
-    root = tk.Tk()
-    app = TransparencyTool(root)
-    root.mainloop()
-
-
-if __name__ == "__main__":
-    main()
+import argparse
+import json
+import os
+import re
+import sys
+import time
+import tkinter as tk
+from tkinter import filedialog, messagebox, simpledialog
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from WWMI_Common.batch import find_inis, run_parallel
+from WWMI_Common.diff_preview import show_preview
+from WWMI_Common.draw_table import DrawTable
+from WWMI_Common.edit_plan import EditPlan
+from WWMI_Common.file_watch import FileWatcher, file_signature
+from WWMI_Common.ini_index import DRAW, IniIndex
+from WWMI_Common.line_classifier import DRAW_PARAMS_RE, SHADER_SECTION_RE, component_header, draw_params
+from WWMI_Common.profiling import add_profile_arguments, phase, profile_from_args, session
+from WWMI_Common.scan_cache import ScanCache
+from WWMI_Common.text_io import decode_text, mapped
+from WWMI_Common.worker import TaskRunner, no_progress
+
+
+class TransparencyTool:
+    def __init__(self, root, document=None):
+        self.root = root
+        self.root.title("WWMI Transparency Maker")
+
+        self.ini_path = None
+        self.draws = DrawTable()  # one row per list row
+        self.pending_changes = []
+        self.planned = []  # changes handed to the launcher's Apply All
+        self.next_shader_index = 1
+        self.scan_cache = ScanCache("transparency")
+        self.snapshot = None  # file signature of the last scan
+        self.document = document  # SharedDocument when hosted by the launcher
+
+        self._build_ui()
+        self.runner = TaskRunner(
+            root,
+            lambda text: self.status_label.config(text=text),
+            self.buttons,
+            self.btn_cancel,
+        )
+        self.watcher = FileWatcher(root, self.file_changed)
+        if document is not None:
+            document.subscribe(self.offer_path)
+
+    def close(self):
+        """Called by the launcher before the window is destroyed.
+        Returns False while a task is still running."""
+        if self.runner.busy:
+            return False
+        self.watcher.stop()
+        if self.document is not None:
+            self.document.unsubscribe(self.offer_path)
+        return True
+
+    def _build_ui(self):
+        file_frame = tk.Frame(self.root)
+        file_frame.pack(fill="x", padx=10, pady=10)
+
+        tk.Label(file_frame, text="mod.ini path:").pack(side="left")
+
+        self.entry_path = tk.Entry(file_frame, width=60)
+        self.entry_path.pack(side="left", padx=5)
+
+        btn_browse = tk.Button(file_frame, text="Browse...", command=self.browse_ini)
+        btn_browse.pack(side="left")
+
+        btn_scan = tk.Button(file_frame, text="Scan", command=self.scan_ini)
+        btn_scan.pack(side="left", padx=5)
+
+        list_frame = tk.Frame(self.root)
+        list_frame.pack(fill="both", expand=True, padx=10, pady=(0, 10))
+
+        tk.Label(list_frame, text="Component - drawindexed:").pack(anchor="w")
+
+        self.list_all = tk.Listbox(list_frame, height=18)
+        self.list_all.pack(fill="both", expand=True, side="left")
+
+        scrollbar = tk.Scrollbar(list_frame, orient="vertical", command=self.list_all.yview)
+        scrollbar.pack(side="right", fill="y")
+        self.list_all.config(yscrollcommand=scrollbar.set)
+
+        btn_frame = tk.Frame(self.root)
+        btn_frame.pack(fill="x", padx=10, pady=10)
+
+        btn_add = tk.Button(btn_frame, text="Add Transparency", command=self.add_transparency)
+        btn_add.pack(side="left")
+
+        btn_apply = tk.Button(btn_frame, text="Apply", command=self.apply_changes)
+        btn_apply.pack(side="right")
+
+        btn_preview = tk.Button(btn_frame, text="Preview", command=self.preview_changes)
+        btn_preview.pack(side="right", padx=5)
+
+        self.btn_cancel = tk.Button(btn_frame, text="Cancel", state="disabled",
+                                    command=lambda: self.runner.cancel())
+        self.btn_cancel.pack(side="right", padx=5)
+
+        self.buttons = [btn_browse, btn_scan, btn_add, btn_preview, btn_apply]
+
+        self.status_label = tk.Label(self.root, text="Select mod.ini and scan.", anchor="w")
+        self.status_label.pack(fill="x", padx=10, pady=(0, 10))
+
+    def browse_ini(self):
+        path = filedialog.askopenfilename(
+            title="Select mod.ini",
+            filetypes=[("INI files", "*.ini"), ("All files", "*.*")]
+        )
+        if path:
+            self.ini_path = path
+            self.entry_path.delete(0, tk.END)
+            self.entry_path.insert(0, path)
+            if self.document is not None:
+                self.document.select(path, self.offer_path)
+            self.scan_ini()
+
+    def scan_ini(self):
+        path = self.entry_path.get().strip()
+        if not path or not os.path.isfile(path):
+            messagebox.showerror("Error", "Invalid mod.ini file path.")
+            return
+
+        self.ini_path = path
+        self.pending_changes.clear()
+        self.rescan(path)
+
+    def offer_path(self, path):
+        """Another tool picked `path`; take it unless work is pending here."""
+        if not (self.runner.busy or self.pending_changes):
+            self.entry_path.delete(0, tk.END)
+            self.entry_path.insert(0, path)
+
+    def rescan(self, path):
+        cache, document = self.scan_cache, self.document
+        self.runner.run(
+            lambda task: (file_signature(path),) + self.load_file(path, cache, task.progress, document),
+            lambda result: self.scan_done(path, result),
+        )
+
+    def file_changed(self):
+        """Called by the watcher when the scanned file was edited elsewhere.
+        Queued changes are kept; they are matched by component and params."""
+        if self.runner.busy:
+            return False
+        self.rescan(self.watcher.path)
+        return True
+
+    def scan_done(self, path, result):
+        signature, next_shader_index, self.draws, rows = result
+        self.snapshot = signature
+        self.watcher.watch(path, signature)
+        if self.pending_changes:
+            # queued shaders keep the names they were given
+            next_shader_index = max(next_shader_index, self.next_shader_index)
+        self.next_shader_index = next_shader_index
+
+        self.list_all.delete(0, tk.END)
+        if rows:
+            self.list_all.insert(tk.END, *rows)
+
+        self.status_label.config(text="Scan complete.")
+
+    @staticmethod
+    def load_file(path, scan_cache, progress=no_progress, document=None):
+        """Scan `path` without touching the UI, reading it through the
+        SharedDocument if there is one.
+        Returns (next_shader_index, draws, list rows); row k shows draws[k]."""
+        def scan(data):
+            if document is None:
+                return TransparencyTool.scan_data(data)
+            lines, _ = document.read(path, data)
+            return TransparencyTool.scan_lines(lines, document.index_for(lines))
+
+        progress("Scanning...")
+        with session("transparency.scan", path=path):
+            next_shader_index, draws = scan_cache.get_or_scan(path, scan)
+
+            with phase("rows", draws=len(draws)):
+                rows = []
+                for comp, (a, b, c), comment in draws:
+                    disp = f"Component {comp}"
+                    if comment:
+                        disp += f" — {comment}"
+                    disp += f" — drawindexed = {a}, {b}, {c}"
+                    rows.append(disp)
+        return next_shader_index, draws, rows
+
+    @staticmethod
+    def scan_data(data):
+        with phase("decode", bytes=len(data)):
+            lines, _ = decode_text(data)
+        with phase("scan_lines", lines=len(lines)):
+            return TransparencyTool.scan_lines(lines)
+
+    @staticmethod
+    def scan_lines(lines, index=None):
+        """Returns (next_shader_index, DrawTable of the component draws,
+        sorted by component and then by position in the file)."""
+        if index is None:
+            index = IniIndex(lines)
+        next_shader_index = TransparencyTool._scan_existing_shader_index(index)
+
+        draws = DrawTable()
+        for comp, sec in sorted(index.component_sections, key=lambda cs: cs[0]):
+            prev_draw = sec.start
+            for i in index.find(DRAW, sec.start, sec.end):
+                params = index.values[i]
+                if params is None:
+                    continue
+                c = index.comment_before.get(i)
+                comment = ""
+                if c is not None and c > prev_draw:
+                    comment = lines[c].strip().lstrip(";").strip()
+                try:
+                    draws.append(comp, params, comment)
+                except OverflowError:
+                    continue  # not a real drawindexed
+                prev_draw = i
+
+        return next_shader_index, draws
+
+    @staticmethod
+    def _scan_existing_shader_index(index):
+        max_i = 0
+        for sec in index.sections_with_prefix("CustomShaderTransparency"):
+            m = SHADER_SECTION_RE.match(sec.name)
+            if m:
+                idx = int(m.group(1))
+                max_i = max(max_i, idx)
+        return max_i + 1
+
+    def get_selected_draw(self):
+        sel = self.list_all.curselection()
+        if not sel:
+            messagebox.showerror("Error", "Select a drawindexed entry.")
+            return None, None, None
+
+        return self.draws[sel[0]]
+
+    def ask_mode(self):
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Select mode")
+        dialog.grab_set()
+
+        var = tk.StringVar(value="")
+        tk.Label(dialog, text="Select transparency mode:").pack(padx=10, pady=10)
+
+        def set_alpha():
+            var.set("alpha")
+            dialog.destroy()
+
+        def set_factor():
+            var.set("factor")
+            dialog.destroy()
+
+        frame = tk.Frame(dialog)
+        frame.pack(padx=10, pady=10)
+        tk.Button(frame, text="Texture Alpha Based", width=22, command=set_alpha).pack(side="left", padx=5)
+        tk.Button(frame, text="Blend Factor Based", width=22, command=set_factor).pack(side="left", padx=5)
+
+        dialog.wait_window()
+        val = var.get()
+        return val if val in ("alpha", "factor") else None
+
+    def ask_factors(self):
+        arr = []
+        for i in range(4):
+            v = simpledialog.askstring(
+                "Blend Factor",
+                f"Enter blend_factor[{i}] (0.0-1.0):",
+                parent=self.root
+            )
+            if v is None:
+                return None
+            v = v.strip()
+            try:
+                float(v)
+            except:
+                messagebox.showerror("Error", "Invalid value.")
+                return None
+            arr.append(v)
+        return arr
+
+    def add_transparency(self):
+        comp, params, comment = self.get_selected_draw()
+        if comp is None:
+            return
+
+        mode = self.ask_mode()
+        if not mode:
+            return
+
+        factors = None
+        if mode == "factor":
+            factors = self.ask_factors()
+            if factors is None:
+                return
+
+        existing_idx = None
+        for i, ch in enumerate(self.pending_changes):
+            if ch["component"] == comp and ch["params"] == params:
+                existing_idx = i
+                break
+
+        if existing_idx is not None:
+            ans = messagebox.askyesno("Overwrite", "Already queued. Overwrite?")
+            if not ans:
+                return
+            shader_name = self.pending_changes[existing_idx]["shader_name"]
+            self.pending_changes[existing_idx] = {
+                "component": comp,
+                "params": params,
+                "comment": comment,
+                "mode": mode,
+                "factors": factors,
+                "shader_name": shader_name,
+            }
+        else:
+            shader_name = f"CustomShaderTransparency{self.next_shader_index}"
+            self.next_shader_index += 1
+            self.pending_changes.append({
+                "component": comp,
+                "params": params,
+                "comment": comment,
+                "mode": mode,
+                "factors": factors,
+                "shader_name": shader_name,
+            })
+
+        self.status_label.config(text="Transparency queued.")
+
+    def preview_changes(self):
+        if not self.ini_path:
+            messagebox.showerror("Error", "No INI loaded.")
+            return
+        if not self.pending_changes:
+            messagebox.showinfo("Info", "No changes queued.")
+            return
+
+        path = self.ini_path
+        pending = [dict(ch) for ch in self.pending_changes]
+        self.runner.run(
+            lambda task: self.preview_file(path, pending),
+            lambda preview: show_preview(self.root, preview, "Transparency Maker Preview"),
+        )
+
+    def apply_changes(self):
+        if not self.ini_path:
+            messagebox.showerror("Error", "No INI loaded.")
+            return
+        if not self.pending_changes:
+            messagebox.showinfo("Info", "No changes queued.")
+            return
+
+        path = self.ini_path
+        pending = [dict(ch) for ch in self.pending_changes]
+        snapshot = self.snapshot
+
+        def work(task):
+            self.apply_file(path, pending, progress=task.progress, expected=snapshot)
+            return file_signature(path)
+
+        self.runner.run(work, self.apply_done)
+
+    def apply_done(self, signature):
+        self.snapshot = signature
+        self.watcher.accept(signature)
+        self.status_label.config(text="Done. Backup created.")
+        messagebox.showinfo("Success", "Changes applied.\nBackup: mod.ini.bak")
+
+    # the launcher's Apply All puts the edits of all its tools in one plan
+
+    def plan_path(self):
+        """The ini this tool has changes queued for, or None."""
+        return self.ini_path if self.ini_path and self.pending_changes else None
+
+    def plan_reader(self, path):
+        """Nothing needs reading before add_to_plan."""
+        return None
+
+    def add_to_plan(self, plan, found=None):
+        """Add the queued changes to `plan`; False if there are none."""
+        if not self.pending_changes:
+            return False
+        self.planned = list(self.pending_changes)
+        self.plan_changes(plan, [dict(ch) for ch in self.planned])
+        return True
+
+    def plan_done(self, signature):
+        """The plan was written: the changes put into it are in the file
+        now, those queued since stay queued."""
+        planned = set(map(id, self.planned))
+        self.pending_changes = [ch for ch in self.pending_changes if id(ch) not in planned]
+        self.watcher.accept(signature)
+        self.rescan(self.ini_path)
+
+    @staticmethod
+    def apply_file(path, pending_changes, backup=True, progress=no_progress, expected=None):
+        """Rewrite `path` with `pending_changes` applied, keeping the old
+        version as mod.ini.bak and in the backup history. The file is
+        streamed, so memory use does not grow with its size. With `expected`
+        (a file signature) a file changed since then raises StaleFileError."""
+        with session("transparency.apply", path=path, changes=len(pending_changes)):
+            plan = EditPlan(path, "Transparency Maker")
+            TransparencyTool.plan_changes(plan, pending_changes).execute(backup, progress, expected)
+
+    @staticmethod
+    def preview_file(path, pending_changes, name=None):
+        """DiffPreview of what apply_file would change in `path`."""
+        return TransparencyTool.plan_changes(EditPlan(path), pending_changes).preview(name)
+
+    @staticmethod
+    def plan_changes(plan, pending_changes):
+        """Add `pending_changes` to an EditPlan as a stream stage. Returns the plan."""
+        return plan.stream(lambda lines: TransparencyTool.iter_rewrite(lines, pending_changes))
+
+    @staticmethod
+    def rewrite_lines(lines, pending_changes):
+        return list(TransparencyTool.iter_rewrite(lines, pending_changes))
+
+    @staticmethod
+    def iter_rewrite(lines, pending_changes):
+        """Yield the rewritten lines; `lines` may be any iterable."""
+        shader_sections = []
+        current_comp = None
+
+        pending_map = {(ch["component"], ch["params"]): ch for ch in pending_changes}
+        pending_comps = {ch["component"] for ch in pending_changes}
+
+        # only "[..." lines can be headers and only "d..." lines draws, so
+        # the cheap first-character test keeps most lines away from the regexes
+        for line in lines:
+            stripped = line.strip()
+            first = stripped[:1]
+
+            if first == "[":
+                comp = component_header(stripped)
+                if comp is not None:
+                    if current_comp is not None:
+                        for sec in shader_sections:
+                            yield from sec
+                        shader_sections = []
+
+                    current_comp = comp
+                    yield line
+                    continue
+
+                if stripped.endswith("]") and current_comp is not None:
+                    for sec in shader_sections:
+                        yield from sec
+                    shader_sections = []
+                    current_comp = None
+                    yield line
+                    continue
+
+            elif (first == "d" or first == "D") and current_comp in pending_comps:
+                params = draw_params(stripped)
+                key = (current_comp, params)
+                if key in pending_map:
+                    ch = pending_map[key]
+                    indent = line[:len(line) - len(line.lstrip())]
+                    orig = line.rstrip("\n")
+                    commented = f"{indent}; {orig.lstrip()}\n"
+                    yield commented
+                    yield f"{indent}run = {ch['shader_name']}\n"
+                    shader_sections.append(TransparencyTool._build_shader_section(ch))
+                    del pending_map[key]
+                    continue
+
+            yield line
+
+        if current_comp is not None:
+            for sec in shader_sections:
+                yield from sec
+
+    @staticmethod
+    def _build_shader_section(ch):
+        comp = ch["component"]
+        a, b, c = ch["params"]
+        mode = ch["mode"]
+        factors = ch["factors"]
+        name = ch["shader_name"]
+
+        out = []
+        out.append("\n")
+        out.append(f"[{name}]\n")
+        if ch["comment"]:
+            out.append(f"; {ch['comment']}\n")
+        if mode == "alpha":
+            out.append("blend = ADD SRC_ALPHA INV_SRC_ALPHA\n")
+        else:
+            out.append("blend = ADD BLEND_FACTOR INV_BLEND_FACTOR\n")
+            out.append(f"blend_factor[0] = {factors[0]}\n")
+            out.append(f"blend_factor[1] = {factors[1]}\n")
+            out.append(f"blend_factor[2] = {factors[2]}\n")
+            out.append(f"blend_factor[3] = {factors[3]}\n")
+
+        out.append(f"drawindexed = {a}, {b}, {c}\n")
+        return out
+
+
+# ---------------- BATCH (headless) ----------------
+
+def load_transparency_rules(path):
+    """Read a JSON transparency spec: a list of
+    {"component": 3, "draw": "drawindexed = 1234, 0, 0", "comment": "hair",
+     "mode": "alpha"} or {..., "mode": "factor", "factors": [1, 1, 1, 0.5]}.
+    "component", "draw" ("*") and "comment" (a regex searched in the comment
+    above the drawindexed) may be omitted to match anything."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    rules = []
+    for n, r in enumerate(data, 1):
+        mode = r.get("mode", "alpha")
+        if mode not in ("alpha", "factor"):
+            raise ValueError(f"rule {n}: mode must be 'alpha' or 'factor'")
+        factors = None
+        if mode == "factor":
+            factors = [str(v).strip() for v in r.get("factors", ())]
+            if len(factors) != 4:
+                raise ValueError(f"rule {n}: 'factor' mode needs 4 factors")
+            for v in factors:
+                float(v)
+        draw = str(r.get("draw", "*")).strip()
+        if draw != "*":
+            m = DRAW_PARAMS_RE.search(draw)
+            if not m:
+                raise ValueError(f"rule {n}: cannot read drawindexed from {draw!r}")
+            draw = tuple(map(int, m.groups()))
+        comp = r.get("component")
+        comment = r.get("comment")
+        rules.append({
+            "component": None if comp is None else int(comp),
+            "draw": draw,
+            "comment": None if comment is None else re.compile(comment),
+            "mode": mode,
+            "factors": factors,
+        })
+    return rules
+
+
+def match_transparency_rules(draws, rules, next_shader_index):
+    """Build pending changes for the draws matched by `rules` (first rule
+    wins), naming shaders from `next_shader_index` on. Apply changes the
+    first drawindexed with the same params in a component only, so later
+    copies of it are not matched again."""
+    pending = []
+    seen = set()
+    for comp, params, comment in draws:
+        if (comp, params) in seen:
+            continue
+        for r in rules:
+            if r["component"] is not None and r["component"] != comp:
+                continue
+            if r["draw"] != "*" and r["draw"] != params:
+                continue
+            if r["comment"] is not None and not r["comment"].search(comment):
+                continue
+            pending.append({
+                "component": comp,
+                "params": params,
+                "comment": comment,
+                "mode": r["mode"],
+                "factors": r["factors"],
+                "shader_name": f"CustomShaderTransparency{next_shader_index + len(pending)}",
+            })
+            seen.add((comp, params))
+            break
+    return pending
+
+
+def transparency_file(path, rules, backup=True, preview=None):
+    with session("transparency.batch", path=path):
+        with mapped(path) as data:
+            next_shader_index, draws = TransparencyTool.scan_data(data)
+        pending = match_transparency_rules(draws, rules, next_shader_index)
+        diff = None  # with `preview` (the name to show) the file is left alone
+        if pending and preview is not None:
+            diff = "".join(TransparencyTool.preview_file(path, pending, preview))
+        elif pending:
+            TransparencyTool.apply_file(path, pending, backup)
+
+    return {"path": path, "changed": len(pending), "diff": diff, "error": None}
+
+
+def _batch_worker(job):
+    path, rules, backup, preview = job
+    try:
+        return transparency_file(path, rules, backup, preview)
+    except Exception as e:
+        return {"path": path, "changed": 0, "diff": None, "error": str(e)}
+
+
+def run_batch(args):
+    rules = load_transparency_rules(args.spec)
+    paths = list(find_inis(args.batch, args.pattern))
+    jobs = [(p, rules, not args.no_backup,
+             os.path.relpath(p, args.batch) if args.preview else None) for p in paths]
+
+    start = time.perf_counter()
+    changed = errors = 0
+    for res in run_parallel(_batch_worker, jobs, args.jobs):
+        rel = os.path.relpath(res["path"], args.batch)
+        if res["error"]:
+            errors += 1
+            print(f"ERROR  {rel}: {res['error']}")
+        elif res["changed"]:
+            changed += 1
+            print(f"OK     {rel}: {res['changed']} drawindexed made transparent")
+            if res["diff"]:
+                sys.stdout.write(res["diff"])
+    elapsed = time.perf_counter() - start
+
+    rate = len(paths) / elapsed if elapsed > 0 else 0.0
+    print(
+        f"{len(paths)} files scanned, {changed} changed, {errors} errors "
+        f"in {elapsed:.2f}s ({rate:.1f} files/s)"
+    )
+    return 1 if errors else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="WWMI Transparency Maker")
+    parser.add_argument("--batch", metavar="MODS_DIR",
+                        help="apply transparency without the GUI to every ini under MODS_DIR")
+    parser.add_argument("--spec", metavar="FILE", help="JSON transparency spec used by --batch")
+    parser.add_argument("--pattern", default="*.ini", help="ini file name pattern (default: *.ini)")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--no-backup", action="store_true", help="do not write .bak files or history")
+    parser.add_argument("--preview", action="store_true",
+                        help="with --batch: print the diff of each file instead of writing it")
+    add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+    profile_from_args(args)
+
+    if args.batch:
+        if not args.spec:
+            parser.error("--batch requires --spec")
+        return run_batch(args)
+
+    root = tk.Tk()
+    TransparencyTool(root)
+    root.mainloop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""Apply the batch spec files of several tools to one mod.ini in one pass.
+
+    python apply_all.py mod.ini --toggle t.json --transparency a.json --rabbitfx r.json
+
+The rules are matched against one read and one index of the file and the
+edits go into one EditPlan (see WWMI_Common.edit_plan), so the file is
+written and backed up once.
+"""
+
+import argparse
+import sys
+
+from WWMI_Common.edit_plan import EditPlan
+from WWMI_Common.ini_index import IniIndex
+from WWMI_Common.profiling import add_profile_arguments, profile_from_args
+from WWMI_Common.text_io import read_lines
+from WWMI_Rabbit_Maker.WWMI_Rabbit_Maker import (
+    RabbitFXTool, load_rabbitfx_rules, match_rabbitfx_rules, shared_resources,
+)
+from WWMI_Toggle_Maker.WWMI_Toggle_Maker import App, load_toggle_rules, match_toggle_rules
+from WWMI_Transparency_Maker.WWMI_Transparency_Maker import (
+    TransparencyTool, load_transparency_rules, match_transparency_rules,
+)
+
+
+def plan_from_rules(path, toggle_rules=(), transparency_rules=(), rabbitfx_rules=(), overwrite=False):
+    """Match the batch rules of each tool against `path`.
+    Returns (plan, {tool: count}, [skipped messages])."""
+    lines, _ = read_lines(path)
+    index = IniIndex(lines)
+    plan = EditPlan(path, "Apply All")
+    counts = {}
+    skipped = []
+
+    if toggle_rules:
+        key_vars = App.find_key_vars(lines, index)
+        specs, n = match_toggle_rules(App.parse_draw(lines, key_vars, index), toggle_rules)
+        App.plan_specs(plan, specs, lines)
+        counts["toggle"] = len(specs)
+        if n:
+            skipped.append(f"{n} drawindexed already toggled")
+
+    if transparency_rules:
+        next_shader_index, draws = TransparencyTool.scan_lines(lines, index)
+        pending = match_transparency_rules(draws, transparency_rules, next_shader_index)
+        if pending:
+            TransparencyTool.plan_changes(plan, pending)
+        counts["transparency"] = len(pending)
+
+    if rabbitfx_rules:
+        candidates = match_rabbitfx_rules(RabbitFXTool.scan_lines(lines, index), rabbitfx_rules)
+        found = RabbitFXTool.find_components(lines, candidates)
+        kept = sorted(c for c, exists in found.items() if exists and not overwrite
+                      and "remove" not in candidates[c])
+        modifies = {c: cfg for c, cfg in candidates.items() if c in found and c not in kept}
+        if modifies:
+            modifies, shared, _ = shared_resources(path, modifies, lines)
+            RabbitFXTool.plan_changes(plan, modifies, shared)
+        counts["rabbitfx"] = len(modifies)
+        if kept:
+            skipped.append("RabbitFX already in component " + ", ".join(map(str, kept)))
+
+    return plan, counts, skipped
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply toggle, transparency and RabbitFX specs in one pass")
+    parser.add_argument("ini")
+    parser.add_argument("--toggle", metavar="FILE", help="JSON toggle spec (as for Toggle Maker --batch)")
+    parser.add_argument("--transparency", metavar="FILE", help="JSON transparency spec")
+    parser.add_argument("--rabbitfx", metavar="FILE", help="JSON RabbitFX spec")
+    parser.add_argument("--overwrite", action="store_true",
+                        help="replace RabbitFX that a component already has")
+    parser.add_argument("--no-backup", action="store_true", help="do not write .bak files or history")
+    parser.add_argument("--preview", action="store_true", help="print the diff instead of writing the file")
+    add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+    profile_from_args(args)
+
+    if not (args.toggle or args.transparency or args.rabbitfx):
+        parser.error("give at least one of --toggle, --transparency, --rabbitfx")
+
+    plan, counts, skipped = plan_from_rules(
+        args.ini,
+        load_toggle_rules(args.toggle) if args.toggle else (),
+        load_transparency_rules(args.transparency) if args.transparency else (),
+        load_rabbitfx_rules(args.rabbitfx) if args.rabbitfx else (),
+        args.overwrite,
+    )
+    for message in skipped:
+        print(f"SKIP   {message}")
+    if not any(counts.values()):
+        print("nothing matched")
+        return 0
+
+    if args.preview:
+        sys.stdout.writelines(plan.preview(args.ini))
+        return 0
+    plan.execute(backup=not args.no_backup)
+    print("OK     " + ", ".join(f"{n} {tool}" for tool, n in counts.items()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1 @@
+"""Headless benchmarks for the WWMI support tools."""
@@ -0,0 +1,87 @@
+"""Time opening a tool the old way (a new interpreter per click) against
+opening it inside the launcher's process.
+
+    python -m benchmarks.bench_launcher
+
+"cold" starts a fresh interpreter that imports the tool, creates its window
+and exits once it is drawn; "first" is the launcher's first open of the
+tool (import included) and "warm" every open after that. Without a display
+only the interpreter start and import part can be measured, and is.
+"""
+
+import importlib
+import os
+import subprocess
+import sys
+import time
+import tkinter as tk
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from main import TOOLS, open_tool
+
+COLD = """
+import sys, tkinter as tk
+sys.path.insert(0, {root!r})
+import importlib
+cls = getattr(importlib.import_module({module!r}), {cls!r})
+if {gui!r}:
+    root = tk.Tk()
+    cls(root)
+    root.update()
+    root.destroy()
+"""
+
+
+def cold(module_name, class_name, gui, repeat):
+    code = COLD.format(root=ROOT, module=module_name, cls=class_name, gui=gui)
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def in_process(root, module_name, class_name, repeat):
+    """(first open, best warm open) in seconds."""
+    times = []
+    for _ in range(repeat + 1):
+        start = time.perf_counter()
+        window, tool = open_tool(root, module_name, class_name)
+        root.update()
+        times.append(time.perf_counter() - start)
+        tool.close()
+        window.destroy()
+    return times[0], min(times[1:])
+
+
+def main(repeat=5):
+    try:
+        root = tk.Tk()
+        root.withdraw()
+    except tk.TclError:
+        root = None
+        print("no display: timing interpreter start and import only")
+
+    print(f"{'tool':<22}{'cold ms':>10}{'first ms':>10}{'warm ms':>10}")
+    for text, module_name, class_name in TOOLS:
+        c = cold(module_name, class_name, root is not None, repeat)
+        if root is not None:
+            first, warm = in_process(root, module_name, class_name, repeat)
+        else:
+            start = time.perf_counter()
+            importlib.import_module(module_name)
+            first = time.perf_counter() - start
+            start = time.perf_counter()
+            importlib.import_module(module_name)
+            warm = time.perf_counter() - start
+        print(f"{text:<22}{c * 1000:>10.1f}{first * 1000:>10.1f}{warm * 1000:>10.1f}")
+
+    if root is not None:
+        root.destroy()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Time in-place line edits (as Remove Toggle makes them) against the size
+of the file.
+
+    python -m benchmarks.bench_line_document
+
+"list" rebuilds the line list per edit as the Toggle Maker used to,
+"document" edits a LineDocument. The time per edit of the document should
+stay flat as the file grows.
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synth import generate_mod_ini
+from WWMI_Common.line_document import LineDocument
+from WWMI_Common.line_edits import apply_edits
+
+EDITS = 200
+
+
+def edits_for(count, seed=0):
+    """(start, end, new_lines) replacing 3-line blocks by 2 lines, valid one
+    after another on a file of `count` lines."""
+    rnd = random.Random(seed)
+    edits = []
+    for _ in range(EDITS):
+        start = rnd.randrange(count - 3)
+        edits.append((start, start + 3, ["; restored\n", "drawindexed = 3, 0, 0\n"]))
+        count -= 1
+    return edits
+
+
+def main():
+    print(f"{'lines':>10} {'list us/edit':>14} {'document us/edit':>18}")
+    for components in (25, 100, 400, 1600):
+        lines = generate_mod_ini(components=components, draws_per_component=64)
+        edits = edits_for(len(lines))
+
+        out = lines
+        start = time.perf_counter()
+        for edit in edits:
+            out = apply_edits(out, [edit])
+        as_list = time.perf_counter() - start
+
+        doc = LineDocument(lines)
+        start = time.perf_counter()
+        for a, b, new in edits:
+            doc.replace(a, b, new)
+        as_document = time.perf_counter() - start
+
+        assert doc.tolist() == out
+        print(f"{len(lines):>10} {as_list / EDITS * 1e6:>14.1f} {as_document / EDITS * 1e6:>18.1f}")
+
+
+if __name__ == "__main__":
+    main()
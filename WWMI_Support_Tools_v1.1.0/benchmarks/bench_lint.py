@@ -0,0 +1,44 @@
+"""Time the linter over a folder of inis, in one process and in parallel.
+
+    python -m benchmarks.bench_lint
+
+The parallel run should scale with the CPU count once there are enough
+files to keep the workers busy.
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synth import generate_mod_ini
+from WWMI_Common.batch import find_inis
+from WWMI_Common.ini_lint import lint_paths
+
+FILES = 1000
+
+
+def main():
+    with tempfile.TemporaryDirectory() as root:
+        for i in range(FILES):
+            lines = generate_mod_ini(components=8, draws_per_component=16, toggles=8,
+                                     orphan_toggles=1, seed=i)
+            folder = os.path.join(root, f"mod{i // 50}", f"char{i}")
+            os.makedirs(folder)
+            with open(os.path.join(folder, "mod.ini"), "w", encoding="utf-8", newline="") as f:
+                f.writelines(lines)
+        files = list(find_inis(root))
+        print(f"{len(files)} files")
+
+        print(f"{'jobs':>6} {'seconds':>10} {'files/s':>10}")
+        for jobs in (1, os.cpu_count() or 1):
+            start = time.perf_counter()
+            issues = sum(len(r["issues"]) for r in lint_paths(files, jobs))
+            elapsed = time.perf_counter() - start
+            print(f"{jobs:>6} {elapsed:>10.2f} {len(files) / elapsed:>10.0f}  ({issues} issues)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""Time App.wrap_draw against the number of toggle specs.
+
+    python -m benchmarks.bench_wrap_draw
+
+The time per spec should stay flat as the spec count grows.
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synth import generate_mod_ini
+from WWMI_Toggle_Maker.WWMI_Toggle_Maker import App, ToggleSpec
+
+
+def specs_for(lines, count):
+    entries = App.parse_draw(lines, set())[:count]
+    return [
+        ToggleSpec(var=f"t{i}", key="VK_F1", approx_idx=e.line_idx,
+                   comment=e.comment, drawline=e.drawline)
+        for i, e in enumerate(entries)
+    ]
+
+
+def main():
+    lines = generate_mod_ini(components=100, draws_per_component=64)
+    print(f"{len(lines)} lines")
+    print(f"{'specs':>8} {'total ms':>10} {'us/spec':>10}")
+    for count in (100, 200, 400, 800, 1600, 3200, 6400):
+        specs = specs_for(lines, count)
+        start = time.perf_counter()
+        App.wrap_draw(lines, specs)
+        elapsed = time.perf_counter() - start
+        print(f"{count:>8} {elapsed * 1000:>10.1f} {elapsed / count * 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""Benchmark suite for the scan and apply paths of the three tools.
+
+    python -m benchmarks.run                   # medium sized synthetic ini
+    python -m benchmarks.run --size large
+    python -m benchmarks.run --size huge      # about 1M lines
+    python -m benchmarks.run --save-baseline   # store results in baselines.json
+    python -m benchmarks.run --check           # exit 1 on regressions vs. baselines.json
+
+Everything runs headlessly on the tools' static methods; no window is opened.
+"peak KiB" is the most memory a case allocated at once, "kept KiB" what its
+result still holds afterwards (what a loaded file costs while it stays open).
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synth import generate_mod_ini
+from WWMI_Common.backup_store import BackupStore
+from WWMI_Rabbit_Maker.WWMI_Rabbit_Maker import RabbitFXTool
+from WWMI_Toggle_Maker.WWMI_Toggle_Maker import App, ToggleSpec
+from WWMI_Transparency_Maker.WWMI_Transparency_Maker import TransparencyTool
+
+BASELINES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+
+SIZES = {
+    "small": dict(components=50, draws_per_component=20, toggles=100,
+                  orphan_toggles=20, rabbitfx=10, transparency=100),
+    "medium": dict(components=500, draws_per_component=40, toggles=1000,
+                   orphan_toggles=200, rabbitfx=100, transparency=1000),
+    "large": dict(components=2000, draws_per_component=80, toggles=8000,
+                  orphan_toggles=1000, rabbitfx=400, transparency=8000),
+    "huge": dict(components=4000, draws_per_component=100, toggles=20000,
+                 orphan_toggles=2000, rabbitfx=800, transparency=20000),
+}
+
+
+def build_cases(lines, workdir):
+    """Return [(name, fn)]; all setup happens here so only fn is timed.
+    The *_apply_file cases rewrite a fresh copy of the ini in `workdir` and
+    include that copy in their time."""
+    key_vars = App.find_key_vars(lines)
+    entries = App.parse_draw(lines, key_vars)
+
+    specs = [
+        ToggleSpec(var=f"bench{i}", key="VK_F1", approx_idx=e.line_idx,
+                   comment=e.comment, drawline=e.drawline)
+        for i, e in enumerate(entries[::4])
+        if not e.status
+    ]
+
+    _, draws = TransparencyTool.scan_lines(lines)
+    pending = []
+    seen = {}
+    for comp, params, comment in draws:
+        n = seen[comp] = seen.get(comp, -1) + 1
+        if n % 8 == 0:
+            pending.append({
+                "component": comp,
+                "params": params,
+                "comment": comment,
+                "mode": "alpha",
+                "factors": None,
+                "shader_name": f"CustomShaderTransparencyBench{len(pending)}",
+            })
+
+    glow = {"h": "0.5", "s": "1.0", "v": "1.0", "brightness": "2.0", "filename": "glow.dds"}
+    modifies = {
+        comp: {"glow": glow, "fx": {"filename": "fx.dds"}}
+        for comp in RabbitFXTool.scan_lines(lines)
+    }
+
+    source = os.path.join(workdir, "source.ini")
+    target = os.path.join(workdir, "mod.ini")
+    with open(source, "w", encoding="utf-8") as f:
+        f.writelines(lines)
+
+    def on_copy(apply):
+        def run():
+            shutil.copyfile(source, target)
+            apply(target)
+        return run
+
+    # every record() sees a changed file, as after a real apply
+    history = os.path.join(workdir, "history.ini")
+    versions = ["".join(lines), "".join(App.wrap_draw(lines, specs))]
+    store = BackupStore(history)
+
+    def record():
+        with open(history, "w", encoding="utf-8") as f:
+            f.write(versions[0])
+        versions.reverse()
+        store.record()
+
+    return [
+        ("parse_draw", lambda: App.parse_draw(lines, key_vars)),
+        ("transparency_scan", lambda: TransparencyTool.scan_lines(lines)),
+        ("wrap_draw", lambda: App.wrap_draw(lines, specs)),
+        ("prune_unused_toggles", lambda: App.prune_unused_toggles(lines)),
+        ("transparency_rewrite", lambda: TransparencyTool.rewrite_lines(lines, pending)),
+        ("rabbitfx_rewrite", lambda: RabbitFXTool.rewrite_lines(lines, modifies)),
+        ("transparency_apply_file", on_copy(lambda p: TransparencyTool.apply_file(p, pending))),
+        ("rabbitfx_apply_file", on_copy(lambda p: RabbitFXTool.write_file(p, modifies))),
+        ("backup_record", record),
+    ]
+
+
+def measure(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        result = fn()
+        kept, peak = tracemalloc.get_traced_memory()
+        del result
+    finally:
+        tracemalloc.stop()
+    return best, peak, kept
+
+
+def load_baselines():
+    try:
+        with open(BASELINES, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="WWMI support tools benchmarks")
+    parser.add_argument("--size", choices=sorted(SIZES), default="medium")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per case (best is kept)")
+    parser.add_argument("--only", action="append", metavar="CASE", help="run only this case")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--check", action="store_true", help="exit 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.3,
+                        help="allowed relative slowdown / memory growth (default 0.3)")
+    args = parser.parse_args(argv)
+
+    lines = generate_mod_ini(**SIZES[args.size])
+    print(f"size={args.size}: {len(lines)} lines")
+
+    baselines = load_baselines()
+    base = baselines.get(args.size, {})
+    results = {}
+    regressions = []
+
+    print(f"{'case':<24} {'lines/s':>12} {'best ms':>10} {'peak KiB':>10} {'kept KiB':>10}  vs baseline")
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, fn in build_cases(lines, workdir):
+            if args.only and name not in args.only:
+                continue
+            best, peak, kept = measure(fn, args.repeat)
+            rate = len(lines) / best if best > 0 else float("inf")
+            res = {"lines_per_s": round(rate), "peak_kib": round(peak / 1024),
+                   "kept_kib": round(kept / 1024)}
+            results[name] = res
+
+            note = ""
+            ref = base.get(name)
+            if ref:
+                speed = rate / ref["lines_per_s"] - 1
+                mem = res["peak_kib"] / max(1, ref["peak_kib"]) - 1
+                note = f"speed {speed:+.0%}, memory {mem:+.0%}"
+                if "kept_kib" in ref:
+                    note += f", kept {res['kept_kib'] / max(1, ref['kept_kib']) - 1:+.0%}"
+                if speed < -args.tolerance or mem > args.tolerance:
+                    regressions.append(name)
+                    note += "  REGRESSION"
+            print(f"{name:<24} {rate:>12,.0f} {best * 1000:>10.1f} {res['peak_kib']:>10,} "
+                  f"{res['kept_kib']:>10,}  {note}")
+
+    if args.save_baseline:
+        baselines.setdefault(args.size, {}).update(results)
+        with open(BASELINES, "w", encoding="utf-8") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"baseline saved to {BASELINES}")
+
+    if args.check and regressions:
+        print(f"regressions: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
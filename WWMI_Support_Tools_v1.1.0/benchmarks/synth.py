@@ -0,0 +1,117 @@
+"""Synthetic WWMI mod.ini generator."""
+
+import random
+
+
+def generate_mod_ini(
+    components=10,
+    draws_per_component=8,
+    toggles=0,
+    orphan_toggles=0,
+    rabbitfx=0,
+    transparency=0,
+    seed=0,
+):
+    """Return the lines of a synthetic mod.ini.
+
+    toggles         drawindexed lines wrapped in simple [E] toggle blocks
+    orphan_toggles  persist vars + [Key...] sections no if-block uses
+    rabbitfx        components that already carry a RabbitFX block
+    transparency    drawindexed lines already redirected to a
+                    CustomShaderTransparency section
+    """
+    rnd = random.Random(seed)
+    total_draws = components * draws_per_component
+    toggles = min(toggles, total_draws)
+    transparency = min(transparency, total_draws - toggles)
+
+    # spread the special draws evenly over the file
+    def spread(count, offset):
+        if not count:
+            return set()
+        step = total_draws / count
+        return {int(i * step + offset) % total_draws for i in range(count)}
+
+    toggled = spread(toggles, 0)
+    transparent = spread(transparency, max(1, total_draws // max(1, 2 * transparency))) - toggled
+
+    toggle_vars = [f"toggle{i}" for i in range(len(toggled))]
+    orphan_vars = [f"orphan{i}" for i in range(orphan_toggles)]
+
+    lines = [
+        "[Constants]\n",
+        "global $required_wwmi_version = 0.70\n",
+        "global $object_detected = 0\n",
+    ]
+    for var in toggle_vars + orphan_vars:
+        lines.append(f"global persist ${var} = 0\n")
+    lines += [
+        "\n",
+        "[Present]\n",
+        "post $object_detected = 0\n",
+    ]
+    for n, var in enumerate(toggle_vars + orphan_vars):
+        lines += [
+            "\n",
+            f"[Key{var}]\n",
+            "condition = $object_detected\n",
+            f"key = VK_F{n % 12 + 1}\n",
+            "type = cycle\n",
+            f"${var} = 0,1\n",
+        ]
+
+    draw_no = 0
+    next_toggle = 0
+    shader_no = 0
+    for comp in range(components):
+        shaders = []
+        lines += [
+            "\n",
+            f"[TextureOverrideComponent{comp}]\n",
+            f"hash = {rnd.getrandbits(32):08x}\n",
+            f"match_first_index = {comp * 1000}\n",
+            "run = CommandListOverrideSharedResources\n",
+        ]
+        if comp < rabbitfx:
+            lines += [
+                "$\\rabbitfx\\h = 0.5\n",
+                "$\\rabbitfx\\s = 1.0\n",
+                "$\\rabbitfx\\v = 1.0\n",
+                "$\\rabbitfx\\brightness = 2.0\n",
+                "Resource\\RabbitFX\\GlowMap = ref ResourceGlow\n",
+                "run = CommandList\\RabbitFX\\Run\n",
+                "\n",
+            ]
+
+        first = 0
+        for part in range(draws_per_component):
+            count = rnd.randint(3, 30000)
+            draw = f"drawindexed = {count}, {first}, 0\n"
+            comment = f"; Draw Component {comp} Part {part}\n"
+            first += count
+
+            if draw_no in toggled:
+                var = toggle_vars[next_toggle]
+                next_toggle += 1
+                lines += [f"if ${var} == 0\n", "    " + comment, "    " + draw, "endif\n"]
+            elif draw_no in transparent:
+                shader_no += 1
+                name = f"CustomShaderTransparency{shader_no}"
+                lines += [comment, "; " + draw, f"run = {name}\n"]
+                shaders += [
+                    "\n",
+                    f"[{name}]\n",
+                    "blend = ADD SRC_ALPHA INV_SRC_ALPHA\n",
+                    draw,
+                ]
+            else:
+                lines += [comment, draw]
+            draw_no += 1
+
+        lines.append("run = CommandListCleanupSharedResources\n")
+        lines += shaders
+
+    if rabbitfx:
+        lines += ["\n", "[ResourceGlow]\n", "filename = Textures/glow.dds\n"]
+
+    return lines
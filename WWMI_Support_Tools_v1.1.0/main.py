@@ -1,46 +1,146 @@
-import subprocess
-import sys
-import os
-import tkinter as tk
-
-
-def run_script(relative_path):
-    python_exe = sys.executable
-    script_path = os.path.join(os.path.dirname(__file__), relative_path)
-    subprocess.Popen([python_exe, script_path], cwd=os.path.dirname(script_path))
-
-
-class Launcher:
-    def __init__(self, root):
-        root.title("WWMI Support Tools Launcher")
-        root.geometry("350x200")
-
-        frame = tk.Frame(root)
-        frame.pack(expand=True)
-
-        tk.Label(frame, text="Select a tool to run:").pack(pady=15)
-
-        tk.Button(
-            frame, text="Toggle Maker", width=25,
-            command=lambda: run_script("WWMI_Toggle_Maker/WWMI_Toggle_Maker.py")
-        ).pack(pady=5)
-
-        tk.Button(
-            frame, text="RabbitFX Maker", width=25,
-            command=lambda: run_script("WWMI_Rabbit_Maker/WWMI_Rabbit_Maker.py")
-        ).pack(pady=5)
-
-        tk.Button(
-            frame, text="Transparency Maker", width=25,
-            command=lambda: run_script("WWMI_Transparency_Maker/WWMI_Transparency_Maker.py")
-        ).pack(pady=5)
-
-
-def main():
-    root = tk.Tk()
-    Launcher(root)
-    root.mainloop()
-
-
-if __name__ == "__main__":
-    main()
+import importlib
+import os
+import time
+import tkinter as tk
+from tkinter import messagebox
+
+from WWMI_Common.edit_plan import EditPlan
+from WWMI_Common.file_watch import check_unchanged, file_signature
+from WWMI_Common.shared_document import SharedDocument
+from WWMI_Common.worker import TaskRunner
+
+# (button text, module, tool class); modules are imported on first use
+TOOLS = (
+    ("Toggle Maker", "WWMI_Toggle_Maker.WWMI_Toggle_Maker", "App"),
+    ("RabbitFX Maker", "WWMI_Rabbit_Maker.WWMI_Rabbit_Maker", "RabbitFXTool"),
+    ("Transparency Maker", "WWMI_Transparency_Maker.WWMI_Transparency_Maker", "TransparencyTool"),
+)
+
+
+def open_tool(parent, module_name, class_name, document=None):
+    """Create a tool in a new Toplevel of `parent`. Returns (window, tool)."""
+    cls = getattr(importlib.import_module(module_name), class_name)
+    window = tk.Toplevel(parent)
+    return window, cls(window, document=document)
+
+
+class Launcher:
+    def __init__(self, root):
+        self.root = root
+        root.title("WWMI Support Tools Launcher")
+        root.geometry("350x280")
+
+        # every tool reads the selected mod.ini through this one copy
+        self.document = SharedDocument()
+        self.windows = {}  # button text -> (window, tool)
+
+        frame = tk.Frame(root)
+        frame.pack(expand=True)
+
+        tk.Label(frame, text="Select a tool to run:").pack(pady=15)
+
+        for text, module_name, class_name in TOOLS:
+            tk.Button(
+                frame, text=text, width=25,
+                command=lambda t=text, m=module_name, c=class_name: self.open(t, m, c)
+            ).pack(pady=5)
+
+        self.apply_button = tk.Button(frame, text="Apply All", width=25, command=self.apply_all)
+        self.apply_button.pack(pady=(15, 5))
+
+        self.status = tk.Label(frame, text="")
+        self.status.pack(pady=5)
+        self.runner = TaskRunner(root, lambda text: self.status.config(text=text), [self.apply_button])
+
+    def open(self, text, module_name, class_name):
+        if text in self.windows:
+            window, _ = self.windows[text]
+            window.deiconify()
+            window.lift()
+            window.focus_force()
+            return
+
+        start = time.perf_counter()
+        window, tool = open_tool(self.root, module_name, class_name, self.document)
+        window.protocol("WM_DELETE_WINDOW", lambda: self.close(text))
+        self.windows[text] = (window, tool)
+        window.update_idletasks()
+        self.status.config(text=f"{text} opened in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    def close(self, text):
+        window, tool = self.windows[text]
+        if not tool.close():
+            messagebox.showwarning("Busy", "Wait for the running task to finish or cancel it.", parent=window)
+            return
+        del self.windows[text]
+        window.destroy()
+
+    def apply_all(self):
+        """Write the pending edits of every open tool to their mod.ini in
+        one pass, with one backup. The tools taking part are held busy until
+        it is over, so nothing is queued or applied there meanwhile."""
+        if self.runner.busy:
+            return
+        tools = [tool for _, tool in self.windows.values() if tool.plan_path()]
+        if not tools:
+            messagebox.showinfo("Apply All", "No tool has pending changes.")
+            return
+        paths = {os.path.normcase(os.path.abspath(tool.plan_path())) for tool in tools}
+        if len(paths) > 1:
+            messagebox.showerror("Apply All", "The tools have changes for different files.\n"
+                                 "Apply them from each tool instead.")
+            return
+        if any(tool.runner.busy for tool in tools):
+            messagebox.showwarning("Busy", "Wait for the running task to finish or cancel it.")
+            return
+
+        path = tools[0].plan_path()
+        for tool in tools:
+            tool.runner.hold(self.runner)
+
+        def release():
+            for tool in tools:
+                tool.runner.release()
+
+        # what a tool has to read first (RabbitFX Maker: which components
+        # already have RabbitFX) is read off the main loop
+        readers = [tool.plan_reader(path) for tool in tools]
+
+        def read(task):
+            return [reader(task.progress) if reader is not None else None for reader in readers]
+
+        def build(results):
+            plan = EditPlan(path, "Apply All")
+            taking_part = [tool for tool, found in zip(tools, results) if tool.add_to_plan(plan, found)]
+            if not plan:
+                release()
+                self.status.config(text="Nothing to apply.")
+                return
+            expected = [tool.snapshot for tool in taking_part]
+
+            def work(task):
+                # every tool must still be looking at the file as it is
+                for signature in expected:
+                    check_unchanged(path, signature)
+                plan.execute(progress=task.progress)
+                return file_signature(path)
+
+            def done(signature):
+                release()
+                for tool in taking_part:
+                    tool.plan_done(signature)
+                self.status.config(text=f"Applied the changes of {len(taking_part)} tools in one pass.")
+
+            self.runner.run(work, done, on_cancel=release, on_error=lambda e: release())
+
+        self.runner.run(read, build, on_cancel=release, on_error=lambda e: release())
+
+
+def main():
+    root = tk.Tk()
+    Launcher(root)
+    root.mainloop()
+
+
+if __name__ == "__main__":
+    main()
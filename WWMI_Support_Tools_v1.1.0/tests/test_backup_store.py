@@ -0,0 +1,139 @@
+"""Tests for the backup history's delta format.
+
+    python -m unittest discover tests        (from the tools folder)
+
+A change to line_delta or to the delta file format must still rebuild every
+old version byte for byte, and anything that is not a delta must be refused
+rather than misread.
+"""
+
+import os
+import pickle
+import random
+import shutil
+import tempfile
+import unittest
+import zlib
+
+from WWMI_Common.backup_store import (
+    DELTA_MAGIC, BackupStore, apply_line_delta, decode_delta, encode_delta, line_delta,
+)
+
+# lines an ini is made of, with the awkward ones: CRLF, no newline, bytes
+# that are not utf-8, empty, and many repeats
+POOL = [
+    b"[TextureOverrideComponent1]\r\n", b"drawindexed = 3, 0, 0\r\n", b"\r\n", b"\n",
+    b"; \xb1\xe2\xba\xbb\n", b"if $swap == 0\n", b"endif\n", b"run = CommandListSkinTexture\n",
+    b"\xff\xfe\x00", b"", b"x" * 300 + b"\n",
+]
+
+
+def random_lines(rng, n):
+    return [rng.choice(POOL) if rng.random() < 0.7 else b"line %d\n" % rng.randrange(50) for _ in range(n)]
+
+
+def mutate(rng, lines):
+    out = list(lines)
+    for _ in range(rng.randint(0, 6)):
+        i = rng.randint(0, len(out))
+        out[i:i + rng.randint(0, 4)] = random_lines(rng, rng.randint(0, 4))
+    return out
+
+
+class DeltaRoundTripTest(unittest.TestCase):
+    def test_random_round_trip(self):
+        rng = random.Random(12)
+        for _ in range(2000):
+            new = random_lines(rng, rng.randint(0, 40))
+            old = mutate(rng, new) if rng.random() < 0.8 else random_lines(rng, rng.randint(0, 40))
+            ops = line_delta(new, old)
+            data = encode_delta(ops)
+            self.assertEqual(decode_delta(data), ops)
+            self.assertEqual(apply_line_delta(new, decode_delta(data)), old)
+
+    def test_large_file_round_trip(self):
+        rng = random.Random(3)
+        new = random_lines(rng, 20000)
+        old = mutate(rng, new)
+        self.assertEqual(apply_line_delta(new, decode_delta(encode_delta(line_delta(new, old)))), old)
+
+    def test_truncated(self):
+        ops = [(0, 2), [b"a\n", b"bc\n"], (5, 9), [b""]]
+        data = encode_delta(ops)
+        # ends of whole ops: a shorter delta, but never a misread one
+        ends = {len(encode_delta(ops[:k])) for k in range(len(ops) + 1)}
+        for cut in range(len(DELTA_MAGIC), len(data)):
+            if cut in ends:
+                continue
+            with self.assertRaises(ValueError):
+                decode_delta(data[:cut])
+
+    def test_foreign_data(self):
+        for data in (
+            b"",
+            b"WWMIDELTA0\n",
+            DELTA_MAGIC[:-1],
+            pickle.dumps([(0, 1), [b"a\n"]]),  # the format before this one
+            DELTA_MAGIC + b"Z",
+        ):
+            with self.assertRaises(ValueError):
+                decode_delta(data)
+
+    def test_copy_out_of_range(self):
+        with self.assertRaises(ValueError):
+            apply_line_delta([b"a\n"], [(0, 2)])
+        with self.assertRaises(ValueError):
+            apply_line_delta([b"a\n"], [(1, 0)])
+
+
+class _Evil:
+    def __reduce__(self):
+        return (os.remove, (EVIL_TARGET,))
+
+
+EVIL_TARGET = None
+
+
+class BackupStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "mod.ini")
+        self.addCleanup(shutil.rmtree, self.dir, True)
+
+    def record_versions(self, count):
+        rng = random.Random(count)
+        lines = random_lines(rng, 300)
+        versions = []
+        for k in range(count):
+            lines = mutate(rng, lines)
+            data = b"".join(lines)
+            with open(self.path, "wb") as f:
+                f.write(data)
+            BackupStore(self.path).record(f"v{k}")
+            versions.append(data)
+        return versions
+
+    def test_every_version_reads_back(self):
+        versions = self.record_versions(8)
+        store = BackupStore(self.path)
+        for v in store.versions():
+            # an unchanged file is not recorded twice, so go by the note
+            self.assertEqual(store.read_version(v["id"]), versions[int(v["note"][1:])])
+
+    def test_pickled_delta_is_refused(self):
+        global EVIL_TARGET
+        self.record_versions(3)
+        store = BackupStore(self.path)
+        self.assertGreater(len(store.versions()), 1)
+        oldest = store.versions()[-1]["id"]
+        EVIL_TARGET = os.path.join(self.dir, "canary")
+        open(EVIL_TARGET, "w").close()
+        with open(store._delta_path(oldest), "wb") as f:
+            f.write(zlib.compress(pickle.dumps(_Evil())))
+        with self.assertRaises(ValueError):
+            store.read_version(oldest)
+        self.assertTrue(os.path.exists(EVIL_TARGET))
+
+
+if __name__ == "__main__":
+    unittest.main()